@@ -10,10 +10,13 @@ import click
 from tqdm import tqdm
 from flask import current_app
 from langchain.embeddings import OpenAIEmbeddings
+from sqlalchemy import func, select
 from werkzeug.exceptions import NotFound
 
+from core.helper import encrypter
 from core.embedding.cached_embedding import CacheEmbedding
 from core.index.index import IndexBuilder
+from core.index.keyword_table_index.keyword_table_index import KeywordTableIndex
 from core.model_providers.model_factory import ModelFactory
 from core.model_providers.models.embedding.openai_embedding import OpenAIEmbedding
 from core.model_providers.models.entity.model_params import ModelType
@@ -24,8 +27,9 @@ from libs.helper import email as email_validate
 from extensions.ext_database import db
 from libs.rsa import generate_key_pair
 from models.account import InvitationCode, Tenant, TenantAccountJoin
-from models.dataset import Dataset, DatasetQuery, Document, DatasetCollectionBinding
-from models.model import Account, AppModelConfig, App
+from models.dataset import Dataset, DatasetQuery, Document, DatasetCollectionBinding, Embedding, \
+    DatasetKeywordTable
+from models.model import Account, AppModelConfig, App, Conversation, Message, MessageFeedback
 import secrets
 import base64
 
@@ -114,6 +118,8 @@ def reset_encrypt_key_pair():
     db.session.query(ProviderModel).delete()
     db.session.commit()
 
+    encrypter.invalidate_decrypted_tokens(tenant.id)
+
     click.echo(click.style('Congratulations! '
                            'the asymmetric key pair of workspace {} has been reset.'.format(tenant.id), fg='green'))
 
@@ -647,6 +653,186 @@ def update_app_model_configs(batch_size):
             pbar.update(len(data_batch))
 
 
+@click.command('migrate-embeddings-binary', help='Re-encode cached embeddings from pickle to the binary format.')
+@click.option("--batch-size", default=1000, help="Number of embeddings to re-encode in each batch.")
+@click.option("--dtype", default='float32', type=click.Choice(['float32', 'float16']),
+              help="Storage dtype of the re-encoded embeddings.")
+@click.option("--sleep", default=0.0, help="Seconds to sleep between batches to limit database load.")
+@click.option("--max-retries", default=3, help="Number of times a failed batch is retried before its embeddings "
+                                               "are re-encoded one by one.")
+def migrate_embeddings_binary(batch_size, dtype, sleep, max_retries):
+    click.secho("Start re-encoding embeddings.", fg='green')
+    migrated_count = 0
+    skipped_ids = []
+    last_id = None
+    retries = 0
+
+    def re_encode(embedding: Embedding) -> bool:
+        if embedding.is_binary_encoded():
+            return False
+
+        embedding.set_embedding(embedding.get_embedding(), dtype=dtype)
+        return True
+
+    while True:
+        query = db.session.query(Embedding).order_by(Embedding.id)
+        if last_id:
+            query = query.filter(Embedding.id > last_id)
+
+        embeddings = query.limit(batch_size).all()
+        if not embeddings:
+            break
+
+        embedding_ids = [embedding.id for embedding in embeddings]
+
+        try:
+            batch_count = sum(re_encode(embedding) for embedding in embeddings)
+            db.session.commit()
+            migrated_count += batch_count
+        except Exception as e:
+            db.session.rollback()
+            # last_id is only advanced past a handled batch, the failed batch is read again on retry
+            retries += 1
+            if retries <= max_retries:
+                click.secho(f"Error while re-encoding embeddings after id {last_id}, "
+                            f"retry {retries}/{max_retries}: {e}", fg='red')
+                time.sleep(retries)
+                continue
+
+            # the batch keeps failing, re-encode its embeddings one by one and skip the failing ones
+            for embedding_id in embedding_ids:
+                try:
+                    embedding = db.session.query(Embedding).filter(Embedding.id == embedding_id).first()
+                    if embedding and re_encode(embedding):
+                        db.session.commit()
+                        migrated_count += 1
+                except Exception as e:
+                    db.session.rollback()
+                    skipped_ids.append(embedding_id)
+                    click.secho(f"Error while re-encoding embedding {embedding_id}, skipped: {e}", fg='red')
+
+        retries = 0
+        last_id = embedding_ids[-1]
+        click.echo(f"Re-encoded {migrated_count} embeddings, last id: {last_id}.")
+
+        if sleep:
+            time.sleep(sleep)
+
+    if skipped_ids:
+        click.secho(f"Re-encoded {migrated_count} embeddings, skipped {len(skipped_ids)} embeddings "
+                    f"that failed to re-encode: {', '.join(str(embedding_id) for embedding_id in skipped_ids)}",
+                    fg='red')
+        raise click.exceptions.Exit(1)
+
+    click.secho(f"Congratulations! Re-encoded {migrated_count} embeddings.", fg='green')
+
+
+@click.command('migrate-dataset-keyword-tables', help='Move legacy dataset keyword tables into keyword postings.')
+def migrate_dataset_keyword_tables():
+    click.secho("Start migrating dataset keyword tables.", fg='green')
+    migrated_count = 0
+    failed_dataset_ids = []
+
+    while True:
+        # failed datasets keep their legacy keyword table, they are excluded so the next ones are read
+        query = db.session.query(DatasetKeywordTable.dataset_id)
+        if failed_dataset_ids:
+            query = query.filter(DatasetKeywordTable.dataset_id.notin_(failed_dataset_ids))
+
+        dataset_keyword_tables = query.limit(50).all()
+        if not dataset_keyword_tables:
+            break
+
+        for dataset_keyword_table in dataset_keyword_tables:
+            dataset = db.session.query(Dataset).filter(Dataset.id == dataset_keyword_table.dataset_id).first()
+            if not dataset:
+                db.session.query(DatasetKeywordTable).filter(
+                    DatasetKeywordTable.dataset_id == dataset_keyword_table.dataset_id
+                ).delete()
+                db.session.commit()
+                continue
+
+            try:
+                click.echo('Migrate dataset keyword table: {}'.format(dataset.id))
+                KeywordTableIndex(dataset=dataset).migrate_dataset_keyword_table()
+                migrated_count += 1
+            except Exception as e:
+                db.session.rollback()
+                failed_dataset_ids.append(dataset_keyword_table.dataset_id)
+                click.secho(f"Error while migrating dataset keyword table: {e}, dataset_id: {dataset.id}", fg='red')
+                continue
+
+    if failed_dataset_ids:
+        click.secho(f"Migrated {migrated_count} dataset keyword tables, {len(failed_dataset_ids)} failed, "
+                    f"dataset_ids: {', '.join(str(dataset_id) for dataset_id in failed_dataset_ids)}", fg='red')
+        raise click.exceptions.Exit(1)
+
+    click.secho(f"Congratulations! Migrated {migrated_count} dataset keyword tables.", fg='green')
+
+
+@click.command('backfill-conversation-counters', help='Recount the messages and feedbacks of the conversations.')
+@click.option("--batch-size", default=1000, help="Number of conversations to recount in each batch.")
+@click.option("--max-retries", default=3, help="Number of times a failed batch is retried before the command aborts.")
+def backfill_conversation_counters(batch_size, max_retries):
+    click.secho("Start backfilling conversation counters.", fg='green')
+
+    def count_feedbacks(from_source: str, rating: str):
+        return select(func.count(MessageFeedback.id)).where(
+            MessageFeedback.conversation_id == Conversation.id,
+            MessageFeedback.from_source == from_source,
+            MessageFeedback.rating == rating
+        ).scalar_subquery()
+
+    # the counters are recounted by correlated subqueries, the command can be run again at any time
+    counters = {
+        Conversation.message_count: select(func.count(Message.id)).where(
+            Message.conversation_id == Conversation.id
+        ).scalar_subquery(),
+        Conversation.user_like_count: count_feedbacks('user', 'like'),
+        Conversation.user_dislike_count: count_feedbacks('user', 'dislike'),
+        Conversation.admin_like_count: count_feedbacks('admin', 'like'),
+        Conversation.admin_dislike_count: count_feedbacks('admin', 'dislike'),
+    }
+
+    backfilled_count = 0
+    last_id = None
+    retries = 0
+
+    while True:
+        query = db.session.query(Conversation.id).order_by(Conversation.id)
+        if last_id:
+            query = query.filter(Conversation.id > last_id)
+
+        conversation_ids = [conversation_id for conversation_id, in query.limit(batch_size).all()]
+        if not conversation_ids:
+            break
+
+        try:
+            db.session.query(Conversation).filter(Conversation.id.in_(conversation_ids)) \
+                .update(counters, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # last_id is only advanced by a committed batch, the failed batch is read again on retry
+            retries += 1
+            if retries > max_retries:
+                click.secho(f"Aborted backfilling conversation counters, the batch after id {last_id} "
+                            f"failed {retries} times: {e}", fg='red')
+                raise click.exceptions.Exit(1)
+
+            click.secho(f"Error while backfilling conversation counters after id {last_id}, "
+                        f"retry {retries}/{max_retries}: {e}", fg='red')
+            time.sleep(retries)
+            continue
+
+        retries = 0
+        last_id = conversation_ids[-1]
+        backfilled_count += len(conversation_ids)
+        click.echo(f"Backfilled {backfilled_count} conversations, last id: {last_id}.")
+
+    click.secho(f"Congratulations! Backfilled {backfilled_count} conversations.", fg='green')
+
+
 def register_commands(app):
     app.cli.add_command(reset_password)
     app.cli.add_command(reset_email)
@@ -659,3 +845,6 @@ def register_commands(app):
     app.cli.add_command(update_qdrant_indexes)
     app.cli.add_command(update_app_model_configs)
     app.cli.add_command(normalization_collections)
+    app.cli.add_command(migrate_embeddings_binary)
+    app.cli.add_command(migrate_dataset_keyword_tables)
+    app.cli.add_command(backfill_conversation_counters)
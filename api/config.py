@@ -67,6 +67,19 @@ DEFAULTS = {
     'CLEAN_DAY_SETTING': 30,
     'UPLOAD_FILE_SIZE_LIMIT': 15,
     'UPLOAD_FILE_BATCH_LIMIT': 5,
+    'EMBEDDING_QUERY_CACHE_LOCAL_MAXSIZE': 1000,
+    'EMBEDDING_QUERY_CACHE_LOCAL_TTL': 600,
+    'EMBEDDING_QUERY_CACHE_REDIS_MAXSIZE': 100000,
+    'EMBEDDING_QUERY_CACHE_REDIS_TTL': 3600,
+    'KEYWORD_EXTRACTION_MAX_WORKERS': 2,
+    'INDEXING_EMBEDDING_MAX_WORKERS': 4,
+    'DOCUMENT_INDEXING_FAN_OUT_ENABLED': 'True',
+    'DOCUMENT_INDEXING_TENANT_MAX_CONCURRENCY': 4,
+    'DOCUMENT_INDEXING_TENANT_RETRY_INTERVAL': 5,
+    'DOCUMENT_INDEXING_TENANT_MAX_RETRIES': 360,
+    'SEGMENT_HIT_COUNT_FLUSH_INTERVAL': 60,
+    'INDEXING_STREAMING_BATCH_SIZE': 1048576,
+    'INDEXING_STREAMING_MIN_FILE_SIZE': 10485760,
 }
 
 
@@ -252,6 +265,34 @@ class Config:
         self.UPLOAD_FILE_SIZE_LIMIT = int(get_env('UPLOAD_FILE_SIZE_LIMIT'))
         self.UPLOAD_FILE_BATCH_LIMIT = int(get_env('UPLOAD_FILE_BATCH_LIMIT'))
 
+        # query embedding cache settings, set maxsize to 0 to disable a tier
+        self.EMBEDDING_QUERY_CACHE_LOCAL_MAXSIZE = int(get_env('EMBEDDING_QUERY_CACHE_LOCAL_MAXSIZE'))
+        self.EMBEDDING_QUERY_CACHE_LOCAL_TTL = int(get_env('EMBEDDING_QUERY_CACHE_LOCAL_TTL'))
+        self.EMBEDDING_QUERY_CACHE_REDIS_MAXSIZE = int(get_env('EMBEDDING_QUERY_CACHE_REDIS_MAXSIZE'))
+        self.EMBEDDING_QUERY_CACHE_REDIS_TTL = int(get_env('EMBEDDING_QUERY_CACHE_REDIS_TTL'))
+
+        # processes extracting the keywords of economy indexing batches, 0 to extract in the current process
+        self.KEYWORD_EXTRACTION_MAX_WORKERS = int(get_env('KEYWORD_EXTRACTION_MAX_WORKERS'))
+
+        # threads embedding the following chunks of a document while the current chunk is indexed, 0 to embed inline
+        self.INDEXING_EMBEDDING_MAX_WORKERS = int(get_env('INDEXING_EMBEDDING_MAX_WORKERS'))
+
+        # characters of the uploaded file loaded, cleaned and split at once when a document is indexed, 0 to load at once
+        self.INDEXING_STREAMING_BATCH_SIZE = int(get_env('INDEXING_STREAMING_BATCH_SIZE'))
+        # bytes of the smallest uploaded file indexed in batches, smaller files are loaded at once
+        self.INDEXING_STREAMING_MIN_FILE_SIZE = int(get_env('INDEXING_STREAMING_MIN_FILE_SIZE'))
+
+        # index the documents of an upload batch in one celery task each,
+        # at most max concurrency tasks of a tenant run at once (0 for no limit), the others retry after the interval
+        self.DOCUMENT_INDEXING_FAN_OUT_ENABLED = get_bool_env('DOCUMENT_INDEXING_FAN_OUT_ENABLED')
+        self.DOCUMENT_INDEXING_TENANT_MAX_CONCURRENCY = int(get_env('DOCUMENT_INDEXING_TENANT_MAX_CONCURRENCY'))
+        self.DOCUMENT_INDEXING_TENANT_RETRY_INTERVAL = int(get_env('DOCUMENT_INDEXING_TENANT_RETRY_INTERVAL'))
+        # retries of a document waiting for a slot of its tenant, the document is then indexed beyond the cap
+        self.DOCUMENT_INDEXING_TENANT_MAX_RETRIES = int(get_env('DOCUMENT_INDEXING_TENANT_MAX_RETRIES'))
+
+        # seconds between the flushes of the segment hit counts recorded in redis, run by celery beat
+        self.SEGMENT_HIT_COUNT_FLUSH_INTERVAL = int(get_env('SEGMENT_HIT_COUNT_FLUSH_INTERVAL'))
+
 
 class CloudEditionConfig(Config):
 
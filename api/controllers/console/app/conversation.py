@@ -16,6 +16,7 @@ from controllers.console.wraps import account_initialization_required
 from libs.helper import TimestampField, datetime_string, uuid_value
 from extensions.ext_database import db
 from models.model import Message, MessageAnnotation, Conversation
+from services.prefetch_service import PrefetchService
 
 account_fields = {
     'id': fields.String,
@@ -187,6 +188,11 @@ class CompletionConversationApi(Resource):
             error_out=False
         )
 
+        PrefetchService.prefetch_conversations(
+            conversations.items,
+            relations=('annotation', 'first_message', 'from_end_user_session_id', 'app_model_config')
+        )
+
         return conversations
 
 
@@ -336,12 +342,7 @@ class ChatConversationApi(Resource):
             ).group_by(Conversation.id).having(func.count(MessageAnnotation.id) == 0)
 
         if args['message_count_gte'] and args['message_count_gte'] >= 1:
-            query = (
-                query.options(joinedload(Conversation.messages))
-                .join(Message, Message.conversation_id == Conversation.id)
-                .group_by(Conversation.id)
-                .having(func.count(Message.id) >= args['message_count_gte'])
-            )
+            query = query.where(Conversation.message_count >= args['message_count_gte'])
 
         query = query.order_by(Conversation.created_at.desc())
 
@@ -352,6 +353,11 @@ class ChatConversationApi(Resource):
             error_out=False
         )
 
+        PrefetchService.prefetch_conversations(
+            conversations.items,
+            relations=('annotation', 'first_message', 'from_end_user_session_id', 'app_model_config')
+        )
+
         return conversations
 
 
@@ -26,6 +26,7 @@ from services.errors.app import MoreLikeThisDisabledError
 from services.errors.conversation import ConversationNotExistsError
 from services.errors.message import MessageNotExistsError
 from services.message_service import MessageService
+from services.prefetch_service import PrefetchService
 
 account_fields = {
     'id': fields.String,
@@ -127,6 +128,7 @@ class ChatMessageListApi(Resource):
                 has_more = True
 
         history_messages = list(reversed(history_messages))
+        PrefetchService.prefetch_messages(history_messages, relations=('feedbacks', 'annotation'))
 
         return InfiniteScrollPagination(
             data=history_messages,
@@ -163,8 +165,12 @@ class MessageFeedbackApi(Resource):
         feedback = message.admin_feedback
 
         if not args['rating'] and feedback:
+            message.conversation.count_feedback(feedback.from_source, feedback.rating, -1)
             db.session.delete(feedback)
         elif args['rating'] and feedback:
+            if feedback.rating != args['rating']:
+                message.conversation.count_feedback(feedback.from_source, feedback.rating, -1)
+                message.conversation.count_feedback(feedback.from_source, args['rating'])
             feedback.rating = args['rating']
         elif not args['rating'] and not feedback:
             raise ValueError('rating cannot be None when feedback not exists')
@@ -178,6 +184,7 @@ class MessageFeedbackApi(Resource):
                 from_account_id=current_user.id
             )
             db.session.add(feedback)
+            message.conversation.count_feedback(feedback.from_source, feedback.rating)
 
         db.session.commit()
 
@@ -29,6 +29,7 @@ from models.dataset import DatasetProcessRule, Dataset
 from models.dataset import Document, DocumentSegment
 from models.model import UploadFile
 from services.dataset_service import DocumentService, DatasetService
+from services.document_indexing_batch_service import DocumentIndexingBatchService
 from tasks.add_document_to_index_task import add_document_to_index_task
 from tasks.remove_document_from_index_task import remove_document_from_index_task
 
@@ -545,6 +546,12 @@ class DocumentBatchIndexingStatusApi(DocumentResource):
         data = {
             'data': documents_status
         }
+
+        # aggregated progress of batches fanned out to one indexing task per document
+        progress = DocumentIndexingBatchService.get_progress(dataset_id, batch)
+        if progress:
+            data['progress'] = progress
+
         return data
 
 
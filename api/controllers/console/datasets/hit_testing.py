@@ -47,7 +47,6 @@ segment_fields = {
     'completed_at': TimestampField,
     'error': fields.String,
     'stopped_at': TimestampField,
-    'document': fields.Nested(document_fields),
 }
 
 hit_testing_record_fields = {
@@ -95,7 +94,12 @@ class HitTestingApi(Resource):
                 limit=10,
             )
 
-            return {"query": response['query'], 'records': marshal(response['records'], hit_testing_record_fields)}
+            records = marshal(response['records'], hit_testing_record_fields)
+            # the documents are hydrated with the segments, the document property of the segment would query each
+            for record, hit_testing_record in zip(records, response['records']):
+                record['segment']['document'] = marshal(hit_testing_record['document'], document_fields)
+
+            return {"query": response['query'], 'records': records}
         except services.errors.index.IndexNotInitializedError:
             raise DatasetNotInitializedError()
         except ProviderTokenNotInitError as ex:
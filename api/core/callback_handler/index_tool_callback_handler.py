@@ -3,8 +3,7 @@ from typing import List
 from langchain.schema import Document
 
 from core.conversation_message_task import ConversationMessageTask
-from extensions.ext_database import db
-from models.dataset import DocumentSegment
+from services.segment_hit_count_service import SegmentHitCountService
 
 
 class DatasetIndexToolCallbackHandler:
@@ -16,19 +15,11 @@ class DatasetIndexToolCallbackHandler:
 
     def on_tool_end(self, documents: List[Document]) -> None:
         """Handle tool end."""
-        for document in documents:
-            doc_id = document.metadata['doc_id']
-
-            # add hit count to document segment
-            db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset_id,
-                DocumentSegment.index_node_id == doc_id
-            ).update(
-                {DocumentSegment.hit_count: DocumentSegment.hit_count + 1},
-                synchronize_session=False
-            )
-
-            db.session.commit()
+        # add hit count to document segment, flushed to the database by the periodic flush task
+        SegmentHitCountService.record_hits(
+            self.dataset_id,
+            [document.metadata['doc_id'] for document in documents]
+        )
 
     def return_retriever_resource_info(self, resource: List):
         """Handle return_retriever_resource_info."""
@@ -74,7 +74,7 @@ class ConversationMessageTask:
         if self.mode == 'chat':
             introduction = self.app_model_config.opening_statement
             if introduction:
-                prompt_template = JinjaPromptTemplate.from_template(template=introduction)
+                prompt_template = JinjaPromptTemplate.from_cached_template(template=introduction)
                 prompt_inputs = {k: self.inputs[k] for k in prompt_template.input_variables if k in self.inputs}
                 try:
                     introduction = prompt_template.format(**prompt_inputs)
@@ -171,16 +171,20 @@ class ConversationMessageTask:
         self.message.provider_response_latency = time.perf_counter() - self.start_at
         self.message.total_price = total_price
 
+        # counted right before the commit, the conversation row stays locked only for the commit, not the generation
+        self.conversation.count_message()
         db.session.commit()
 
-        message_was_created.send(
-            self.message,
-            conversation=self.conversation,
-            is_first_message=self.is_new_conversation
-        )
-
-        if not by_stopped:
-            self.end()
+        try:
+            # publish the end of the stream first, the post-answer hooks must not delay it
+            if not by_stopped:
+                self.end()
+        finally:
+            message_was_created.send(
+                self.message,
+                conversation=self.conversation,
+                is_first_message=self.is_new_conversation
+            )
 
     def init_chain(self, chain_result: ChainResult):
         message_chain = MessageChain(
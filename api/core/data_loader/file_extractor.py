@@ -1,20 +1,26 @@
 import tempfile
 from pathlib import Path
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Iterator
 
 import requests
-from langchain.document_loaders import TextLoader, Docx2txtLoader
+from langchain.document_loaders import Docx2txtLoader
+from langchain.document_loaders.base import BaseLoader
 from langchain.schema import Document
 
 from core.data_loader.loader.csv_loader import CSVLoader
 from core.data_loader.loader.excel import ExcelLoader
+from core.data_loader.loader.helpers import batch_documents
 from core.data_loader.loader.html import HTMLLoader
 from core.data_loader.loader.markdown import MarkdownLoader
 from core.data_loader.loader.pdf import PdfLoader
+from core.data_loader.loader.text import TextLoader
 from extensions.ext_storage import storage
 from models.model import UploadFile
 
 SUPPORT_URL_CONTENT_TYPES = ['application/pdf', 'text/plain']
+# loaders streaming the rows, pages or text blocks of a file with `lazy_load`
+STREAMING_LOADERS = (CSVLoader, ExcelLoader, PdfLoader, TextLoader)
+
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
 
@@ -42,11 +48,41 @@ class FileExtractor:
 
             return cls.load_from_file(file_path, return_text)
 
+    @classmethod
+    def lazy_load(cls, upload_file: UploadFile) -> Iterator[Document]:
+        """
+        Stream the documents of the upload file, the csv, excel, pdf and text loaders
+        yield the rows, pages or text blocks one by one instead of loading the whole file.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            suffix = Path(upload_file.key).suffix
+            file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{suffix}"
+            storage.download(upload_file.key, file_path)
+
+            loader = cls._get_loader(file_path, upload_file)
+            if isinstance(loader, STREAMING_LOADERS):
+                yield from loader.lazy_load()
+            else:
+                yield from loader.load()
+
+    @classmethod
+    def load_in_batches(cls, upload_file: UploadFile, batch_size: int) -> Iterator[List[Document]]:
+        """
+        Stream the documents of the upload file in batches of about `batch_size` characters.
+        """
+        yield from batch_documents(cls.lazy_load(upload_file), batch_size)
+
     @classmethod
     def load_from_file(cls, file_path: str, return_text: bool = False,
                        upload_file: Optional[UploadFile] = None) -> Union[List[Document] | str]:
-        input_file = Path(file_path)
         delimiter = '\n'
+        loader = cls._get_loader(file_path, upload_file)
+
+        return delimiter.join([document.page_content for document in loader.load()]) if return_text else loader.load()
+
+    @classmethod
+    def _get_loader(cls, file_path: str, upload_file: Optional[UploadFile] = None) -> BaseLoader:
+        input_file = Path(file_path)
         file_extension = input_file.suffix.lower()
         if file_extension == '.xlsx':
             loader = ExcelLoader(file_path)
@@ -64,4 +100,4 @@ class FileExtractor:
             # txt
             loader = TextLoader(file_path, autodetect_encoding=True)
 
-        return delimiter.join([document.page_content for document in loader.load()]) if return_text else loader.load()
+        return loader
@@ -1,11 +1,12 @@
 import logging
 import csv
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator
 
 from langchain.document_loaders import CSVLoader as LCCSVLoader
-from langchain.document_loaders.helpers import detect_file_encodings
 from langchain.schema import Document
 
+from core.data_loader.loader.helpers import resolve_file_encoding
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,27 +27,15 @@ class CSVLoader(LCCSVLoader):
 
     def load(self) -> List[Document]:
         """Load data into document objects."""
-        try:
-            with open(self.file_path, newline="", encoding=self.encoding) as csvfile:
-                docs = self._read_from_file(csvfile)
-        except UnicodeDecodeError as e:
-            if self.autodetect_encoding:
-                detected_encodings = detect_file_encodings(self.file_path)
-                for encoding in detected_encodings:
-                    logger.debug("Trying encoding: ", encoding.encoding)
-                    try:
-                        with open(self.file_path, newline="", encoding=encoding.encoding) as csvfile:
-                            docs = self._read_from_file(csvfile)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-            else:
-                raise RuntimeError(f"Error loading {self.file_path}") from e
+        return list(self.lazy_load())
 
-        return docs
+    def lazy_load(self) -> Iterator[Document]:
+        """Load the rows one by one, the file is never read into memory at once."""
+        encoding = resolve_file_encoding(self.file_path, self.encoding, self.autodetect_encoding)
+        with open(self.file_path, newline="", encoding=encoding) as csvfile:
+            yield from self._read_from_file(csvfile)
 
-    def _read_from_file(self, csvfile):
-        docs = []
+    def _read_from_file(self, csvfile) -> Iterator[Document]:
         csv_reader = csv.DictReader(csvfile, **self.csv_args)  # type: ignore
         for i, row in enumerate(csv_reader):
             content = "\n".join(f"{k.strip()}: {v.strip()}" for k, v in row.items())
@@ -61,7 +50,4 @@ class CSVLoader(LCCSVLoader):
                     f"Source column '{self.source_column}' not found in CSV file."
                 )
             metadata = {"source": source, "row": i}
-            doc = Document(page_content=content, metadata=metadata)
-            docs.append(doc)
-
-        return docs
+            yield Document(page_content=content, metadata=metadata)
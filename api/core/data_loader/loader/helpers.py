@@ -0,0 +1,76 @@
+import codecs
+import locale
+from typing import Iterable, Iterator, List, Optional
+
+from langchain.document_loaders.helpers import detect_file_encodings
+from langchain.schema import Document
+
+# bytes decoded at once when a file encoding is checked
+DECODE_BLOCK_SIZE = 1024 * 1024
+
+
+def is_file_decodable(file_path: str, encoding: Optional[str]) -> bool:
+    """
+    Check that the whole file can be decoded with the encoding, the file is decoded block by block.
+
+    :param file_path: file path
+    :param encoding: encoding, None for the default encoding of `open`
+    :return: whether the file can be decoded
+    """
+    decoder = codecs.getincrementaldecoder(encoding or locale.getpreferredencoding(False))()
+    try:
+        with open(file_path, 'rb') as f:
+            while True:
+                block = f.read(DECODE_BLOCK_SIZE)
+                if not block:
+                    decoder.decode(b'', final=True)
+                    return True
+
+                decoder.decode(block)
+    except UnicodeDecodeError:
+        return False
+
+
+def resolve_file_encoding(file_path: str, encoding: Optional[str], autodetect_encoding: bool) -> Optional[str]:
+    """
+    Resolve the encoding a file is streamed with.
+    The encoding is checked before the file is streamed, a decoding error must not surface
+    after part of the file has already been yielded.
+
+    :param file_path: file path
+    :param encoding: preferred encoding, None for the default encoding of `open`
+    :param autodetect_encoding: try the detected encodings if the preferred encoding fails
+    :return: encoding
+    """
+    if is_file_decodable(file_path, encoding):
+        return encoding
+
+    if autodetect_encoding:
+        for detected_encoding in detect_file_encodings(file_path):
+            if is_file_decodable(file_path, detected_encoding.encoding):
+                return detected_encoding.encoding
+
+    raise RuntimeError(f"Error loading {file_path}")
+
+
+def batch_documents(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    """
+    Group streamed documents into batches of about `batch_size` characters.
+
+    :param documents: documents, e.g. the pages or rows of a lazy loader
+    :param batch_size: max characters of a batch, a larger document is a batch of its own
+    :return: batches of documents
+    """
+    batch = []
+    batch_chars = 0
+    for document in documents:
+        if batch and batch_chars + len(document.page_content) > batch_size:
+            yield batch
+            batch = []
+            batch_chars = 0
+
+        batch.append(document)
+        batch_chars += len(document.page_content)
+
+    if batch:
+        yield batch
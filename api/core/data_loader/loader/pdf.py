@@ -1,8 +1,9 @@
 import logging
-from typing import List, Optional
+from typing import List, Optional, Iterator
 
-from langchain.document_loaders import PyPDFium2Loader
 from langchain.document_loaders.base import BaseLoader
+from langchain.document_loaders.blob_loaders import Blob
+from langchain.document_loaders.parsers.pdf import PyPDFium2Parser
 from langchain.schema import Document
 
 from extensions.ext_storage import storage
@@ -29,27 +30,31 @@ class PdfLoader(BaseLoader):
         self._upload_file = upload_file
 
     def load(self) -> List[Document]:
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Load the pages one by one, the extracted text is cached as a plaintext file."""
         plaintext_file_key = ''
-        plaintext_file_exists = False
         if self._upload_file:
             if self._upload_file.hash:
                 plaintext_file_key = 'upload_files/' + self._upload_file.tenant_id + '/' \
                                      + self._upload_file.hash + '.0625.plaintext'
                 try:
                     text = storage.load(plaintext_file_key).decode('utf-8')
-                    plaintext_file_exists = True
-                    return [Document(page_content=text)]
                 except FileNotFoundError:
-                    pass
-        documents = PyPDFium2Loader(file_path=self._file_path).load()
-        text_list = []
-        for document in documents:
-            text_list.append(document.page_content)
-        text = "\n\n".join(text_list)
+                    text = None
 
-        # save plaintext file for caching
-        if not plaintext_file_exists and plaintext_file_key:
-            storage.save(plaintext_file_key, text.encode('utf-8'))
+                if text is not None:
+                    yield Document(page_content=text)
+                    return
 
-        return documents
+        # PyPDFium2Loader.lazy_load parses all pages eagerly, parse the blob lazily
+        text_list = []
+        for document in PyPDFium2Parser().lazy_parse(Blob.from_path(self._file_path)):
+            if plaintext_file_key:
+                text_list.append(document.page_content)
+            yield document
 
+        # save plaintext file for caching
+        if plaintext_file_key:
+            storage.save(plaintext_file_key, "\n\n".join(text_list).encode('utf-8'))
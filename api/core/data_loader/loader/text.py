@@ -0,0 +1,46 @@
+from typing import Iterator, Optional
+
+from langchain.document_loaders import TextLoader as LCTextLoader
+from langchain.schema import Document
+
+from core.data_loader.loader.helpers import resolve_file_encoding
+
+# characters of a streamed text block
+TEXT_BLOCK_SIZE = 1024 * 1024
+
+
+class TextLoader(LCTextLoader):
+    """Load text files, `lazy_load` streams a large file in blocks of paragraphs."""
+
+    def __init__(
+            self,
+            file_path: str,
+            encoding: Optional[str] = None,
+            autodetect_encoding: bool = False,
+            block_size: int = TEXT_BLOCK_SIZE
+    ):
+        super().__init__(file_path, encoding=encoding, autodetect_encoding=autodetect_encoding)
+        self.block_size = block_size
+
+    def lazy_load(self) -> Iterator[Document]:
+        """
+        Load the text in blocks of about `block_size` characters.
+        A block is cut after a blank line, so paragraphs stay in one block,
+        text without blank lines is cut after any line once the block is twice the block size.
+        """
+        encoding = resolve_file_encoding(self.file_path, self.encoding, self.autodetect_encoding)
+        metadata = {"source": self.file_path}
+
+        lines = []
+        block_chars = 0
+        with open(self.file_path, encoding=encoding) as f:
+            for line in f:
+                lines.append(line)
+                block_chars += len(line)
+                if (block_chars >= self.block_size and not line.strip()) or block_chars >= 2 * self.block_size:
+                    yield Document(page_content=''.join(lines), metadata=dict(metadata))
+                    lines = []
+                    block_chars = 0
+
+        if lines:
+            yield Document(page_content=''.join(lines), metadata=dict(metadata))
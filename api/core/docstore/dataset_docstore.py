@@ -7,6 +7,9 @@ from core.model_providers.model_factory import ModelFactory
 from extensions.ext_database import db
 from models.dataset import Dataset, DocumentSegment
 
+# max number of segments loaded, inserted or updated with one statement
+SEGMENT_BATCH_SIZE = 500
+
 
 class DatesetDocumentStore:
     def __init__(
@@ -79,45 +82,64 @@ class DatesetDocumentStore:
             if not isinstance(doc, Document):
                 raise ValueError("doc must be a Document")
 
-            segment_document = self.get_document(doc_id=doc.metadata['doc_id'], raise_error=False)
+        for i in range(0, len(docs), SEGMENT_BATCH_SIZE):
+            batch_docs = docs[i:i + SEGMENT_BATCH_SIZE]
 
-            # NOTE: doc could already exist in the store, but we overwrite it
-            if not allow_update and segment_document:
-                raise ValueError(
-                    f"doc_id {doc.metadata['doc_id']} already exists. "
-                    "Set allow_update to True to overwrite."
-                )
+            # preload the existing segments of the batch with one query
+            segment_documents = self.get_document_segments([doc.metadata['doc_id'] for doc in batch_docs])
 
             # calc embedding use tokens
-            tokens = embedding_model.get_num_tokens(doc.page_content) if embedding_model else 0
-
-            if not segment_document:
-                max_position += 1
-
-                segment_document = DocumentSegment(
-                    tenant_id=self._dataset.tenant_id,
-                    dataset_id=self._dataset.id,
-                    document_id=self._document_id,
-                    index_node_id=doc.metadata['doc_id'],
-                    index_node_hash=doc.metadata['doc_hash'],
-                    position=max_position,
-                    content=doc.page_content,
-                    word_count=len(doc.page_content),
-                    tokens=tokens,
-                    enabled=False,
-                    created_by=self._user_id,
-                )
-                if 'answer' in doc.metadata and doc.metadata['answer']:
-                    segment_document.answer = doc.metadata.pop('answer', '')
-
-                db.session.add(segment_document)
-            else:
-                segment_document.content = doc.page_content
+            batch_tokens = embedding_model.get_num_tokens_batch([doc.page_content for doc in batch_docs]) \
+                if embedding_model else [0] * len(batch_docs)
+
+            new_segments = {}
+            updated_segments = []
+            for doc, tokens in zip(batch_docs, batch_tokens):
+                doc_id = doc.metadata['doc_id']
+                segment_document = segment_documents.get(doc_id)
+
+                # NOTE: doc could already exist in the store, but we overwrite it
+                if not allow_update and (segment_document or doc_id in new_segments):
+                    raise ValueError(
+                        f"doc_id {doc_id} already exists. "
+                        "Set allow_update to True to overwrite."
+                    )
+
+                segment = {
+                    'content': doc.page_content,
+                    'index_node_hash': doc.metadata['doc_hash'],
+                    'word_count': len(doc.page_content),
+                    'tokens': tokens,
+                }
                 if 'answer' in doc.metadata and doc.metadata['answer']:
-                    segment_document.answer = doc.metadata.pop('answer', '')
-                segment_document.index_node_hash = doc.metadata['doc_hash']
-                segment_document.word_count = len(doc.page_content)
-                segment_document.tokens = tokens
+                    segment['answer'] = doc.metadata.pop('answer', '')
+                if 'source_hash' in doc.metadata:
+                    segment['source_hash'] = doc.metadata.pop('source_hash')
+
+                if segment_document:
+                    segment['id'] = segment_document.id
+                    updated_segments.append(segment)
+                elif doc_id in new_segments:
+                    # the same doc id earlier in the batch, overwrite the pending insert
+                    new_segments[doc_id].update(segment)
+                else:
+                    max_position += 1
+
+                    segment.update({
+                        'tenant_id': self._dataset.tenant_id,
+                        'dataset_id': self._dataset.id,
+                        'document_id': self._document_id,
+                        'index_node_id': doc_id,
+                        'position': max_position,
+                        'enabled': False,
+                        'created_by': self._user_id,
+                    })
+                    new_segments[doc_id] = segment
+
+            if new_segments:
+                db.session.bulk_insert_mappings(DocumentSegment, list(new_segments.values()))
+            if updated_segments:
+                db.session.bulk_update_mappings(DocumentSegment, updated_segments)
 
             db.session.commit()
 
@@ -185,3 +207,15 @@ class DatesetDocumentStore:
         ).first()
 
         return document_segment
+
+    def get_document_segments(self, doc_ids: Sequence[str]) -> Dict[str, DocumentSegment]:
+        """Get the segments of the given doc_ids with one query, keyed by doc_id."""
+        if not doc_ids:
+            return {}
+
+        document_segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self._dataset.id,
+            DocumentSegment.index_node_id.in_(doc_ids)
+        ).all()
+
+        return {document_segment.index_node_id: document_segment for document_segment in document_segments}
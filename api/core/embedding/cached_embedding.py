@@ -1,15 +1,23 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 from langchain.embeddings.base import Embeddings
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
+from core.embedding.query_embedding_cache import get_query_embedding_cache
 from core.model_providers.models.embedding.base import BaseEmbedding
 from extensions.ext_database import db
 from libs import helper
 from models.dataset import Embedding
 
+# max number of hashes sent in one `IN (...)` lookup against the embeddings table
+CACHE_LOOKUP_BATCH_SIZE = 500
+
+# fallback batch size for providers whose client does not expose `chunk_size`
+DEFAULT_EMBEDDING_BATCH_SIZE = 16
+
 
 class CacheEmbedding(Embeddings):
     def __init__(self, embeddings: BaseEmbedding):
@@ -18,53 +26,55 @@ class CacheEmbedding(Embeddings):
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed search docs."""
         # use doc embedding cache or store if not exists
-        text_embeddings = []
-        embedding_queue_texts = []
-        for text in texts:
-            hash = helper.generate_text_hash(text)
-            embedding = db.session.query(Embedding).filter_by(model_name=self._embeddings.name, hash=hash).first()
-            if embedding:
-                text_embeddings.append(embedding.get_embedding())
-            else:
-                embedding_queue_texts.append(text)
-
-        if embedding_queue_texts:
-            try:
-                embedding_results = self._embeddings.client.embed_documents(embedding_queue_texts)
-            except Exception as ex:
-                raise self._embeddings.handle_exceptions(ex)
-            i = 0
-            normalized_embedding_results = []
-            for text in embedding_queue_texts:
-                hash = helper.generate_text_hash(text)
+        hashes = [helper.generate_text_hash(text) for text in texts]
+        cached_embeddings = self._get_cached_embeddings(set(hashes))
+
+        text_embeddings: List[Optional[List[float]]] = [cached_embeddings.get(hash) for hash in hashes]
+
+        # the same text may appear several times in one call, embed it only once
+        embedding_queue_indices = {}
+        for i, hash in enumerate(hashes):
+            if text_embeddings[i] is None and hash not in embedding_queue_indices:
+                embedding_queue_indices[hash] = i
 
+        if embedding_queue_indices:
+            embedding_queue_hashes = list(embedding_queue_indices.keys())
+            embedding_queue_texts = [texts[embedding_queue_indices[hash]] for hash in embedding_queue_hashes]
+
+            normalized_embedding_results = {}
+            batch_size = self._get_embedding_batch_size()
+            for i in range(0, len(embedding_queue_texts), batch_size):
+                batch_texts = embedding_queue_texts[i:i + batch_size]
                 try:
-                    embedding = Embedding(model_name=self._embeddings.name, hash=hash)
-                    vector = embedding_results[i]
-                    normalized_embedding = (vector / np.linalg.norm(vector)).tolist()
-                    normalized_embedding_results.append(normalized_embedding)
-                    embedding.set_embedding(normalized_embedding)
-                    db.session.add(embedding)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
-                    continue
-                except:
-                    logging.exception('Failed to add embedding to db')
-                    continue
-                finally:
-                    i += 1
-
-            text_embeddings.extend(normalized_embedding_results)
+                    embedding_results = self._embeddings.client.embed_documents(batch_texts)
+                except Exception as ex:
+                    raise self._embeddings.handle_exceptions(ex)
+
+                for hash, vector in zip(embedding_queue_hashes[i:i + batch_size], embedding_results):
+                    normalized_embedding_results[hash] = (vector / np.linalg.norm(vector)).tolist()
+
+            self._save_embeddings(normalized_embedding_results)
+
+            for i, hash in enumerate(hashes):
+                if text_embeddings[i] is None:
+                    text_embeddings[i] = normalized_embedding_results[hash]
+
         return text_embeddings
 
     def embed_query(self, text: str) -> List[float]:
         """Embed query text."""
         # use doc embedding cache or store if not exists
         hash = helper.generate_text_hash(text)
+        query_embedding_cache = get_query_embedding_cache()
+        embedding_results = query_embedding_cache.get(self._embeddings.name, hash)
+        if embedding_results is not None:
+            return embedding_results
+
         embedding = db.session.query(Embedding).filter_by(model_name=self._embeddings.name, hash=hash).first()
         if embedding:
-            return embedding.get_embedding()
+            embedding_results = embedding.get_embedding()
+            query_embedding_cache.set(self._embeddings.name, hash, embedding_results)
+            return embedding_results
 
         try:
             embedding_results = self._embeddings.client.embed_query(text)
@@ -82,5 +92,62 @@ class CacheEmbedding(Embeddings):
         except:
             logging.exception('Failed to add embedding to db')
 
+        query_embedding_cache.set(self._embeddings.name, hash, embedding_results)
+
         return embedding_results
 
+    def _get_cached_embeddings(self, hashes: set[str]) -> dict[str, List[float]]:
+        """
+        Fetch cached embeddings with one `IN (...)` query per batch of hashes.
+
+        :param hashes: text hashes
+        :return: hash -> embedding
+        """
+        hashes = list(hashes)
+        cached_embeddings = {}
+        for i in range(0, len(hashes), CACHE_LOOKUP_BATCH_SIZE):
+            embeddings = db.session.query(Embedding).filter(
+                Embedding.model_name == self._embeddings.name,
+                Embedding.hash.in_(hashes[i:i + CACHE_LOOKUP_BATCH_SIZE])
+            ).all()
+
+            for embedding in embeddings:
+                cached_embeddings[embedding.hash] = embedding.get_embedding()
+
+        return cached_embeddings
+
+    def _save_embeddings(self, embeddings: dict[str, List[float]]):
+        """
+        Bulk upsert new embeddings, rows that were inserted concurrently are kept as is.
+
+        :param embeddings: hash -> normalized embedding
+        """
+        if not embeddings:
+            return
+
+        values = []
+        for hash, vector in embeddings.items():
+            embedding = Embedding(model_name=self._embeddings.name, hash=hash)
+            embedding.set_embedding(vector)
+            values.append({
+                'model_name': embedding.model_name,
+                'hash': embedding.hash,
+                'embedding': embedding.embedding
+            })
+
+        try:
+            for i in range(0, len(values), CACHE_LOOKUP_BATCH_SIZE):
+                stmt = insert(Embedding).values(values[i:i + CACHE_LOOKUP_BATCH_SIZE]) \
+                    .on_conflict_do_nothing(index_elements=['model_name', 'hash'])
+                db.session.execute(stmt)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            logging.exception('Failed to add embeddings to db')
+
+    def _get_embedding_batch_size(self) -> int:
+        batch_size = getattr(self._embeddings.client, 'chunk_size', None)
+        if not isinstance(batch_size, int) or batch_size <= 0:
+            batch_size = DEFAULT_EMBEDDING_BATCH_SIZE
+
+        return batch_size
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from cachetools import TTLCache
+from flask import current_app
+
+from extensions.ext_redis import redis_client
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache for query embeddings.
+
+    The first tier is a bounded in-process LRU (with TTL), the second tier is shared through Redis
+    and stores the embedding as packed float32 bytes.
+    The Redis tier is bounded by a sorted set index of cached keys scored by their last use,
+    the least recently used keys are evicted first.
+    """
+
+    redis_key_prefix = 'query_embedding_cache'
+
+    def __init__(self, local_maxsize: int, local_ttl: int, redis_maxsize: int, redis_ttl: int):
+        self._lock = threading.Lock()
+        self._local_cache = TTLCache(maxsize=local_maxsize, ttl=local_ttl) if local_maxsize > 0 else None
+        self._redis_maxsize = redis_maxsize
+        self._redis_ttl = redis_ttl
+        self._redis_index_key = f'{self.redis_key_prefix}:index'
+        self._stats = {
+            'local_hits': 0,
+            'local_misses': 0,
+            'redis_hits': 0,
+            'redis_misses': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config) -> 'QueryEmbeddingCache':
+        return cls(
+            local_maxsize=int(config.get('EMBEDDING_QUERY_CACHE_LOCAL_MAXSIZE', 1000)),
+            local_ttl=int(config.get('EMBEDDING_QUERY_CACHE_LOCAL_TTL', 600)),
+            redis_maxsize=int(config.get('EMBEDDING_QUERY_CACHE_REDIS_MAXSIZE', 100000)),
+            redis_ttl=int(config.get('EMBEDDING_QUERY_CACHE_REDIS_TTL', 3600)),
+        )
+
+    def get(self, model_name: str, hash: str) -> Optional[List[float]]:
+        key = (model_name, hash)
+        if self._local_cache is not None:
+            with self._lock:
+                embedding = self._local_cache.get(key)
+                if embedding is not None:
+                    self._stats['local_hits'] += 1
+                    return embedding
+
+                self._stats['local_misses'] += 1
+
+        if self._redis_maxsize <= 0:
+            return None
+
+        redis_key = self._redis_key(model_name, hash)
+        try:
+            # a hit is moved to the end of the eviction order and its expiry is renewed,
+            # the commands are no-ops for a missing key, so they are sent with the get in one round trip
+            pipeline = redis_client.pipeline()
+            pipeline.get(redis_key)
+            pipeline.expire(redis_key, self._redis_ttl)
+            pipeline.zadd(self._redis_index_key, {redis_key: time.time()}, xx=True)
+            packed_embedding = pipeline.execute()[0]
+        except Exception:
+            logging.exception('Failed to get query embedding from redis')
+            return None
+
+        with self._lock:
+            if not packed_embedding:
+                self._stats['redis_misses'] += 1
+                return None
+
+            self._stats['redis_hits'] += 1
+
+        embedding = np.frombuffer(packed_embedding, dtype='<f4').tolist()
+        self._set_local(key, embedding)
+        return embedding
+
+    def set(self, model_name: str, hash: str, embedding: List[float]):
+        self._set_local((model_name, hash), embedding)
+
+        if self._redis_maxsize <= 0:
+            return
+
+        redis_key = self._redis_key(model_name, hash)
+        try:
+            pipeline = redis_client.pipeline()
+            pipeline.setex(redis_key, self._redis_ttl, np.asarray(embedding, dtype='<f4').tobytes())
+            pipeline.zadd(self._redis_index_key, {redis_key: time.time()})
+            # drop index entries whose keys have already expired
+            pipeline.zremrangebyscore(self._redis_index_key, '-inf', time.time() - self._redis_ttl)
+            pipeline.zcard(self._redis_index_key)
+            cached_count = pipeline.execute()[-1]
+
+            if cached_count > self._redis_maxsize:
+                evicted_keys = [key for key, _ in redis_client.zpopmin(self._redis_index_key,
+                                                                       cached_count - self._redis_maxsize)]
+                if evicted_keys:
+                    redis_client.delete(*evicted_keys)
+        except Exception:
+            logging.exception('Failed to set query embedding to redis')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _set_local(self, key: tuple, embedding: List[float]):
+        if self._local_cache is not None:
+            with self._lock:
+                self._local_cache[key] = embedding
+
+    def _redis_key(self, model_name: str, hash: str) -> str:
+        return f'{self.redis_key_prefix}:{model_name}:{hash}'
+
+
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+_query_embedding_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        with _query_embedding_cache_lock:
+            if _query_embedding_cache is None:
+                _query_embedding_cache = QueryEmbeddingCache.from_config(current_app.config)
+
+    return _query_embedding_cache
@@ -1,10 +1,21 @@
 import base64
+import hashlib
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
 
 from extensions.ext_database import db
 from libs import rsa
 
 from models.account import Tenant
 
+# decrypted tokens are only kept in process memory for a short time, keyed by tenant and a hash of the
+# encrypted token, so credentials that are saved again (and re-encrypted) never hit a stale entry
+DECRYPTED_TOKEN_CACHE_TTL = 60
+_decrypted_token_cache = TTLCache(maxsize=10000, ttl=DECRYPTED_TOKEN_CACHE_TTL)
+_decrypted_token_cache_lock = threading.Lock()
+
 
 def obfuscated_token(token: str):
     return token[:6] + '*' * (len(token) - 8) + token[-2:]
@@ -17,4 +28,26 @@ def encrypt_token(tenant_id: str, token: str):
 
 
 def decrypt_token(tenant_id: str, token: str):
-    return rsa.decrypt(base64.b64decode(token), tenant_id)
+    cache_key = (tenant_id, hashlib.sha256(token.encode()).hexdigest())
+    with _decrypted_token_cache_lock:
+        decrypted_token = _decrypted_token_cache.get(cache_key)
+
+    if decrypted_token is None:
+        decrypted_token = rsa.decrypt(base64.b64decode(token), tenant_id)
+        with _decrypted_token_cache_lock:
+            _decrypted_token_cache[cache_key] = decrypted_token
+
+    return decrypted_token
+
+
+def invalidate_decrypted_tokens(tenant_id: Optional[str] = None):
+    """
+    Drop the decrypted tokens of the tenant, or of all tenants, from the cache of this process.
+    """
+    with _decrypted_token_cache_lock:
+        if tenant_id is None:
+            _decrypted_token_cache.clear()
+            return
+
+        for cache_key in [cache_key for cache_key in _decrypted_token_cache.keys() if cache_key[0] == tenant_id]:
+            _decrypted_token_cache.pop(cache_key, None)
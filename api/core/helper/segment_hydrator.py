@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from extensions.ext_database import db
+from models.dataset import DocumentSegment, Document
+
+
+@dataclass
+class HydratedSegment:
+    segment: DocumentSegment
+    document: Optional[Document]
+
+    @property
+    def document_available(self) -> bool:
+        return self.document is not None and self.document.enabled and not self.document.archived
+
+
+class SegmentHydrator:
+    """
+    Loads the retrieved segments of a dataset together with their documents.
+
+    Segments and documents are fetched with a single joined query keyed by the index node ids
+    returned by the vector search, the hydrated segments keep the rank order of the index node ids.
+    """
+
+    @classmethod
+    def hydrate(cls, dataset_id: str, index_node_ids: List[str]) -> List[HydratedSegment]:
+        """
+        Hydrate the available segments of the index node ids.
+
+        :param dataset_id: dataset id
+        :param index_node_ids: index node ids in rank order
+        :return: hydrated segments in rank order, unavailable segments are skipped
+        """
+        if not index_node_ids:
+            return []
+
+        rows = db.session.query(DocumentSegment, Document).outerjoin(
+            Document, Document.id == DocumentSegment.document_id
+        ).filter(
+            DocumentSegment.dataset_id == dataset_id,
+            DocumentSegment.completed_at.isnot(None),
+            DocumentSegment.status == 'completed',
+            DocumentSegment.enabled == True,
+            DocumentSegment.index_node_id.in_(index_node_ids)
+        ).all()
+
+        hydrated_segments = {
+            segment.index_node_id: HydratedSegment(segment=segment, document=document)
+            for segment, document in rows
+        }
+
+        return [hydrated_segments[index_node_id] for index_node_id in dict.fromkeys(index_node_ids)
+                if index_node_id in hydrated_segments]
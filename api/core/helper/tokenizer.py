@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import tiktoken
+from cachetools import LRUCache
+from langchain.schema.language_model import _get_token_ids_default_method
+
+# max number of memoized token counts
+TOKEN_COUNT_CACHE_MAXSIZE = 10000
+
+# threads used by tiktoken to encode a batch of texts
+ENCODE_BATCH_NUM_THREADS = 8
+
+
+class TokenizerService:
+    """
+    Shared token counting.
+
+    tiktoken encoders are resolved once per model, and token counts are memoized by content hash
+    in a bounded LRU, so the same prompt or chunk counted again on a hot path is not re-encoded.
+    Texts without a tiktoken model are counted with the default GPT-2 tokenizer of langchain.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_COUNT_CACHE_MAXSIZE):
+        self._lock = threading.Lock()
+        self._encodings = {}
+        self._counts = LRUCache(maxsize=maxsize)
+
+    def get_encoding(self, model_name: str) -> tiktoken.Encoding:
+        encoding = self._encodings.get(model_name)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                encoding = tiktoken.get_encoding('cl100k_base')
+
+            self._encodings[model_name] = encoding
+
+        return encoding
+
+    def count_token(self, text: str, model_name: Optional[str] = None) -> int:
+        return self.count_tokens([text], model_name)[0]
+
+    def count_tokens(self, texts: List[str], model_name: Optional[str] = None) -> List[int]:
+        """
+        Count the tokens of each text, the texts that are not memoized are encoded in one batch.
+
+        :param texts: texts
+        :param model_name: tiktoken model name, None for the default GPT-2 tokenizer
+        :return: token count of each text
+        """
+        namespace = model_name or 'gpt2'
+        keys = [self._key(namespace, text) if text else None for text in texts]
+        counts = [0] * len(texts)
+
+        missed_indices = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key is None:
+                    continue
+
+                count = self._counts.get(key)
+                if count is not None:
+                    counts[i] = count
+                elif key not in missed_indices:
+                    missed_indices[key] = i
+
+        if not missed_indices:
+            return counts
+
+        missed_texts = [texts[i] for i in missed_indices.values()]
+        if model_name:
+            encoding = self.get_encoding(model_name)
+            if len(missed_texts) > 1:
+                missed_counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(
+                    missed_texts, num_threads=ENCODE_BATCH_NUM_THREADS)]
+            else:
+                missed_counts = [len(encoding.encode_ordinary(missed_texts[0]))]
+        else:
+            missed_counts = [len(_get_token_ids_default_method(text)) for text in missed_texts]
+
+        missed_key_counts = dict(zip(missed_indices.keys(), missed_counts))
+        with self._lock:
+            for key, count in missed_key_counts.items():
+                self._counts[key] = count
+
+        for i, key in enumerate(keys):
+            if key in missed_key_counts:
+                counts[i] = missed_key_counts[key]
+
+        return counts
+
+    def memoize(self, namespace: str, text: str, count_func: Callable[[], int]) -> int:
+        """
+        Memoize a token count computed by a provider specific tokenizer.
+
+        :param namespace: tokenizer namespace, e.g. the model name
+        :param text: content the count is computed from
+        :param count_func: computes the count on a miss
+        :return: token count
+        """
+        key = self._key(namespace, text, kind='memoize')
+        with self._lock:
+            count = self._counts.get(key)
+
+        if count is None:
+            count = count_func()
+            with self._lock:
+                self._counts[key] = count
+
+        return count
+
+    def prime(self, text_counts: List[Tuple[str, int]], model_name: Optional[str] = None) -> None:
+        """
+        Memoize token counts that are already known, e.g. the counts of split chunks.
+
+        :param text_counts: texts and their token counts
+        :param model_name: tiktoken model name, None for the default GPT-2 tokenizer
+        """
+        namespace = model_name or 'gpt2'
+        with self._lock:
+            for text, count in text_counts:
+                if text:
+                    self._counts[self._key(namespace, text)] = count
+
+    @staticmethod
+    def _key(namespace: str, text: str, kind: str = 'count') -> tuple:
+        # memoized provider counts never collide with tiktoken counts, even in a namespace named after the model
+        return kind, namespace, hashlib.sha256(text.encode()).hexdigest()
+
+
+tokenizer_service = TokenizerService()
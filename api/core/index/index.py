@@ -39,7 +39,8 @@ class IndexBuilder:
             return KeywordTableIndex(
                 dataset=dataset,
                 config=KeywordTableConfig(
-                    max_keywords_per_chunk=10
+                    max_keywords_per_chunk=10,
+                    max_workers=int(current_app.config.get('KEYWORD_EXTRACTION_MAX_WORKERS', 0))
                 )
             )
         else:
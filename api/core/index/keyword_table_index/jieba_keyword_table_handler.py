@@ -1,11 +1,109 @@
+import atexit
+import logging
+import multiprocessing
+import os
 import re
-from typing import Set
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Set, Tuple, Dict, List, Optional, Callable
 
+import billiard
 import jieba
 from jieba.analyse import default_tfidf
 
 from core.index.keyword_table_index.stopwords import STOPWORDS
 
+# batches smaller than this are extracted in the current process, the pool overhead is not worth it
+MIN_PARALLEL_BATCH_SIZE = 16
+
+# seconds to wait for the keywords of a chunk of texts from the pool before falling back to serial extraction
+POOL_MAP_TIMEOUT = 600
+
+_process_pool = None
+_process_pool_key: Optional[Tuple[int, int]] = None
+_process_pool_lock = threading.Lock()
+
+
+def _init_keyword_extraction_worker():
+    # load the jieba dictionary and the tfidf stop words once per worker process
+    jieba.initialize()
+    default_tfidf.stop_words = STOPWORDS
+
+
+def _batch_extract_keywords_with_frequencies(texts: List[str],
+                                             max_keywords_per_chunk: int) -> List[Tuple[Dict[str, int], int]]:
+    keyword_table_handler = JiebaKeywordTableHandler()
+    return [keyword_table_handler.extract_keywords_with_frequencies(text, max_keywords_per_chunk) for text in texts]
+
+
+def _get_process_pool(max_workers: int):
+    """
+    Get the keyword extraction pool of the current process, a pool inherited by a forked process is replaced.
+
+    Processes of prefork celery workers are daemonic and may not start multiprocessing children, they get a
+    billiard pool, which allows it. Its workers are forked from the task process, which runs no gevent hub.
+    Other processes, e.g. gevent celery workers, get a pool of spawned processes, which do not inherit
+    the gevent hub, threads or connections of the process.
+    """
+    global _process_pool, _process_pool_key
+    with _process_pool_lock:
+        pool_key = (os.getpid(), max_workers)
+        if _process_pool is None or _process_pool_key != pool_key:
+            if _process_pool is not None and _process_pool_key[0] == os.getpid():
+                _shutdown_process_pool(_process_pool)
+
+            if multiprocessing.current_process().daemon:
+                _process_pool = billiard.Pool(
+                    processes=max_workers,
+                    initializer=_init_keyword_extraction_worker
+                )
+            else:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_keyword_extraction_worker
+                )
+            _process_pool_key = pool_key
+
+        return _process_pool
+
+
+def _run_in_process_pool(process_pool, func: Callable, args_list: List[tuple]) -> list:
+    """
+    Run the function with each args in the pool, the results keep the order of the args.
+    Billiard tasks are applied one by one, its workers only account for the results of applied tasks
+    and wait for the unaccounted results of a map when they exit.
+    """
+    if isinstance(process_pool, ProcessPoolExecutor):
+        futures = [process_pool.submit(func, *args) for args in args_list]
+        return [future.result(timeout=POOL_MAP_TIMEOUT) for future in futures]
+
+    async_results = [process_pool.apply_async(func, args) for args in args_list]
+    return [async_result.get(timeout=POOL_MAP_TIMEOUT) for async_result in async_results]
+
+
+def _shutdown_process_pool(process_pool):
+    if isinstance(process_pool, ProcessPoolExecutor):
+        process_pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        process_pool.terminate()
+
+
+@atexit.register
+def _reset_process_pool():
+    global _process_pool, _process_pool_key
+    # the forked pool workers inherit the lock held while they are started, they own no pool
+    if _process_pool is None or _process_pool_key[0] != os.getpid():
+        return
+
+    with _process_pool_lock:
+        if _process_pool is not None and _process_pool_key[0] == os.getpid():
+            _shutdown_process_pool(_process_pool)
+
+        _process_pool = None
+        _process_pool_key = None
+
 
 class JiebaKeywordTableHandler:
 
@@ -21,6 +119,67 @@ class JiebaKeywordTableHandler:
 
         return set(self._expand_tokens_with_subtokens(keywords))
 
+    def extract_keywords_with_frequencies(self, text: str,
+                                          max_keywords_per_chunk: int = 10) -> Tuple[Dict[str, int], int]:
+        """
+        Extract keywords with JIEBA tfidf, together with the term frequency of each keyword in the text.
+
+        :param text: text
+        :param max_keywords_per_chunk: max keywords
+        :return: keyword -> term frequency, text length in tokens
+        """
+        keywords = self.extract_keywords(text, max_keywords_per_chunk)
+
+        return self.get_keyword_frequencies(text, keywords)
+
+    def batch_extract_keywords_with_frequencies(self, texts: List[str], max_keywords_per_chunk: int = 10,
+                                                max_workers: int = 0) -> List[Tuple[Dict[str, int], int]]:
+        """
+        Extract keywords with term frequencies for many texts, fanned out over a process pool.
+        Results keep the order of the texts and are the same as calling `extract_keywords_with_frequencies`
+        for each text, the extraction falls back to the current process if the pool fails.
+
+        :param texts: texts
+        :param max_keywords_per_chunk: max keywords per text
+        :param max_workers: max worker processes, 0 to extract in the current process
+        :return: list of (keyword -> term frequency, text length in tokens)
+        """
+        if max_workers > 0 and len(texts) >= MIN_PARALLEL_BATCH_SIZE:
+            try:
+                process_pool = _get_process_pool(max_workers)
+                chunk_size = max(1, len(texts) // (max_workers * 4))
+                chunk_results = _run_in_process_pool(
+                    process_pool,
+                    _batch_extract_keywords_with_frequencies,
+                    [(texts[i:i + chunk_size], max_keywords_per_chunk) for i in range(0, len(texts), chunk_size)]
+                )
+                return [result for results in chunk_results for result in results]
+            except Exception:
+                # e.g. a worker process died or timed out, the pool is recreated on the next batch
+                logging.exception('Failed to extract keywords in process pool, fallback to serial extraction.')
+                _reset_process_pool()
+
+        return [self.extract_keywords_with_frequencies(text, max_keywords_per_chunk) for text in texts]
+
+    def get_keyword_frequencies(self, text: str, keywords: Set[str]) -> Tuple[Dict[str, int], int]:
+        """
+        Count the term frequency of each keyword in the text.
+
+        :param text: text
+        :param keywords: keywords
+        :return: keyword -> term frequency, text length in tokens
+        """
+        tokens = [token for token in jieba.lcut(text) if token.strip()]
+        token_counts = Counter(tokens)
+
+        # sorted, so the keyword order does not depend on the string hashing of the extracting process
+        keyword_frequencies = {
+            keyword: token_counts.get(keyword) or max(text.count(keyword), 1)
+            for keyword in sorted(keywords)
+        }
+
+        return keyword_frequencies, len(tokens)
+
     def _expand_tokens_with_subtokens(self, tokens: Set[str]) -> Set[str]:
         """Get subtokens from a list of tokens., filtering for stopwords."""
         results = set()
@@ -1,18 +1,38 @@
-import json
+import math
+import threading
 from collections import defaultdict
 from typing import Any, List, Optional, Dict
 
+from cachetools import LRUCache
 from langchain.schema import Document, BaseRetriever
 from pydantic import BaseModel, Field, Extra
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
 
 from core.index.base import BaseIndex
 from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from extensions.ext_database import db
-from models.dataset import Dataset, DocumentSegment, DatasetKeywordTable
+from models.dataset import Dataset, DocumentSegment, DatasetKeywordTable, DatasetKeyword, DatasetKeywordStatistic
+
+# max number of keyword postings written or node ids deleted in one statement
+KEYWORD_BATCH_SIZE = 1000
+
+# max number of migrated dataset ids remembered per process, an evicted dataset is only checked again
+MIGRATED_DATASET_CACHE_MAXSIZE = 10000
+
+# datasets whose legacy keyword table has already been moved to keyword postings in this process
+_migrated_dataset_ids = LRUCache(maxsize=MIGRATED_DATASET_CACHE_MAXSIZE)
+_migrated_dataset_ids_lock = threading.Lock()
 
 
 class KeywordTableConfig(BaseModel):
     max_keywords_per_chunk: int = 10
+    # worker processes extracting the keywords of the added texts, 0 to extract in the current process
+    max_workers: int = 0
+    # `bm25` ranks chunks by BM25 score, `keyword_count` by the number of matched keywords
+    scoring_mode: str = 'bm25'
+    bm25_k1: float = 1.5
+    bm25_b: float = 0.75
 
 
 class KeywordTableIndex(BaseIndex):
@@ -21,91 +41,59 @@ class KeywordTableIndex(BaseIndex):
         self._config = config
 
     def create(self, texts: list[Document], **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.add_texts(texts)
 
         return self
 
     def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.add_texts(texts)
 
         return self
 
     def add_texts(self, texts: list[Document], **kwargs):
+        self.migrate_dataset_keyword_table()
+
         keyword_table_handler = JiebaKeywordTableHandler()
+        extracted_keywords = keyword_table_handler.batch_extract_keywords_with_frequencies(
+            [text.page_content for text in texts],
+            self._config.max_keywords_per_chunk,
+            max_workers=self._config.max_workers
+        )
 
-        keyword_table = self._get_dataset_keyword_table()
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
+        segment_keywords = {}
+        for text, (keyword_frequencies, segment_length) in zip(texts, extracted_keywords):
+            segment_keywords[text.metadata['doc_id']] = (keyword_frequencies, segment_length)
 
-        self._save_dataset_keyword_table(keyword_table)
+        self._batch_update_segment_keywords(self.dataset.id, {
+            node_id: list(keyword_frequencies.keys())
+            for node_id, (keyword_frequencies, _) in segment_keywords.items()
+        })
+        self._save_dataset_keywords(segment_keywords)
 
     def text_exists(self, id: str) -> bool:
-        keyword_table = self._get_dataset_keyword_table()
-        return id in set.union(*keyword_table.values())
+        self.migrate_dataset_keyword_table()
+
+        return db.session.query(DatasetKeyword.id).filter(
+            DatasetKeyword.dataset_id == self.dataset.id,
+            DatasetKeyword.index_node_id == id
+        ).first() is not None
 
     def delete_by_ids(self, ids: list[str]) -> None:
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
+        self.migrate_dataset_keyword_table()
 
-        self._save_dataset_keyword_table(keyword_table)
+        self._delete_dataset_keywords(ids)
+        db.session.commit()
 
     def delete_by_document_id(self, document_id: str):
         # get segment ids by document_id
-        segments = db.session.query(DocumentSegment).filter(
+        segments = db.session.query(DocumentSegment.index_node_id).filter(
             DocumentSegment.dataset_id == self.dataset.id,
             DocumentSegment.document_id == document_id
         ).all()
 
         ids = [segment.index_node_id for segment in segments]
 
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.delete_by_ids(ids)
 
     def get_retriever(self, **kwargs: Any) -> BaseRetriever:
         return KeywordTableRetriever(index=self, **kwargs)
@@ -114,20 +102,24 @@ class KeywordTableIndex(BaseIndex):
             self, query: str,
             **kwargs: Any
     ) -> List[Document]:
-        keyword_table = self._get_dataset_keyword_table()
+        self.migrate_dataset_keyword_table()
 
         search_kwargs = kwargs.get('search_kwargs') if kwargs.get('search_kwargs') else {}
         k = search_kwargs.get('k') if search_kwargs.get('k') else 4
 
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table, query, k)
+        sorted_chunk_scores = self._retrieve_ids_by_query(query, k)
+        if not sorted_chunk_scores:
+            return []
 
-        documents = []
-        for chunk_index in sorted_chunk_indices:
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id,
-                DocumentSegment.index_node_id == chunk_index
-            ).first()
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_([chunk_index for chunk_index, _ in sorted_chunk_scores])
+        ).all()
+        segments = {segment.index_node_id: segment for segment in segments}
 
+        documents = []
+        for chunk_index, score in sorted_chunk_scores:
+            segment = segments.get(chunk_index)
             if segment:
                 documents.append(Document(
                     page_content=segment.content,
@@ -135,103 +127,246 @@ class KeywordTableIndex(BaseIndex):
                         "doc_id": chunk_index,
                         "document_id": segment.document_id,
                         "dataset_id": segment.dataset_id,
+                        "score": score,
                     }
                 ))
 
         return documents
 
     def delete(self) -> None:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            db.session.delete(dataset_keyword_table)
-            db.session.commit()
+        db.session.query(DatasetKeyword).filter(
+            DatasetKeyword.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+
+        db.session.query(DatasetKeywordStatistic).filter(
+            DatasetKeywordStatistic.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+
+        db.session.query(DatasetKeywordTable).filter(
+            DatasetKeywordTable.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+
+        db.session.commit()
 
     def delete_by_group_id(self, group_id: str) -> None:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            db.session.delete(dataset_keyword_table)
-            db.session.commit()
+        self.delete()
+
+    def _save_dataset_keywords(self, segment_keywords: dict):
+        """
+        Replace the keyword postings of the given segments and update the dataset keyword statistics.
+
+        :param segment_keywords: index node id -> (keyword -> term frequency, segment length)
+        """
+        self._replace_dataset_keywords(segment_keywords)
 
-    def _save_dataset_keyword_table(self, keyword_table):
-        keyword_table_dict = {
-            '__type__': 'keyword_table',
-            '__data__': {
-                "index_id": self.dataset.id,
-                "summary": None,
-                "table": keyword_table
-            }
-        }
-        self.dataset.dataset_keyword_table.keyword_table = json.dumps(keyword_table_dict, cls=SetEncoder)
         db.session.commit()
 
-    def _get_dataset_keyword_table(self) -> Optional[dict]:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
+    def _replace_dataset_keywords(self, segment_keywords: dict):
+        """
+        Replace the keyword postings of the given segments and update the dataset keyword statistics,
+        the caller is responsible for committing.
+
+        :param segment_keywords: index node id -> (keyword -> term frequency, segment length)
+        """
+        self._delete_dataset_keywords(list(segment_keywords.keys()))
+
+        postings = []
+        segment_count = 0
+        total_segment_length = 0
+        for node_id, (keyword_frequencies, segment_length) in segment_keywords.items():
+            if not keyword_frequencies:
+                continue
+
+            segment_count += 1
+            total_segment_length += segment_length
+            for keyword, term_frequency in keyword_frequencies.items():
+                postings.append({
+                    'dataset_id': self.dataset.id,
+                    'keyword': keyword,
+                    'index_node_id': node_id,
+                    'term_frequency': term_frequency,
+                    'segment_length': segment_length
+                })
+
+        for i in range(0, len(postings), KEYWORD_BATCH_SIZE):
+            stmt = insert(DatasetKeyword).values(postings[i:i + KEYWORD_BATCH_SIZE]) \
+                .on_conflict_do_nothing(index_elements=['dataset_id', 'keyword', 'index_node_id'])
+            db.session.execute(stmt)
+
+        self._update_dataset_keyword_statistic(segment_count, total_segment_length)
+
+    def _delete_dataset_keywords(self, ids: list[str]):
+        """
+        Delete the keyword postings of the given index nodes and update the dataset keyword statistics,
+        the caller is responsible for committing.
+
+        :param ids: index node ids
+        """
+        segment_count = 0
+        total_segment_length = 0
+        for i in range(0, len(ids), KEYWORD_BATCH_SIZE):
+            batch_ids = ids[i:i + KEYWORD_BATCH_SIZE]
+            segment_lengths = db.session.query(
+                DatasetKeyword.index_node_id,
+                func.max(DatasetKeyword.segment_length).label('segment_length')
+            ).filter(
+                DatasetKeyword.dataset_id == self.dataset.id,
+                DatasetKeyword.index_node_id.in_(batch_ids)
+            ).group_by(DatasetKeyword.index_node_id).all()
+
+            if not segment_lengths:
+                continue
+
+            segment_count += len(segment_lengths)
+            total_segment_length += sum(segment.segment_length for segment in segment_lengths)
+
+            db.session.query(DatasetKeyword).filter(
+                DatasetKeyword.dataset_id == self.dataset.id,
+                DatasetKeyword.index_node_id.in_(batch_ids)
+            ).delete(synchronize_session=False)
+
+        self._update_dataset_keyword_statistic(-segment_count, -total_segment_length)
+
+    def _update_dataset_keyword_statistic(self, segment_count: int, total_segment_length: int):
+        if not segment_count and not total_segment_length:
+            return
+
+        stmt = insert(DatasetKeywordStatistic).values(
+            dataset_id=self.dataset.id,
+            segment_count=segment_count,
+            total_segment_length=total_segment_length
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['dataset_id'],
+            set_={
+                'segment_count': DatasetKeywordStatistic.segment_count + stmt.excluded.segment_count,
+                'total_segment_length': DatasetKeywordStatistic.total_segment_length
+                                        + stmt.excluded.total_segment_length,
+                'updated_at': func.current_timestamp()
+            }
+        )
+        db.session.execute(stmt)
+
+    def migrate_dataset_keyword_table(self):
+        """
+        Move the legacy single JSON keyword table of the dataset into keyword postings.
+        """
+        with _migrated_dataset_ids_lock:
+            if _migrated_dataset_ids.get(self.dataset.id):
+                return
+
+        # the row lock serializes concurrent migrations of the dataset until the legacy table is deleted,
+        # a waiting migration finds no legacy table and does not add the postings and statistics again
+        dataset_keyword_table = db.session.query(DatasetKeywordTable).filter(
+            DatasetKeywordTable.dataset_id == self.dataset.id
+        ).with_for_update().first()
+
         if dataset_keyword_table:
-            if dataset_keyword_table.keyword_table_dict:
-                return dataset_keyword_table.keyword_table_dict['__data__']['table']
-        else:
-            dataset_keyword_table = DatasetKeywordTable(
-                dataset_id=self.dataset.id,
-                keyword_table=json.dumps({
-                    '__type__': 'keyword_table',
-                    '__data__': {
-                        "index_id": self.dataset.id,
-                        "summary": None,
-                        "table": {}
-                    }
-                }, cls=SetEncoder)
-            )
-            db.session.add(dataset_keyword_table)
+            keyword_table_dict = dataset_keyword_table.keyword_table_dict
+            if keyword_table_dict:
+                node_keywords = defaultdict(set)
+                for keyword, node_ids in keyword_table_dict['__data__']['table'].items():
+                    for node_id in node_ids:
+                        node_keywords[node_id].add(keyword)
+
+                self._replace_dataset_keywords(self._get_legacy_segment_keywords(node_keywords))
+
+            db.session.delete(dataset_keyword_table)
             db.session.commit()
 
-        return {}
-
-    def _add_text_to_keyword_table(self, keyword_table: dict, id: str, keywords: list[str]) -> dict:
-        for keyword in keywords:
-            if keyword not in keyword_table:
-                keyword_table[keyword] = set()
-            keyword_table[keyword].add(id)
-        return keyword_table
-
-    def _delete_ids_from_keyword_table(self, keyword_table: dict, ids: list[str]) -> dict:
-        # get set of ids that correspond to node
-        node_idxs_to_delete = set(ids)
-
-        # delete node_idxs from keyword to node idxs mapping
-        keywords_to_delete = set()
-        for keyword, node_idxs in keyword_table.items():
-            if node_idxs_to_delete.intersection(node_idxs):
-                keyword_table[keyword] = node_idxs.difference(
-                    node_idxs_to_delete
-                )
-                if not keyword_table[keyword]:
-                    keywords_to_delete.add(keyword)
+        with _migrated_dataset_ids_lock:
+            _migrated_dataset_ids[self.dataset.id] = True
+
+    def _get_legacy_segment_keywords(self, node_keywords: Dict[str, set]) -> dict:
+        """
+        Count the term frequencies and segment lengths of the legacy keywords from the segment contents,
+        legacy keyword tables keep neither. Nodes without a segment are dropped, nothing can be retrieved for them.
+
+        :param node_keywords: index node id -> keywords
+        :return: index node id -> (keyword -> term frequency, segment length)
+        """
+        keyword_table_handler = JiebaKeywordTableHandler()
+        node_ids = list(node_keywords.keys())
+        segment_keywords = {}
+        for i in range(0, len(node_ids), KEYWORD_BATCH_SIZE):
+            segments = db.session.query(DocumentSegment.index_node_id, DocumentSegment.content).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + KEYWORD_BATCH_SIZE])
+            ).all()
 
-        for keyword in keywords_to_delete:
-            del keyword_table[keyword]
+            for segment in segments:
+                segment_keywords[segment.index_node_id] = keyword_table_handler.get_keyword_frequencies(
+                    segment.content, node_keywords[segment.index_node_id]
+                )
 
-        return keyword_table
+        return segment_keywords
 
-    def _retrieve_ids_by_query(self, keyword_table: dict, query: str, k: int = 4):
+    def _retrieve_ids_by_query(self, query: str, k: int = 4) -> list[tuple[str, float]]:
         keyword_table_handler = JiebaKeywordTableHandler()
-        keywords = keyword_table_handler.extract_keywords(query)
+        keywords = list(keyword_table_handler.extract_keywords(query))
+
+        if not keywords:
+            return []
+
+        if self._config.scoring_mode == 'bm25':
+            return self._retrieve_ids_by_bm25(keywords, k)
 
         # go through text chunks in order of most matching keywords
-        chunk_indices_count: Dict[str, int] = defaultdict(int)
-        keywords = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
-        for keyword in keywords:
-            for node_id in keyword_table[keyword]:
-                chunk_indices_count[node_id] += 1
-
-        sorted_chunk_indices = sorted(
-            list(chunk_indices_count.keys()),
-            key=lambda x: chunk_indices_count[x],
-            reverse=True,
-        )
+        match_count = func.count(DatasetKeyword.id).label('match_count')
+        chunk_indices = db.session.query(DatasetKeyword.index_node_id, match_count).filter(
+            DatasetKeyword.dataset_id == self.dataset.id,
+            DatasetKeyword.keyword.in_(keywords)
+        ).group_by(DatasetKeyword.index_node_id).order_by(match_count.desc()).limit(k).all()
+
+        return [(chunk_index.index_node_id, float(chunk_index.match_count)) for chunk_index in chunk_indices]
 
-        return sorted_chunk_indices[: k]
+    def _retrieve_ids_by_bm25(self, keywords: list[str], k: int = 4) -> list[tuple[str, float]]:
+        statistic = db.session.query(DatasetKeywordStatistic).filter(
+            DatasetKeywordStatistic.dataset_id == self.dataset.id
+        ).first()
+
+        if not statistic or statistic.segment_count <= 0:
+            return []
+
+        postings = db.session.query(
+            DatasetKeyword.index_node_id,
+            DatasetKeyword.keyword,
+            DatasetKeyword.term_frequency,
+            DatasetKeyword.segment_length
+        ).filter(
+            DatasetKeyword.dataset_id == self.dataset.id,
+            DatasetKeyword.keyword.in_(keywords)
+        ).all()
+
+        document_frequencies: Dict[str, int] = defaultdict(int)
+        for posting in postings:
+            document_frequencies[posting.keyword] += 1
+
+        segment_count = statistic.segment_count
+        average_segment_length = statistic.total_segment_length / segment_count
+        k1 = self._config.bm25_k1
+        b = self._config.bm25_b
+
+        chunk_scores: Dict[str, float] = defaultdict(float)
+        for posting in postings:
+            document_frequency = document_frequencies[posting.keyword]
+            idf = math.log((segment_count - document_frequency + 0.5) / (document_frequency + 0.5) + 1)
+
+            # legacy postings have no segment length, score them without length normalization
+            if average_segment_length > 0 and posting.segment_length > 0:
+                length_norm = 1 - b + b * posting.segment_length / average_segment_length
+            else:
+                length_norm = 1
 
-    def _update_segment_keywords(self, dataset_id: str, node_id: str, keywords: List[str]):
+            term_frequency = posting.term_frequency
+            chunk_scores[posting.index_node_id] += \
+                idf * term_frequency * (k1 + 1) / (term_frequency + k1 * length_norm)
+
+        sorted_chunk_indices = sorted(chunk_scores.keys(), key=lambda x: chunk_scores[x], reverse=True)
+
+        return [(chunk_index, chunk_scores[chunk_index]) for chunk_index in sorted_chunk_indices[:k]]
+
+    def _update_segment_keywords(self, dataset_id: str, node_id: str, keywords: List[str]) -> Optional[DocumentSegment]:
         document_segment = db.session.query(DocumentSegment).filter(
             DocumentSegment.dataset_id == dataset_id,
             DocumentSegment.index_node_id == node_id
@@ -240,16 +375,50 @@ class KeywordTableIndex(BaseIndex):
             document_segment.keywords = keywords
             db.session.commit()
 
+        return document_segment
+
+    def _batch_update_segment_keywords(self, dataset_id: str, segment_keywords: Dict[str, List[str]]):
+        """
+        Update the keywords of many segments in bulk, the caller is responsible for committing.
+
+        :param dataset_id: dataset id
+        :param segment_keywords: index node id -> keywords
+        """
+        node_ids = list(segment_keywords.keys())
+        for i in range(0, len(node_ids), KEYWORD_BATCH_SIZE):
+            document_segments = db.session.query(DocumentSegment.id, DocumentSegment.index_node_id).filter(
+                DocumentSegment.dataset_id == dataset_id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + KEYWORD_BATCH_SIZE])
+            ).all()
+
+            db.session.bulk_update_mappings(DocumentSegment, [
+                {
+                    'id': document_segment.id,
+                    'keywords': segment_keywords[document_segment.index_node_id]
+                }
+                for document_segment in document_segments
+            ])
+
+    def _get_segment_keywords(self, document_segment: Optional[DocumentSegment], keywords: List[str]) -> tuple:
+        if not document_segment:
+            return {keyword: 1 for keyword in keywords}, 0
+
+        keyword_table_handler = JiebaKeywordTableHandler()
+        return keyword_table_handler.get_keyword_frequencies(document_segment.content, set(keywords))
+
     def create_segment_keywords(self, node_id: str, keywords: List[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        self._update_segment_keywords(self.dataset.id, node_id, keywords)
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        self.migrate_dataset_keyword_table()
+        document_segment = self._update_segment_keywords(self.dataset.id, node_id, keywords)
+        self._save_dataset_keywords({node_id: self._get_segment_keywords(document_segment, keywords)})
 
     def update_segment_keywords_index(self, node_id: str, keywords: List[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        self.migrate_dataset_keyword_table()
+        document_segment = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id == node_id
+        ).first()
+        self._save_dataset_keywords({node_id: self._get_segment_keywords(document_segment, keywords)})
+
 
 class KeywordTableRetriever(BaseRetriever, BaseModel):
     index: KeywordTableIndex
@@ -275,9 +444,3 @@ class KeywordTableRetriever(BaseRetriever, BaseModel):
     async def aget_relevant_documents(self, query: str) -> List[Document]:
         raise NotImplementedError("KeywordTableRetriever does not support async")
 
-
-class SetEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return super().default(obj)
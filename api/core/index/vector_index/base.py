@@ -13,6 +13,9 @@ from extensions.ext_database import db
 from models.dataset import Dataset, DocumentSegment, DatasetCollectionBinding
 from models.dataset import Document as DatasetDocument
 
+# max number of node ids deleted with one request, well below the batch delete limits of the vector stores
+DELETE_BATCH_SIZE = 1000
+
 
 class BaseVectorIndex(BaseIndex):
 
@@ -107,8 +110,8 @@ class BaseVectorIndex(BaseIndex):
         vector_store = self._get_vector_store()
         vector_store = cast(self._get_vector_store_class(), vector_store)
 
-        for node_id in ids:
-            vector_store.del_text(node_id)
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            vector_store.del_texts_by_ids(ids[i:i + DELETE_BATCH_SIZE])
 
     def delete_by_group_id(self, group_id: str) -> None:
         vector_store = self._get_vector_store()
@@ -165,6 +165,7 @@ class Qdrant(VectorStore):
         metadatas: Optional[List[dict]] = None,
         ids: Optional[Sequence[str]] = None,
         batch_size: int = 64,
+        embeddings: Optional[List[List[float]]] = None,
         **kwargs: Any,
     ) -> List[str]:
         """Run more texts through the embeddings and add to the vectorstore.
@@ -178,6 +179,8 @@ class Qdrant(VectorStore):
             batch_size:
                 How many vectors upload per-request.
                 Default: 64
+            embeddings:
+                Optional embeddings of the texts, the texts are embedded if not given.
             group_id:
                 collection group
 
@@ -186,7 +189,7 @@ class Qdrant(VectorStore):
         """
         added_ids = []
         for batch_ids, points in self._generate_rest_batches(
-            texts, metadatas, ids, batch_size
+            texts, metadatas, ids, batch_size, embeddings=embeddings
         ):
             self.client.upsert(
                 collection_name=self.collection_name, points=points, **kwargs
@@ -1376,7 +1379,8 @@ class Qdrant(VectorStore):
         collection_name = collection_name or uuid.uuid4().hex
         distance_func = distance_func.upper()
         is_new_collection = False
-        client = qdrant_client.QdrantClient(
+        # reuse a long-lived client if the caller passes one
+        client = kwargs.pop('client', None) or qdrant_client.QdrantClient(
             location=location,
             url=url,
             port=port,
@@ -1688,19 +1692,22 @@ class Qdrant(VectorStore):
         ids: Optional[Sequence[str]] = None,
         batch_size: int = 64,
         group_id: Optional[str] = None,
+        embeddings: Optional[List[List[float]]] = None,
     ) -> Generator[Tuple[List[str], List[rest.PointStruct]], None, None]:
         from qdrant_client.http import models as rest
 
         texts_iterator = iter(texts)
         metadatas_iterator = iter(metadatas or [])
         ids_iterator = iter(ids or [uuid.uuid4().hex for _ in iter(texts)])
+        embeddings_iterator = iter(embeddings or [])
         while batch_texts := list(islice(texts_iterator, batch_size)):
             # Take the corresponding metadata and id for each text in a batch
             batch_metadatas = list(islice(metadatas_iterator, batch_size)) or None
             batch_ids = list(islice(ids_iterator, batch_size))
 
-            # Generate the embeddings for all the texts in a batch
-            batch_embeddings = self._embed_texts(batch_texts)
+            # Generate the embeddings for all the texts in a batch, unless they are given
+            batch_embeddings = list(islice(embeddings_iterator, batch_size)) if embeddings is not None \
+                else self._embed_texts(batch_texts)
 
             points = [
                 rest.PointStruct(
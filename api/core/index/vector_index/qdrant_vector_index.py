@@ -1,6 +1,7 @@
 import os
 from typing import Optional, Any, List, cast
 
+import httpx
 import qdrant_client
 from langchain.embeddings.base import Embeddings
 from langchain.schema import Document, BaseRetriever
@@ -9,8 +10,10 @@ from pydantic import BaseModel
 from qdrant_client.http.models import HnswConfigDiff
 
 from core.index.base import BaseIndex
-from core.index.vector_index.base import BaseVectorIndex
+from core.index.vector_index.base import BaseVectorIndex, DELETE_BATCH_SIZE
+from core.vector_store.qdrant_local_manager import QdrantLocalManager
 from core.vector_store.qdrant_vector_store import QdrantVectorStore
+from core.vector_store.vector_client_registry import vector_client_registry
 from extensions.ext_database import db
 from models.dataset import Dataset, DatasetCollectionBinding
 
@@ -19,6 +22,8 @@ class QdrantConfig(BaseModel):
     endpoint: str
     api_key: Optional[str]
     root_path: Optional[str]
+    max_connections: int = 20
+    keepalive_expiry: float = 60
 
     def to_qdrant_params(self):
         if self.endpoint and self.endpoint.startswith('path:'):
@@ -68,24 +73,12 @@ class QdrantVectorIndex(BaseVectorIndex):
         }
 
     def create(self, texts: list[Document], **kwargs) -> BaseIndex:
-        uuids = self._get_uuids(texts)
-        self._vector_store = QdrantVectorStore.from_documents(
-            texts,
-            self._embeddings,
-            collection_name=self.get_index_name(self.dataset),
-            ids=uuids,
-            content_payload_key='page_content',
-            group_id=self.dataset.id,
-            group_payload_key='group_id',
-            hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
-                                       max_indexing_threads=0, on_disk=False),
-            **self._client_config.to_qdrant_params()
-        )
-
-        return self
+        return self.create_with_collection_name(texts, self.get_index_name(self.dataset), **kwargs)
 
     def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
         uuids = self._get_uuids(texts)
+        # the collection is created and the texts are written under the write lock of a local storage,
+        # the texts are embedded before it is taken
         self._vector_store = QdrantVectorStore.from_documents(
             texts,
             self._embeddings,
@@ -96,21 +89,50 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_payload_key='group_id',
             hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
                                        max_indexing_threads=0, on_disk=False),
-            **self._client_config.to_qdrant_params()
+            client=self._get_client(),
+            local_manager=self._get_local_manager()
         )
 
         return self
 
+    def _get_local_manager(self) -> Optional[QdrantLocalManager]:
+        params = self._client_config.to_qdrant_params()
+        if 'path' not in params:
+            return None
+
+        key = vector_client_registry.make_key(self.get_type(), 'path:' + params['path'])
+
+        return vector_client_registry.get_client(key, factory=lambda: QdrantLocalManager(params['path']))
+
+    def _get_client(self) -> qdrant_client.QdrantClient:
+        local_manager = self._get_local_manager()
+        if local_manager:
+            return local_manager.client
+
+        params = self._client_config.to_qdrant_params()
+        key = vector_client_registry.make_key(self.get_type(), params['url'], params['api_key'])
+
+        return vector_client_registry.get_client(
+            key,
+            factory=lambda: qdrant_client.QdrantClient(
+                **params,
+                limits=httpx.Limits(
+                    max_connections=self._client_config.max_connections,
+                    max_keepalive_connections=self._client_config.max_connections,
+                    keepalive_expiry=self._client_config.keepalive_expiry
+                )
+            ),
+            health_check=lambda client: client.get_collections() is not None
+        )
+
     def _get_vector_store(self) -> VectorStore:
         """Only for created index."""
         if self._vector_store:
             return self._vector_store
         attributes = ['doc_id', 'dataset_id', 'document_id']
-        client = qdrant_client.QdrantClient(
-            **self._client_config.to_qdrant_params()
-        )
+        client = self._get_client()
 
-        return QdrantVectorStore(
+        vector_store = QdrantVectorStore(
             client=client,
             collection_name=self.get_index_name(self.dataset),
             embeddings=self._embeddings,
@@ -118,6 +140,9 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_id=self.dataset.id,
             group_payload_key='group_id'
         )
+        vector_store.local_manager = self._get_local_manager()
+
+        return vector_store
 
     def _get_vector_store_class(self) -> type:
         return QdrantVectorStore
@@ -143,16 +168,8 @@ class QdrantVectorIndex(BaseVectorIndex):
         vector_store = self._get_vector_store()
         vector_store = cast(self._get_vector_store_class(), vector_store)
 
-        from qdrant_client.http import models
-        for node_id in ids:
-            vector_store.del_texts(models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="metadata.doc_id",
-                        match=models.MatchValue(value=node_id),
-                    ),
-                ],
-            ))
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            vector_store.del_texts_by_ids(ids[i:i + DELETE_BATCH_SIZE])
 
     def delete_by_group_id(self, group_id: str) -> None:
 
@@ -9,6 +9,7 @@ from pydantic import BaseModel, root_validator
 
 from core.index.base import BaseIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.vector_client_registry import vector_client_registry
 from core.vector_store.weaviate_vector_store import WeaviateVectorStore
 from models.dataset import Dataset
 
@@ -17,6 +18,8 @@ class WeaviateConfig(BaseModel):
     endpoint: str
     api_key: Optional[str]
     batch_size: int = 100
+    pool_connections: int = 20
+    pool_maxsize: int = 20
 
     @root_validator()
     def validate_config(cls, values: dict) -> dict:
@@ -31,6 +34,15 @@ class WeaviateVectorIndex(BaseVectorIndex):
         self._client = self._init_client(config)
 
     def _init_client(self, config: WeaviateConfig) -> weaviate.Client:
+        key = vector_client_registry.make_key(self.get_type(), config.endpoint, config.api_key)
+
+        return vector_client_registry.get_client(
+            key,
+            factory=lambda: self._create_client(config),
+            health_check=lambda client: client.is_ready()
+        )
+
+    def _create_client(self, config: WeaviateConfig) -> weaviate.Client:
         auth_config = weaviate.auth.AuthApiKey(api_key=config.api_key)
 
         weaviate.connect.connection.has_grpc = False
@@ -40,7 +52,13 @@ class WeaviateVectorIndex(BaseVectorIndex):
                 url=config.endpoint,
                 auth_client_secret=auth_config,
                 timeout_config=(5, 60),
-                startup_period=None
+                startup_period=None,
+                additional_config=weaviate.Config(
+                    connection_config=weaviate.ConnectionConfig(
+                        session_pool_connections=config.pool_connections,
+                        session_pool_maxsize=config.pool_maxsize
+                    )
+                )
             )
         except requests.exceptions.ConnectionError:
             raise ConnectionError("Vector database connection error")
@@ -5,22 +5,27 @@ import re
 import threading
 import time
 import uuid
-from typing import Optional, List, cast
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple, cast
 
 from flask import current_app, Flask
 from flask_login import current_user
 from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
+from langchain.text_splitter import TextSplitter
+from sqlalchemy import func
 
 from core.data_loader.file_extractor import FileExtractor
 from core.data_loader.loader.notion import NotionLoader
 from core.docstore.dataset_docstore import DatesetDocumentStore
+from core.embedding.cached_embedding import CacheEmbedding
 from core.generator.llm_generator import LLMGenerator
 from core.index.index import IndexBuilder
 from core.model_providers.error import ProviderTokenNotInitError
 from core.model_providers.model_factory import ModelFactory
+from core.model_providers.models.embedding.base import BaseEmbedding
 from core.model_providers.models.entity.message import MessageType
-from core.spiltter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from core.spiltter.token_offset_text_splitter import TokenOffsetTextSplitter, FixedTokenOffsetTextSplitter
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
@@ -30,14 +35,23 @@ from models.dataset import Dataset, DocumentSegment, DatasetProcessRule
 from models.model import UploadFile
 from models.source import DataSourceBinding
 
+# max number of segment ids sent in one `IN (...)` statement
+SEGMENT_BATCH_SIZE = 1000
+
 
 class IndexingRunner:
 
     def __init__(self):
         self.storage = storage
 
-    def run(self, dataset_documents: List[DatasetDocument]):
-        """Run the indexing process."""
+    def run(self, dataset_documents: List[DatasetDocument], incremental: bool = False):
+        """
+        Run the indexing process.
+
+        :param dataset_documents: documents to index
+        :param incremental: keep the existing segments whose content is unchanged and only index
+                            the added or changed chunks, used when a document is re-processed
+        """
         for dataset_document in dataset_documents:
             try:
                 # get dataset
@@ -48,30 +62,43 @@ class IndexingRunner:
                 if not dataset:
                     raise ValueError("no dataset found")
 
-                # load file
-                text_docs = self._load_data(dataset_document)
-
                 # get the process rule
                 processing_rule = db.session.query(DatasetProcessRule). \
                     filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id). \
                     first()
 
                 # get splitter
-                splitter = self._get_splitter(processing_rule)
-
-                # split to documents
-                documents = self._step_split(
-                    text_docs=text_docs,
-                    splitter=splitter,
-                    dataset=dataset,
-                    dataset_document=dataset_document,
-                    processing_rule=processing_rule
-                )
-                self._build_index(
-                    dataset=dataset,
-                    dataset_document=dataset_document,
-                    documents=documents
-                )
+                splitter = self._get_splitter(processing_rule, self._get_embedding_model(dataset))
+
+                if self._can_stream(dataset_document, incremental):
+                    # load, clean, split, save and index the file batch by batch
+                    self._step_load_split_and_index_in_batches(
+                        splitter=splitter,
+                        dataset=dataset,
+                        dataset_document=dataset_document,
+                        processing_rule=processing_rule
+                    )
+                else:
+                    # load file
+                    text_docs = self._load_data(dataset_document)
+
+                    # split to documents
+                    documents = self._step_split(
+                        text_docs=text_docs,
+                        splitter=splitter,
+                        dataset=dataset,
+                        dataset_document=dataset_document,
+                        processing_rule=processing_rule,
+                        incremental=incremental
+                    )
+
+                    # build index
+                    self._build_index(
+                        dataset=dataset,
+                        dataset_document=dataset_document,
+                        documents=documents,
+                        incremental=incremental
+                    )
             except DocumentIsPausedException:
                 raise DocumentIsPausedException('Document paused, document id: {}'.format(dataset_document.id))
             except ProviderTokenNotInitError as e:
@@ -131,7 +158,7 @@ class IndexingRunner:
                 first()
 
             # get splitter
-            splitter = self._get_splitter(processing_rule)
+            splitter = self._get_splitter(processing_rule, self._get_embedding_model(dataset))
 
             # split to documents
             documents = self._step_split(
@@ -267,8 +294,11 @@ class IndexingRunner:
             for document in documents:
                 if len(preview_texts) < 5:
                     preview_texts.append(document.page_content)
-                if indexing_technique == 'high_quality' or embedding_model:
-                    tokens += embedding_model.get_num_tokens(self.filter_string(document.page_content))
+
+            if indexing_technique == 'high_quality' or embedding_model:
+                tokens += sum(embedding_model.get_num_tokens_batch(
+                    [self.filter_string(document.page_content) for document in documents]
+                ))
 
         if doc_form and doc_form == 'qa_model':
             text_generation_model = ModelFactory.get_text_generation_model(
@@ -363,8 +393,11 @@ class IndexingRunner:
                 for document in documents:
                     if len(preview_texts) < 5:
                         preview_texts.append(document.page_content)
-                    if indexing_technique == 'high_quality' or embedding_model:
-                        tokens += embedding_model.get_num_tokens(document.page_content)
+
+                if indexing_technique == 'high_quality' or embedding_model:
+                    tokens += sum(embedding_model.get_num_tokens_batch(
+                        [document.page_content for document in documents]
+                    ))
 
         if doc_form and doc_form == 'qa_model':
             text_generation_model = ModelFactory.get_text_generation_model(
@@ -432,16 +465,137 @@ class IndexingRunner:
 
         return text_docs
 
+    def _can_stream(self, dataset_document: DatasetDocument, incremental: bool) -> bool:
+        """
+        Uploaded files of at least `INDEXING_STREAMING_MIN_FILE_SIZE` bytes are streamed, unless the segments
+        are diffed incrementally, which needs all the split documents of the file at once.
+        """
+        if int(current_app.config.get('INDEXING_STREAMING_BATCH_SIZE', 0)) <= 0 \
+                or dataset_document.data_source_type != 'upload_file' \
+                or incremental:
+            return False
+
+        data_source_info = dataset_document.data_source_info_dict
+        if not data_source_info or 'upload_file_id' not in data_source_info:
+            return False
+
+        file_size = db.session.query(UploadFile.size). \
+            filter(UploadFile.id == data_source_info['upload_file_id']). \
+            scalar()
+
+        return file_size is not None \
+            and file_size >= int(current_app.config.get('INDEXING_STREAMING_MIN_FILE_SIZE', 0))
+
+    def _step_load_split_and_index_in_batches(self, splitter: TextSplitter, dataset: Dataset,
+                                              dataset_document: DatasetDocument,
+                                              processing_rule: DatasetProcessRule) -> None:
+        """
+        Load the uploaded file in batches of rows, pages or text blocks, each batch is cleaned, split,
+        saved to the document segments and indexed before the next batch is loaded.
+        Only one batch of the file and its split documents is held at a time, instead of the whole file,
+        its cleaned copies and all of its split documents.
+        The document goes through the splitting and indexing status with the first batch, the completion time
+        of each phase is the time its last batch completed, as if the file was loaded at once.
+        """
+        data_source_info = dataset_document.data_source_info_dict
+        if not data_source_info or 'upload_file_id' not in data_source_info:
+            raise ValueError("no upload file found")
+
+        file_detail = db.session.query(UploadFile). \
+            filter(UploadFile.id == data_source_info['upload_file_id']). \
+            one_or_none()
+
+        doc_store = DatesetDocumentStore(
+            dataset=dataset,
+            user_id=dataset_document.created_by,
+            document_id=dataset_document.id
+        )
+
+        word_count = 0
+        tokens = 0
+        indexing_latency = 0
+        parsing_completed_at = None
+        splitting_completed_at = None
+        if file_detail:
+            batch_size = int(current_app.config.get('INDEXING_STREAMING_BATCH_SIZE'))
+            for text_docs in FileExtractor.load_in_batches(file_detail, batch_size):
+                for text_doc in text_docs:
+                    word_count += len(text_doc.page_content)
+                    # remove invalid symbol
+                    text_doc.page_content = self.filter_string(text_doc.page_content)
+                    text_doc.metadata['document_id'] = dataset_document.id
+                    text_doc.metadata['dataset_id'] = dataset_document.dataset_id
+
+                is_first_batch = parsing_completed_at is None
+                parsing_completed_at = datetime.datetime.utcnow()
+                if is_first_batch:
+                    # update document status to splitting
+                    self._update_document_index_status(
+                        document_id=dataset_document.id,
+                        after_indexing_status="splitting"
+                    )
+
+                documents = self._split_to_documents(
+                    text_docs=text_docs,
+                    splitter=splitter,
+                    processing_rule=processing_rule,
+                    tenant_id=dataset.tenant_id,
+                    document_form=dataset_document.doc_form,
+                    document_language=dataset_document.doc_language
+                )
+
+                # add document segments, the segments of the previous batches are already completed
+                doc_store.add_documents(documents)
+                splitting_completed_at = datetime.datetime.utcnow()
+                if is_first_batch:
+                    # update document status to indexing
+                    self._update_document_index_status(
+                        document_id=dataset_document.id,
+                        after_indexing_status="indexing"
+                    )
+
+                db.session.query(DocumentSegment).filter(
+                    DocumentSegment.document_id == dataset_document.id,
+                    DocumentSegment.status == "waiting"
+                ).update({
+                    DocumentSegment.status: "indexing",
+                    DocumentSegment.indexing_at: datetime.datetime.utcnow()
+                }, synchronize_session=False)
+                db.session.commit()
+
+                indexing_start_at = time.perf_counter()
+                tokens += self._index_documents(dataset, dataset_document, documents)
+                indexing_latency += time.perf_counter() - indexing_start_at
+
+        # update document status to completed, cleaning is part of the splitting like in `_step_split`
+        cur_time = datetime.datetime.utcnow()
+        self._update_document_index_status(
+            document_id=dataset_document.id,
+            after_indexing_status="completed",
+            extra_update_params={
+                DatasetDocument.word_count: word_count,
+                DatasetDocument.parsing_completed_at: parsing_completed_at or cur_time,
+                DatasetDocument.cleaning_completed_at: splitting_completed_at or cur_time,
+                DatasetDocument.splitting_completed_at: splitting_completed_at or cur_time,
+                DatasetDocument.tokens: tokens,
+                DatasetDocument.completed_at: cur_time,
+                DatasetDocument.indexing_latency: indexing_latency,
+            }
+        )
+
     def filter_string(self, text):
         text = re.sub(r'<\|', '<', text)
         text = re.sub(r'\|>', '>', text)
         text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F\x80-\xFF]', '', text)
         return text
 
-    def _get_splitter(self, processing_rule: DatasetProcessRule) -> TextSplitter:
+    def _get_splitter(self, processing_rule: DatasetProcessRule,
+                      embedding_model: Optional[BaseEmbedding] = None) -> TextSplitter:
         """
         Get the NodeParser object according to the processing rule.
+        The chunks are counted with the tokenizer of the embedding model they are indexed with.
         """
+        tokenizer_model_name = embedding_model.tokenizer_model_name if embedding_model else None
         if processing_rule.mode == "custom":
             # The user-defined segmentation rule
             rules = json.loads(processing_rule.rules)
@@ -453,37 +607,31 @@ class IndexingRunner:
             if separator:
                 separator = separator.replace('\\n', '\n')
 
-            character_splitter = FixedRecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            character_splitter = FixedTokenOffsetTextSplitter(
                 chunk_size=segmentation["max_tokens"],
                 chunk_overlap=0,
                 fixed_separator=separator,
-                separators=["\n\n", "。", ".", " ", ""]
+                separators=["\n\n", "。", ".", " ", ""],
+                tokenizer_model_name=tokenizer_model_name
             )
         else:
             # Automatic segmentation
-            character_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            character_splitter = TokenOffsetTextSplitter(
                 chunk_size=DatasetProcessRule.AUTOMATIC_RULES['segmentation']['max_tokens'],
                 chunk_overlap=0,
-                separators=["\n\n", "。", ".", " ", ""]
+                separators=["\n\n", "。", ".", " ", ""],
+                tokenizer_model_name=tokenizer_model_name
             )
 
         return character_splitter
 
     def _step_split(self, text_docs: List[Document], splitter: TextSplitter,
-                    dataset: Dataset, dataset_document: DatasetDocument, processing_rule: DatasetProcessRule) \
-            -> List[Document]:
+                    dataset: Dataset, dataset_document: DatasetDocument, processing_rule: DatasetProcessRule,
+                    incremental: bool = False) -> List[Document]:
         """
         Split the text documents into documents and save them to the document segment.
+        In incremental mode only the added or changed documents are saved and returned.
         """
-        documents = self._split_to_documents(
-            text_docs=text_docs,
-            splitter=splitter,
-            processing_rule=processing_rule,
-            tenant_id=dataset.tenant_id,
-            document_form=dataset_document.doc_form,
-            document_language=dataset_document.doc_language
-        )
-
         # save node to document segment
         doc_store = DatesetDocumentStore(
             dataset=dataset,
@@ -491,8 +639,59 @@ class IndexingRunner:
             document_id=dataset_document.id
         )
 
-        # add document segments
-        doc_store.add_documents(documents)
+        if incremental:
+            # diff the source chunks before the QA generation, so only added or changed chunks are generated
+            source_documents = self._split_to_source_documents(
+                text_docs=text_docs,
+                splitter=splitter,
+                processing_rule=processing_rule
+            )
+            reused_segment_groups = self._diff_document_segments(
+                dataset=dataset,
+                dataset_document=dataset_document,
+                source_documents=source_documents
+            )
+
+            added_source_documents = [source_document for source_document, segment_group
+                                      in zip(source_documents, reused_segment_groups) if segment_group is None]
+            if dataset_document.doc_form == 'qa_model':
+                added_document_groups = iter(self._generate_qa_documents(
+                    tenant_id=dataset.tenant_id,
+                    documents=added_source_documents,
+                    document_language=dataset_document.doc_language
+                ))
+            else:
+                added_document_groups = iter([[source_document] for source_document in added_source_documents])
+
+            documents = []
+            ordered_segments = []
+            for segment_group in reused_segment_groups:
+                if segment_group is None:
+                    added_documents = next(added_document_groups)
+                    documents.extend(added_documents)
+                    ordered_segments.extend((document, None) for document in added_documents)
+                else:
+                    ordered_segments.extend((None, segment) for segment in segment_group)
+
+            # add document segments
+            doc_store.add_documents(documents)
+
+            self._reorder_document_segments(
+                dataset_document=dataset_document,
+                ordered_segments=ordered_segments
+            )
+        else:
+            documents = self._split_to_documents(
+                text_docs=text_docs,
+                splitter=splitter,
+                processing_rule=processing_rule,
+                tenant_id=dataset.tenant_id,
+                document_form=dataset_document.doc_form,
+                document_language=dataset_document.doc_language
+            )
+
+            # add document segments
+            doc_store.add_documents(documents)
 
         # update document status to indexing
         cur_time = datetime.datetime.utcnow()
@@ -506,24 +705,150 @@ class IndexingRunner:
         )
 
         # update segment status to indexing
-        self._update_segments_by_document(
-            dataset_document_id=dataset_document.id,
-            update_params={
-                DocumentSegment.status: "indexing",
-                DocumentSegment.indexing_at: datetime.datetime.utcnow()
-            }
-        )
+        if incremental:
+            document_ids = [document.metadata['doc_id'] for document in documents]
+            for i in range(0, len(document_ids), SEGMENT_BATCH_SIZE):
+                DocumentSegment.query.filter(
+                    DocumentSegment.document_id == dataset_document.id,
+                    DocumentSegment.index_node_id.in_(document_ids[i:i + SEGMENT_BATCH_SIZE])
+                ).update({
+                    DocumentSegment.status: "indexing",
+                    DocumentSegment.indexing_at: datetime.datetime.utcnow()
+                }, synchronize_session=False)
+            db.session.commit()
+        else:
+            self._update_segments_by_document(
+                dataset_document_id=dataset_document.id,
+                update_params={
+                    DocumentSegment.status: "indexing",
+                    DocumentSegment.indexing_at: datetime.datetime.utcnow()
+                }
+            )
 
         return documents
 
+    def _diff_document_segments(self, dataset: Dataset, dataset_document: DatasetDocument,
+                                source_documents: List[Document]) -> List[Optional[List[DocumentSegment]]]:
+        """
+        Diff the split source chunks against the existing segments of the document by the hash of the chunk text.
+        A chunk is the content of one segment, or in QA mode the source of the consecutive QA segments generated
+        from it, so the diff does not depend on the generated questions and answers.
+        Unchanged segments keep their index node, so their vectors and keywords are reused,
+        vanished segments are removed from the indexes and the document segments.
+
+        :return: reused segments of each source chunk, None if the chunk is added or changed
+        """
+        segments = DocumentSegment.query.filter_by(
+            dataset_id=dataset.id,
+            document_id=dataset_document.id
+        ).order_by(DocumentSegment.position).all()
+
+        qa_model = dataset_document.doc_form == 'qa_model'
+        reusable_segment_groups = defaultdict(list)
+        vanished_segments = []
+        previous_source_hash = None
+        for segment in segments:
+            # QA segments saved without their source hash and segments of the other document form are regenerated
+            if qa_model:
+                source_hash = segment.source_hash
+            else:
+                source_hash = segment.index_node_hash if not segment.answer else None
+
+            if segment.status not in ['completed', 're_segment'] or not source_hash:
+                vanished_segments.append(segment)
+                previous_source_hash = None
+                continue
+
+            if qa_model and source_hash == previous_source_hash:
+                reusable_segment_groups[source_hash][-1].append(segment)
+            else:
+                reusable_segment_groups[source_hash].append([segment])
+            previous_source_hash = source_hash
+
+        reused_segment_groups = []
+        for source_document in source_documents:
+            candidates = reusable_segment_groups.get(source_document.metadata['doc_hash'])
+            reused_segment_groups.append(candidates.pop(0) if candidates else None)
+
+        for candidates in reusable_segment_groups.values():
+            for segment_group in candidates:
+                vanished_segments.extend(segment_group)
+
+        if vanished_segments:
+            index_node_ids = [segment.index_node_id for segment in vanished_segments]
+
+            # delete from vector index
+            vector_index = IndexBuilder.get_index(dataset, 'high_quality')
+            if vector_index:
+                vector_index.delete_by_ids(index_node_ids)
+
+            # delete from keyword index
+            keyword_table_index = IndexBuilder.get_index(dataset, 'economy')
+            keyword_table_index.delete_by_ids(index_node_ids)
+
+            segment_ids = [segment.id for segment in vanished_segments]
+            for i in range(0, len(segment_ids), SEGMENT_BATCH_SIZE):
+                DocumentSegment.query.filter(
+                    DocumentSegment.id.in_(segment_ids[i:i + SEGMENT_BATCH_SIZE])
+                ).delete(synchronize_session=False)
+
+        db.session.commit()
+
+        added_count = len([segment_group for segment_group in reused_segment_groups if segment_group is None])
+        logging.info(
+            'Incremental indexing of document {}: {} chunks reused, {} added or changed, {} segments removed.'.format(
+                dataset_document.id, len(source_documents) - added_count, added_count, len(vanished_segments)
+            )
+        )
+
+        return reused_segment_groups
+
+    def _reorder_document_segments(self, dataset_document: DatasetDocument,
+                                   ordered_segments: List[Tuple[Optional[Document], Optional[DocumentSegment]]]) -> None:
+        """
+        Set the segment positions to the order of the split documents, reused segments are marked completed.
+
+        :param ordered_segments: added document or reused segment of each position
+        """
+        added_index_node_ids = [document.metadata['doc_id'] for document, segment in ordered_segments
+                                if segment is None]
+        added_segment_ids = {}
+        for i in range(0, len(added_index_node_ids), SEGMENT_BATCH_SIZE):
+            rows = db.session.query(DocumentSegment.index_node_id, DocumentSegment.id).filter(
+                DocumentSegment.document_id == dataset_document.id,
+                DocumentSegment.index_node_id.in_(added_index_node_ids[i:i + SEGMENT_BATCH_SIZE])
+            ).all()
+            added_segment_ids.update(dict(rows))
+
+        mappings = []
+        for position, (document, segment) in enumerate(ordered_segments, start=1):
+            if segment is None:
+                mappings.append({'id': added_segment_ids[document.metadata['doc_id']], 'position': position})
+            else:
+                mappings.append({'id': segment.id, 'position': position, 'status': 'completed'})
+
+        db.session.bulk_update_mappings(DocumentSegment, mappings)
+        db.session.commit()
+
     def _split_to_documents(self, text_docs: List[Document], splitter: TextSplitter,
                             processing_rule: DatasetProcessRule, tenant_id: str,
                             document_form: str, document_language: str) -> List[Document]:
         """
         Split the text documents into nodes.
         """
+        all_documents = self._split_to_source_documents(text_docs, splitter, processing_rule)
+        # processing qa document
+        if document_form == 'qa_model':
+            all_qa_documents = self._generate_qa_documents(tenant_id, all_documents, document_language)
+            return [qa_document for qa_documents in all_qa_documents for qa_document in qa_documents]
+        return all_documents
+
+    def _split_to_source_documents(self, text_docs: List[Document], splitter: TextSplitter,
+                                   processing_rule: DatasetProcessRule) -> List[Document]:
+        """
+        Clean and split the text documents into chunks, the chunks are the segments or the QA sources.
+        """
         all_documents = []
-        all_qa_documents = []
         for text_doc in text_docs:
             # document clean
             document_text = self._document_clean(text_doc.page_content, processing_rule)
@@ -541,23 +866,29 @@ class IndexingRunner:
                     document_node.metadata['doc_hash'] = hash
                     split_documents.append(document_node)
             all_documents.extend(split_documents)
-        # processing qa document
-        if document_form == 'qa_model':
-            for i in range(0, len(all_documents), 10):
-                threads = []
-                sub_documents = all_documents[i:i + 10]
-                for doc in sub_documents:
-                    document_format_thread = threading.Thread(target=self.format_qa_document, kwargs={
-                        'flask_app': current_app._get_current_object(),
-                        'tenant_id': tenant_id, 'document_node': doc, 'all_qa_documents': all_qa_documents,
-                        'document_language': document_language})
-                    threads.append(document_format_thread)
-                    document_format_thread.start()
-                for thread in threads:
-                    thread.join()
-            return all_qa_documents
         return all_documents
 
+    def _generate_qa_documents(self, tenant_id: str, documents: List[Document],
+                               document_language: str) -> List[List[Document]]:
+        """
+        Generate the QA documents of each source chunk, 10 chunks at a time.
+
+        :return: QA documents of each source chunk, in the order of the chunks
+        """
+        all_qa_documents = [[] for _ in documents]
+        for i in range(0, len(documents), 10):
+            threads = []
+            for j in range(i, min(i + 10, len(documents))):
+                document_format_thread = threading.Thread(target=self.format_qa_document, kwargs={
+                    'flask_app': current_app._get_current_object(),
+                    'tenant_id': tenant_id, 'document_node': documents[j], 'all_qa_documents': all_qa_documents[j],
+                    'document_language': document_language})
+                threads.append(document_format_thread)
+                document_format_thread.start()
+            for thread in threads:
+                thread.join()
+        return all_qa_documents
+
     def format_qa_document(self, flask_app: Flask, tenant_id: str, document_node, all_qa_documents, document_language):
         format_documents = []
         if document_node.page_content is None or not document_node.page_content.strip():
@@ -573,6 +904,7 @@ class IndexingRunner:
                     doc_id = str(uuid.uuid4())
                     hash = helper.generate_text_hash(result['question'])
                     qa_document.metadata['answer'] = result['answer']
+                    qa_document.metadata['source_hash'] = document_node.metadata['doc_hash']
                     qa_document.metadata['doc_id'] = doc_id
                     qa_document.metadata['doc_hash'] = hash
                     qa_documents.append(qa_document)
@@ -659,56 +991,34 @@ class IndexingRunner:
 
         return result
 
-    def _build_index(self, dataset: Dataset, dataset_document: DatasetDocument, documents: List[Document]) -> None:
+    def _get_embedding_model(self, dataset: Dataset) -> Optional[BaseEmbedding]:
         """
-        Build the index for the document.
+        Get the embedding model of a high quality dataset.
         """
-        vector_index = IndexBuilder.get_index(dataset, 'high_quality')
-        keyword_table_index = IndexBuilder.get_index(dataset, 'economy')
-        embedding_model = None
-        if dataset.indexing_technique == 'high_quality':
-            embedding_model = ModelFactory.get_embedding_model(
-                tenant_id=dataset.tenant_id,
-                model_provider_name=dataset.embedding_model_provider,
-                model_name=dataset.embedding_model
-            )
+        if dataset.indexing_technique != 'high_quality':
+            return None
 
-        # chunk nodes by chunk size
-        indexing_start_at = time.perf_counter()
-        tokens = 0
-        chunk_size = 100
-        for i in range(0, len(documents), chunk_size):
-            # check document is paused
-            self._check_document_paused_status(dataset_document.id)
-            chunk_documents = documents[i:i + chunk_size]
-            if dataset.indexing_technique == 'high_quality' or embedding_model:
-                tokens += sum(
-                    embedding_model.get_num_tokens(document.page_content)
-                    for document in chunk_documents
-                )
-
-            # save vector index
-            if vector_index:
-                vector_index.add_texts(chunk_documents)
-
-            # save keyword index
-            keyword_table_index.add_texts(chunk_documents)
-
-            document_ids = [document.metadata['doc_id'] for document in chunk_documents]
-            db.session.query(DocumentSegment).filter(
-                DocumentSegment.document_id == dataset_document.id,
-                DocumentSegment.index_node_id.in_(document_ids),
-                DocumentSegment.status == "indexing"
-            ).update({
-                DocumentSegment.status: "completed",
-                DocumentSegment.enabled: True,
-                DocumentSegment.completed_at: datetime.datetime.utcnow()
-            })
-
-            db.session.commit()
+        return ModelFactory.get_embedding_model(
+            tenant_id=dataset.tenant_id,
+            model_provider_name=dataset.embedding_model_provider,
+            model_name=dataset.embedding_model
+        )
 
+    def _build_index(self, dataset: Dataset, dataset_document: DatasetDocument, documents: List[Document],
+                     incremental: bool = False) -> None:
+        """
+        Build the index for the document.
+        In incremental mode the document tokens also count the reused segments.
+        """
+        indexing_start_at = time.perf_counter()
+        tokens = self._index_documents(dataset, dataset_document, documents)
         indexing_end_at = time.perf_counter()
 
+        if incremental:
+            tokens = db.session.query(func.coalesce(func.sum(DocumentSegment.tokens), 0)).filter(
+                DocumentSegment.document_id == dataset_document.id
+            ).scalar()
+
         # update document status to completed
         self._update_document_index_status(
             document_id=dataset_document.id,
@@ -720,6 +1030,88 @@ class IndexingRunner:
             }
         )
 
+    def _index_documents(self, dataset: Dataset, dataset_document: DatasetDocument,
+                         documents: List[Document]) -> int:
+        """
+        Add the documents to the vector and keyword indexes 100 at a time and complete their segments.
+
+        :return: embedding tokens of the documents
+        """
+        vector_index = IndexBuilder.get_index(dataset, 'high_quality')
+        keyword_table_index = IndexBuilder.get_index(dataset, 'economy')
+        embedding_model = self._get_embedding_model(dataset)
+
+        # chunk nodes by chunk size
+        tokens = 0
+        chunk_size = 100
+        chunks = [documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)]
+
+        # the following chunks are embedded ahead on a bounded pool while the current chunk is written
+        # to the indexes, the embeddings are persisted by the embedding cache and reused by the vector index
+        embedding_executor = None
+        embedding_futures = deque()
+        max_workers = int(current_app.config.get('INDEXING_EMBEDDING_MAX_WORKERS', 4))
+        if vector_index and embedding_model and max_workers > 0 and len(chunks) > 1:
+            embedding_executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                    thread_name_prefix='indexing_embedding')
+
+        try:
+            next_chunk_index = 0
+            for chunk_index, chunk_documents in enumerate(chunks):
+                # check document is paused
+                self._check_document_paused_status(dataset_document.id)
+                if embedding_executor:
+                    while next_chunk_index < len(chunks) and next_chunk_index <= chunk_index + max_workers:
+                        embedding_futures.append(embedding_executor.submit(
+                            self._embed_chunk,
+                            flask_app=current_app._get_current_object(),
+                            embedding_model=embedding_model,
+                            documents=chunks[next_chunk_index]
+                        ))
+                        next_chunk_index += 1
+
+                    tokens += embedding_futures.popleft().result()
+                elif dataset.indexing_technique == 'high_quality' or embedding_model:
+                    tokens += sum(embedding_model.get_num_tokens_batch(
+                        [document.page_content for document in chunk_documents]
+                    ))
+
+                # save vector index
+                if vector_index:
+                    vector_index.add_texts(chunk_documents)
+
+                # save keyword index
+                keyword_table_index.add_texts(chunk_documents)
+
+                document_ids = [document.metadata['doc_id'] for document in chunk_documents]
+                db.session.query(DocumentSegment).filter(
+                    DocumentSegment.document_id == dataset_document.id,
+                    DocumentSegment.index_node_id.in_(document_ids),
+                    DocumentSegment.status == "indexing"
+                ).update({
+                    DocumentSegment.status: "completed",
+                    DocumentSegment.enabled: True,
+                    DocumentSegment.completed_at: datetime.datetime.utcnow()
+                }, synchronize_session=False)
+
+                db.session.commit()
+        finally:
+            if embedding_executor:
+                embedding_executor.shutdown(wait=True, cancel_futures=True)
+
+        return tokens
+
+    def _embed_chunk(self, flask_app: Flask, embedding_model: BaseEmbedding, documents: List[Document]) -> int:
+        """
+        Embed the documents into the embedding cache.
+
+        :return: tokens of the documents
+        """
+        with flask_app.app_context():
+            CacheEmbedding(embedding_model).embed_documents([document.page_content for document in documents])
+
+            return sum(embedding_model.get_num_tokens_batch([document.page_content for document in documents]))
+
     def _check_document_paused_status(self, document_id: str):
         indexing_cache_key = 'document_{}_is_paused'.format(document_id)
         result = redis_client.get(indexing_cache_key)
@@ -3,6 +3,7 @@ from typing import Any, List, Dict
 from langchain.memory.chat_memory import BaseChatMemory
 from langchain.schema import get_buffer_string, BaseMessage
 
+from core.helper.tokenizer import tokenizer_service
 from core.model_providers.models.entity.message import PromptMessage, MessageType, to_lc_messages
 from core.model_providers.models.llm.base import BaseLLM
 from extensions.ext_database import db
@@ -37,16 +38,44 @@ class ReadOnlyConversationTokenDBBufferSharedMemory(BaseChatMemory):
         if not chat_messages:
             return []
 
-        # prune the chat message if it exceeds the max token limit
-        curr_buffer_length = self.model_instance.get_num_tokens(chat_messages)
-        if curr_buffer_length > self.max_token_limit:
-            pruned_memory = []
-            while curr_buffer_length > self.max_token_limit and chat_messages:
-                pruned_memory.append(chat_messages.pop(0))
-                curr_buffer_length = self.model_instance.get_num_tokens(chat_messages)
+        # prune the oldest chat messages with a running sum of the per message tokens
+        # if the buffer exceeds the max token limit, each per message count includes the overhead
+        # of a whole prompt, which is only counted once for the buffer
+        message_tokens = [self._get_message_tokens(chat_message) for chat_message in chat_messages]
+        messages_overhead = self._get_messages_overhead()
+        curr_buffer_length = sum(message_tokens) - messages_overhead * (len(message_tokens) - 1)
+        pruned_count = 0
+        while curr_buffer_length > self.max_token_limit and pruned_count < len(chat_messages):
+            curr_buffer_length -= message_tokens[pruned_count] - messages_overhead
+            pruned_count += 1
+
+        chat_messages = chat_messages[pruned_count:]
 
         return to_lc_messages(chat_messages)
 
+    def _get_message_tokens(self, message: PromptMessage) -> int:
+        """Count the tokens of one message, memoized so each message of the history is only counted once."""
+        return tokenizer_service.memoize(
+            f'{self.model_instance.model_provider.provider_name}:{self.model_instance.name}:{message.type.value}',
+            message.content,
+            lambda: self.model_instance.get_num_tokens([message])
+        )
+
+    def _get_messages_overhead(self) -> int:
+        """
+        Count the tokens a prompt of several messages adds only once, e.g. the reply priming of chat models,
+        negative if joining the messages adds tokens. Memoized, the overhead is the same for every prompt of the model.
+        """
+        messages = [PromptMessage(content='a', type=MessageType.HUMAN),
+                    PromptMessage(content='b', type=MessageType.ASSISTANT)]
+
+        return tokenizer_service.memoize(
+            f'{self.model_instance.model_provider.provider_name}:{self.model_instance.name}:overhead',
+            '',
+            lambda: (sum(self._get_message_tokens(message) for message in messages)
+                     - self.model_instance.get_num_tokens(messages))
+        )
+
     @property
     def memory_variables(self) -> List[str]:
         """Will always return list of memory variables.
@@ -4,6 +4,7 @@ from langchain.callbacks.base import Callbacks
 
 from core.model_providers.error import ProviderTokenNotInitError, LLMBadRequestError
 from core.model_providers.model_provider_factory import ModelProviderFactory, DEFAULT_MODELS
+from core.model_providers.model_resolution_context import ModelResolutionContext
 from core.model_providers.models.base import BaseProviderModel
 from core.model_providers.models.embedding.base import BaseEmbedding
 from core.model_providers.models.entity.model_params import ModelKwargs, ModelType
@@ -75,7 +76,7 @@ class ModelFactory:
             is_default_model = True
 
         # get model provider
-        model_provider = ModelProviderFactory.get_preferred_model_provider(tenant_id, model_provider_name)
+        model_provider = cls.get_preferred_model_provider(tenant_id, model_provider_name)
 
         if not model_provider:
             raise ProviderTokenNotInitError(f"Model {model_name} provider credentials is not initialized.")
@@ -128,7 +129,7 @@ class ModelFactory:
             model_name = default_model.model_name
 
         # get model provider
-        model_provider = ModelProviderFactory.get_preferred_model_provider(tenant_id, model_provider_name)
+        model_provider = cls.get_preferred_model_provider(tenant_id, model_provider_name)
 
         if not model_provider:
             raise ProviderTokenNotInitError(f"Model {model_name} provider credentials is not initialized.")
@@ -165,7 +166,7 @@ class ModelFactory:
             model_name = default_model.model_name
 
         # get model provider
-        model_provider = ModelProviderFactory.get_preferred_model_provider(tenant_id, model_provider_name)
+        model_provider = cls.get_preferred_model_provider(tenant_id, model_provider_name)
 
         if not model_provider:
             raise ProviderTokenNotInitError(f"Model {model_name} provider credentials is not initialized.")
@@ -191,7 +192,7 @@ class ModelFactory:
         :return:
         """
         # get model provider
-        model_provider = ModelProviderFactory.get_preferred_model_provider(tenant_id, model_provider_name)
+        model_provider = cls.get_preferred_model_provider(tenant_id, model_provider_name)
 
         if not model_provider:
             raise ProviderTokenNotInitError(f"Model {model_name} provider credentials is not initialized.")
@@ -203,15 +204,45 @@ class ModelFactory:
             name=model_name
         )
 
+    @classmethod
+    def get_preferred_model_provider(cls, tenant_id: str, model_provider_name: str):
+        """
+        get preferred model provider, resolved once per request.
+
+        :param tenant_id: a string representing the ID of the tenant.
+        :param model_provider_name:
+        :return:
+        """
+        context = ModelResolutionContext.get_current()
+        if not context:
+            return ModelProviderFactory.get_preferred_model_provider(tenant_id, model_provider_name)
+
+        return context.get_model_provider(
+            tenant_id,
+            model_provider_name,
+            lambda: ModelProviderFactory.get_preferred_model_provider(tenant_id, model_provider_name)
+        )
+
     @classmethod
     def get_default_model(cls, tenant_id: str, model_type: ModelType) -> TenantDefaultModel:
         """
-        get default model of model type.
+        get default model of model type, resolved once per request.
 
         :param tenant_id:
         :param model_type:
         :return:
         """
+        context = ModelResolutionContext.get_current()
+        if not context:
+            return cls._get_default_model(tenant_id, model_type)
+
+        return context.get_or_resolve(
+            ('default_model', tenant_id, model_type.value),
+            lambda: cls._get_default_model(tenant_id, model_type)
+        )
+
+    @classmethod
+    def _get_default_model(cls, tenant_id: str, model_type: ModelType) -> TenantDefaultModel:
         # get default model
         default_model = db.session.query(TenantDefaultModel) \
             .filter(
@@ -222,7 +253,7 @@ class ModelFactory:
         if not default_model:
             model_provider_rules = ModelProviderFactory.get_provider_rules()
             for model_provider_name, model_provider_rule in model_provider_rules.items():
-                model_provider = ModelProviderFactory.get_preferred_model_provider(tenant_id, model_provider_name)
+                model_provider = cls.get_preferred_model_provider(tenant_id, model_provider_name)
                 if not model_provider:
                     continue
 
@@ -293,4 +324,6 @@ class ModelFactory:
             db.session.add(default_model)
             db.session.commit()
 
+        ModelResolutionContext.invalidate_current()
+
         return default_model
@@ -0,0 +1,115 @@
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.model_providers.models.entity.model_params import ModelType
+from core.model_providers.providers.base import BaseModelProvider
+
+# queries executed by the resolutions running in the current thread
+_resolution_queries = threading.local()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _count_resolution_query(orm_execute_state):
+    if getattr(_resolution_queries, 'count', None) is not None:
+        _resolution_queries.count += 1
+
+
+class ModelResolutionContext:
+    """
+    Request scoped cache of the model provider resolutions of ModelFactory.
+
+    The preferred provider of a tenant and the model credentials are resolved once per app context
+    (a request or a celery task) and reused by every model instance created during it.
+    The queries each resolution executed are counted, so `stats` shows the queries saved by the reuses.
+    """
+
+    def __init__(self):
+        self._resolutions = {}
+        self._resolution_queries = {}
+        self._stats = {
+            'resolutions': 0,
+            'reuses': 0,
+            'queries_executed': 0,
+            'queries_saved': 0
+        }
+
+    @classmethod
+    def get_current(cls) -> Optional['ModelResolutionContext']:
+        if not has_app_context():
+            return None
+
+        context = g.get('_model_resolution_context')
+        if context is None:
+            context = cls()
+            g._model_resolution_context = context
+
+        return context
+
+    @classmethod
+    def invalidate_current(cls):
+        """Drop the resolutions of the current app context, e.g. after provider credentials have been changed."""
+        if has_app_context():
+            g.pop('_model_resolution_context', None)
+
+    def get_model_provider(self, tenant_id: str, model_provider_name: str,
+                           resolve: Callable[[], Optional[BaseModelProvider]]) -> Optional[BaseModelProvider]:
+        def resolve_model_provider():
+            model_provider = resolve()
+            if model_provider:
+                self._memoize_model_credentials(model_provider)
+
+            return model_provider
+
+        return self.get_or_resolve(('provider', tenant_id, model_provider_name), resolve_model_provider)
+
+    def get_or_resolve(self, key: tuple, resolve: Callable) -> Any:
+        """
+        Get the resolution of the key, resolved on the first call of the context.
+
+        :param key: resolution key
+        :param resolve: resolves the key
+        :return: resolution
+        """
+        if key in self._resolutions:
+            self._stats['reuses'] += 1
+            self._stats['queries_saved'] += self._resolution_queries[key]
+            logging.debug(f"Reused model resolution {key}, "
+                          f"{self._stats['queries_saved']} queries saved in this context.")
+            return self._resolutions[key]
+
+        outer_count = getattr(_resolution_queries, 'count', None)
+        _resolution_queries.count = 0
+        try:
+            resolution = resolve()
+        finally:
+            queries = _resolution_queries.count
+            # nested resolutions count towards the outer resolution as well
+            _resolution_queries.count = outer_count + queries if outer_count is not None else None
+
+        self._stats['resolutions'] += 1
+        self._stats['queries_executed'] += queries
+        self._resolutions[key] = resolution
+        self._resolution_queries[key] = queries
+
+        return resolution
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    def _memoize_model_credentials(self, model_provider: BaseModelProvider):
+        get_model_credentials = model_provider.get_model_credentials
+
+        def memoized_get_model_credentials(model_name: str, model_type: ModelType, obfuscated: bool = False) -> dict:
+            credentials = self.get_or_resolve(
+                ('credentials', model_provider.provider.id, model_name, model_type.value, obfuscated),
+                lambda: get_model_credentials(model_name, model_type, obfuscated)
+            )
+            return dict(credentials)
+
+        # the model provider is a pydantic model, bypass its field validation to shadow the method on the instance
+        object.__setattr__(model_provider, 'get_model_credentials', memoized_get_model_credentials)
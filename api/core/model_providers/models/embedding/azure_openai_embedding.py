@@ -1,8 +1,8 @@
 import decimal
 import logging
+from typing import Optional
 
 import openai
-import tiktoken
 from langchain.embeddings import OpenAIEmbeddings
 
 from core.model_providers.error import LLMBadRequestError, LLMAuthorizationError, LLMRateLimitError, \
@@ -41,22 +41,9 @@ class AzureOpenAIEmbedding(BaseEmbedding):
         """
         return self.credentials.get("base_model_name")
 
-    def get_num_tokens(self, text: str) -> int:
-        """
-        get num tokens of text.
-
-        :param text:
-        :return:
-        """
-        if len(text) == 0:
-            return 0
-
-        enc = tiktoken.encoding_for_model(self.credentials.get('base_model_name'))
-
-        tokenized_text = enc.encode(text)
-
-        # calculate the number of tokens in the encoded text
-        return len(tokenized_text)
+    @property
+    def tokenizer_model_name(self) -> Optional[str]:
+        return self.credentials.get('base_model_name')
 
     def handle_exceptions(self, ex: Exception) -> Exception:
         if isinstance(ex, openai.error.InvalidRequestError):
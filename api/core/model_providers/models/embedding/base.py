@@ -1,10 +1,8 @@
 from abc import abstractmethod
-from typing import Any
+from typing import Any, List, Optional
 import decimal
 
-import tiktoken
-from langchain.schema.language_model import _get_token_ids_default_method
-
+from core.helper.tokenizer import tokenizer_service
 from core.model_providers.models.base import BaseProviderModel
 from core.model_providers.models.entity.model_params import ModelType
 from core.model_providers.providers.base import BaseModelProvider
@@ -76,6 +74,15 @@ class BaseEmbedding(BaseProviderModel):
         logger.debug(f'unit_price:{unit_price}')
         return unit_price
 
+    @property
+    def tokenizer_model_name(self) -> Optional[str]:
+        """
+        tiktoken model name used to count tokens, None for the default GPT-2 tokenizer.
+
+        :return: str
+        """
+        return None
+
     def get_num_tokens(self, text: str) -> int:
         """
         get num tokens of text.
@@ -86,7 +93,16 @@ class BaseEmbedding(BaseProviderModel):
         if len(text) == 0:
             return 0
 
-        return len(_get_token_ids_default_method(text))
+        return tokenizer_service.count_token(text, self.tokenizer_model_name)
+
+    def get_num_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        get num tokens of each text, encoded in one batch.
+
+        :param texts:
+        :return:
+        """
+        return tokenizer_service.count_tokens(texts, self.tokenizer_model_name)
 
     def get_currency(self):
         """
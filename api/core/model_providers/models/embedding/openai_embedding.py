@@ -1,8 +1,8 @@
 import decimal
 import logging
+from typing import Optional
 
 import openai
-import tiktoken
 from langchain.embeddings import OpenAIEmbeddings
 
 from core.model_providers.error import LLMBadRequestError, LLMAPIConnectionError, LLMAPIUnavailableError, \
@@ -25,22 +25,9 @@ class OpenAIEmbedding(BaseEmbedding):
 
         super().__init__(model_provider, client, name)
 
-    def get_num_tokens(self, text: str) -> int:
-        """
-        get num tokens of text.
-
-        :param text:
-        :return:
-        """
-        if len(text) == 0:
-            return 0
-
-        enc = tiktoken.encoding_for_model(self.name)
-
-        tokenized_text = enc.encode(text)
-
-        # calculate the number of tokens in the encoded text
-        return len(tokenized_text)
+    @property
+    def tokenizer_model_name(self) -> Optional[str]:
+        return self.name
 
     def handle_exceptions(self, ex: Exception) -> Exception:
         if isinstance(ex, openai.error.InvalidRequestError):
@@ -334,14 +334,14 @@ class BaseLLM(BaseProviderModel):
                              memory: Optional[BaseChatMemory]) -> Tuple[str, Optional[list]]:
         context_prompt_content = ''
         if context and 'context_prompt' in prompt_rules:
-            prompt_template = JinjaPromptTemplate.from_template(template=prompt_rules['context_prompt'])
+            prompt_template = JinjaPromptTemplate.from_cached_template(template=prompt_rules['context_prompt'])
             context_prompt_content = prompt_template.format(
                 context=context
             )
 
         pre_prompt_content = ''
         if pre_prompt:
-            prompt_template = JinjaPromptTemplate.from_template(template=pre_prompt)
+            prompt_template = JinjaPromptTemplate.from_cached_template(template=pre_prompt)
             prompt_inputs = {k: inputs[k] for k in prompt_template.input_variables if k in inputs}
             pre_prompt_content = prompt_template.format(
                 **prompt_inputs
@@ -377,7 +377,7 @@ class BaseLLM(BaseProviderModel):
             memory.ai_prefix = prompt_rules['assistant_prefix'] if 'assistant_prefix' in prompt_rules else 'Assistant'
 
             histories = self._get_history_messages_from_memory(memory, rest_tokens)
-            prompt_template = JinjaPromptTemplate.from_template(template=prompt_rules['histories_prompt'])
+            prompt_template = JinjaPromptTemplate.from_cached_template(template=prompt_rules['histories_prompt'])
             histories_prompt_content = prompt_template.format(
                 histories=histories
             )
@@ -391,7 +391,7 @@ class BaseLLM(BaseProviderModel):
                 elif order == 'histories_prompt':
                     prompt += histories_prompt_content
 
-        prompt_template = JinjaPromptTemplate.from_template(template=query_prompt)
+        prompt_template = JinjaPromptTemplate.from_cached_template(template=query_prompt)
         query_prompt_content = prompt_template.format(
             query=query
         )
@@ -407,15 +407,7 @@ class BaseLLM(BaseProviderModel):
         return prompt, stops
 
     def _read_prompt_rules_from_file(self, prompt_name: str) -> dict:
-        # Get the absolute path of the subdirectory
-        prompt_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))),
-            'prompt/generate_prompts')
-
-        json_file_path = os.path.join(prompt_path, f'{prompt_name}.json')
-        # Open the JSON file and read its content
-        with open(json_file_path, 'r') as json_file:
-            return json.load(json_file)
+        return get_prompt_rules(prompt_name)
 
     def _get_history_messages_from_memory(self, memory: BaseChatMemory,
                                           max_token_limit: int) -> str:
@@ -479,3 +471,31 @@ class BaseLLM(BaseProviderModel):
             model_kwargs_input[key] = value
 
         return model_kwargs_input
+
+
+def _load_prompt_rules() -> dict:
+    # Get the absolute path of the subdirectory
+    prompt_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))),
+        'prompt/generate_prompts')
+
+    prompt_rules = {}
+    for file_name in os.listdir(prompt_path):
+        if not file_name.endswith('.json'):
+            continue
+
+        with open(os.path.join(prompt_path, file_name), 'r') as json_file:
+            prompt_rules[file_name[:-len('.json')]] = json.load(json_file)
+
+    return prompt_rules
+
+
+# prompt rules of all prompt files, loaded once per process
+_prompt_rules = _load_prompt_rules()
+
+
+def get_prompt_rules(prompt_name: str) -> dict:
+    if prompt_name not in _prompt_rules:
+        raise FileNotFoundError(f'Prompt rules {prompt_name} not found.')
+
+    return _prompt_rules[prompt_name]
@@ -1,4 +1,5 @@
 import decimal
+import json
 import logging
 from typing import List, Optional, Any
 
@@ -6,6 +7,7 @@ import openai
 from langchain.callbacks.manager import Callbacks
 from langchain.schema import LLMResult
 
+from core.helper.tokenizer import tokenizer_service
 from core.model_providers.providers.base import BaseModelProvider
 from core.third_party.langchain.llms.chat_open_ai import EnhanceChatOpenAI
 from core.model_providers.error import LLMBadRequestError, LLMAPIConnectionError, LLMAPIUnavailableError, \
@@ -116,9 +118,14 @@ class OpenAIModel(BaseLLM):
         """
         prompts = self._get_prompt_from_messages(messages)
         if isinstance(prompts, str):
-            return self._client.get_num_tokens(prompts)
+            return tokenizer_service.count_token(prompts, self.name)
         else:
-            return max(self._client.get_num_tokens_from_messages(prompts) - len(prompts), 0)
+            num_tokens = tokenizer_service.memoize(
+                f'{self.name}:messages',
+                json.dumps([[prompt.type, prompt.content] for prompt in prompts]),
+                lambda: self._client.get_num_tokens_from_messages(prompts)
+            )
+            return max(num_tokens - len(prompts), 0)
 
     def _set_model_kwargs(self, model_kwargs: ModelKwargs):
         provider_model_kwargs = self._to_model_kwargs_input(self.model_rules, model_kwargs)
@@ -1,10 +1,15 @@
 import re
+import threading
 from typing import Any
 
-from jinja2 import Environment, meta
+from cachetools import LRUCache
+from jinja2 import Environment, Template, meta
 from langchain import PromptTemplate
 from langchain.formatting import StrictFormatter
 
+# max number of prompt templates and compiled jinja templates kept per process
+TEMPLATE_CACHE_MAXSIZE = 1024
+
 
 class JinjaPromptTemplate(PromptTemplate):
     template_format: str = "jinja2"
@@ -28,6 +33,42 @@ class JinjaPromptTemplate(PromptTemplate):
             input_variables=list(sorted(input_variables)), template=template, **kwargs
         )
 
+    @classmethod
+    def from_cached_template(cls, template: str) -> PromptTemplate:
+        """
+        Load a prompt template of the prompt rules or an app config, cached by template text with its compiled
+        jinja template. Templates containing per-request text, e.g. a rendered context, must use `from_template`.
+        """
+        with _template_cache_lock:
+            prompt_template = _prompt_template_cache.get(template)
+
+        if prompt_template is None:
+            prompt_template = cls.from_template(template)
+            compiled_template = Template(prompt_template.template)
+            with _template_cache_lock:
+                _prompt_template_cache[template] = prompt_template
+                _compiled_template_cache[prompt_template.template] = compiled_template
+
+        return prompt_template
+
+    def format(self, **kwargs: Any) -> str:
+        """Format the prompt with the inputs, the compiled jinja template of a cached template is reused."""
+        kwargs = self._merge_partial_and_user_variables(**kwargs)
+        return get_compiled_template(self.template).render(**kwargs)
+
+
+_prompt_template_cache = LRUCache(maxsize=TEMPLATE_CACHE_MAXSIZE)
+_compiled_template_cache = LRUCache(maxsize=TEMPLATE_CACHE_MAXSIZE)
+_template_cache_lock = threading.Lock()
+
+
+def get_compiled_template(template: str) -> Template:
+    """Get the cached compiled template of a cached prompt template, other templates are compiled each time."""
+    with _template_cache_lock:
+        compiled_template = _compiled_template_cache.get(template)
+
+    return compiled_template if compiled_template is not None else Template(template)
+
 
 class OutLinePromptTemplate(PromptTemplate):
     @classmethod
@@ -0,0 +1,330 @@
+"""Text splitters cutting chunks by the token offsets of a single document encoding."""
+from __future__ import annotations
+
+import copy
+import re
+from collections import deque
+from itertools import accumulate
+from operator import sub
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import tiktoken
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from core.helper.tokenizer import tokenizer_service
+
+Span = Tuple[int, int]
+# char span and token count of a split
+Split = Tuple[int, int, int]
+
+
+class TokenOffsets:
+    """
+    Token offsets of a text, encoded once.
+
+    Each token is mapped to the char offset it starts at, so the tokens of any char span
+    are counted with prefix sums instead of encoding the span again.
+    """
+
+    # chars started by each token of an encoding, and whether the token starts in the middle of a multibyte char
+    _token_char_lengths: Dict[str, Tuple[List[int], List[int]]] = {}
+
+    def __init__(self, text: str, encoding: tiktoken.Encoding):
+        token_char_lengths, token_continuations = self._get_token_char_lengths(encoding)
+        tokens = encoding.encode_ordinary(text)
+
+        # a token starting in the middle of a multibyte char is counted at that char
+        token_char_starts = map(
+            sub,
+            accumulate(map(token_char_lengths.__getitem__, tokens[:-1]), initial=0),
+            map(token_continuations.__getitem__, tokens)
+        )
+
+        # tokens starting at each char offset
+        self._token_starts = [0] * (len(text) + 1)
+        for token_char_start in token_char_starts:
+            self._token_starts[min(max(token_char_start, 0), len(text))] += 1
+
+        # tokens starting before each char offset
+        self._tokens_before = list(accumulate(self._token_starts, initial=0))
+
+    def count(self, start: int, end: int) -> int:
+        """
+        Count the tokens of the char span, a span starting inside a token counts the partial token.
+        """
+        if start >= end:
+            return 0
+
+        count = self._tokens_before[end] - self._tokens_before[start]
+        if not self._token_starts[start]:
+            count += 1
+
+        return count
+
+    @classmethod
+    def _get_token_char_lengths(cls, encoding: tiktoken.Encoding) -> Tuple[List[int], List[int]]:
+        token_char_lengths = cls._token_char_lengths.get(encoding.name)
+        if token_char_lengths is None:
+            char_lengths = [0] * encoding.n_vocab
+            continuations = [0] * encoding.n_vocab
+            for token in range(encoding.n_vocab):
+                try:
+                    token_bytes = encoding.decode_single_token_bytes(token)
+                except KeyError:
+                    continue
+                # count the utf-8 lead bytes
+                char_lengths[token] = sum(1 for byte in token_bytes if byte & 0xC0 != 0x80)
+                continuations[token] = 1 if token_bytes and token_bytes[0] & 0xC0 == 0x80 else 0
+
+            token_char_lengths = (char_lengths, continuations)
+            cls._token_char_lengths[encoding.name] = token_char_lengths
+
+        return token_char_lengths
+
+
+class TokenOffsetTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    Recursive character text splitter measuring the chunk size in tokens.
+
+    The splitting rules of RecursiveCharacterTextSplitter.from_tiktoken_encoder are kept (regex separators,
+    kept separators, chunk size and overlap), but the cleaned text is encoded only once and the pieces are
+    measured by token offsets, instead of encoding every candidate piece and every merge.
+    The chunks are encoded once more, so their exact token counts are returned with them.
+
+    With a tokenizer model name, e.g. the one of the embedding model the chunks are indexed with, the chunks are
+    counted with the tiktoken encoding of that model instead, and create_documents memoizes the counts under
+    that model, so indexing does not encode the chunks again to count their tokens.
+    """
+
+    def __init__(self, encoding_name: str = "gpt2", separators: Optional[List[str]] = None,
+                 tokenizer_model_name: Optional[str] = None, **kwargs: Any):
+        """Create a new TextSplitter."""
+        kwargs.pop('keep_separator', None)
+        super().__init__(separators=separators, keep_separator=True, **kwargs)
+        self._encoding = tiktoken.get_encoding(encoding_name)
+        self._length_function = lambda text: len(self._encoding.encode_ordinary(text))
+        self._tokenizer_model_name = tokenizer_model_name
+        # the same encoding the tokenizer service counts the texts of the model with
+        self._count_encoding = tokenizer_service.get_encoding(tokenizer_model_name) \
+            if tokenizer_model_name else self._encoding
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for chunk, _ in self.split_text_with_token_counts(text)]
+
+    def split_text_with_token_counts(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Split the text and count the exact tokens of each chunk.
+
+        :param text: text
+        :return: chunks and their token counts, in the encoding of the tokenizer model if one is given
+        """
+        if not text:
+            return []
+
+        chunks = self._split_spans(text, TokenOffsets(text, self._encoding))
+        if not chunks:
+            return []
+
+        # chunks are small, encoding them one by one is cheaper than dispatching them to the batch threads
+        return [(chunk, len(self._count_encoding.encode_ordinary(chunk))) for chunk in chunks]
+
+    def create_documents(
+        self, texts: List[str], metadatas: Optional[List[dict]] = None
+    ) -> List[Document]:
+        """Create documents from a list of texts, the token counts of the chunks are memoized."""
+        _metadatas = metadatas or [{}] * len(texts)
+        documents = []
+        for i, text in enumerate(texts):
+            index = -1
+            chunks_with_token_counts = self.split_text_with_token_counts(text)
+            if self._tokenizer_model_name:
+                # the chunks are counted again with the tokenizer model when they are indexed
+                tokenizer_service.prime(chunks_with_token_counts, self._tokenizer_model_name)
+
+            for chunk, _ in chunks_with_token_counts:
+                metadata = copy.deepcopy(_metadatas[i])
+                if self._add_start_index:
+                    index = text.find(chunk, index + 1)
+                    metadata["start_index"] = index
+                documents.append(Document(page_content=chunk, metadata=metadata))
+
+        return documents
+
+    def _split_spans(self, text: str, offsets: TokenOffsets) -> List[str]:
+        return self._split_span(text, offsets, (0, len(text)), self._separators)
+
+    def _split_span(self, text: str, offsets: TokenOffsets, span: Span, separators: List[str]) -> List[str]:
+        """Split the span of the text, see RecursiveCharacterTextSplitter._split_text."""
+        start, end = span
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = separators[-1]
+        new_separators = []
+        for i, _s in enumerate(separators):
+            if _s == "":
+                separator = _s
+                break
+            if re.compile(_s).search(text, start, end):
+                separator = _s
+                new_separators = separators[i + 1:]
+                break
+
+        splits = self._split_span_with_regex(text, span, separator)
+        # Now go merging things, recursively splitting longer texts.
+        _good_splits = []
+        for split in self._measure(offsets, splits):
+            if split[2] < self._chunk_size:
+                _good_splits.append(split)
+            else:
+                if _good_splits:
+                    final_chunks.extend(self._merge_splits_of_spans(text, _good_splits, 0))
+                    _good_splits = []
+                if not new_separators:
+                    final_chunks.append(text[split[0]:split[1]])
+                else:
+                    final_chunks.extend(self._split_span(text, offsets, split[:2], new_separators))
+        if _good_splits:
+            final_chunks.extend(self._merge_splits_of_spans(text, _good_splits, 0))
+        return final_chunks
+
+    @staticmethod
+    def _split_span_with_regex(text: str, span: Span, separator: str) -> List[Span]:
+        """Split the span at the separator matches, the separators are kept at the start of the splits."""
+        start, end = span
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+
+        splits = []
+        split_start = start
+        for match in re.compile(separator).finditer(text, start, end):
+            if match.start() > split_start:
+                splits.append((split_start, match.start()))
+                split_start = match.start()
+        if end > split_start:
+            splits.append((split_start, end))
+        return splits
+
+    @staticmethod
+    def _measure(offsets: TokenOffsets, spans: List[Span]) -> List[Split]:
+        return [(start, end, offsets.count(start, end)) for start, end in spans]
+
+    def _merge_splits_of_spans(self, text: str, splits: List[Split], separator_len: int) -> List[str]:
+        """
+        Merge the consecutive splits into chunks, see TextSplitter._merge_splits.
+        The splits are adjacent or separated by exactly one separator in the text,
+        so a chunk joined by the separator is the span from its first to its last split.
+        """
+        docs = []
+        current_doc = deque()
+        total = 0
+        for split in splits:
+            _len = split[2]
+            if total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size:
+                if len(current_doc) > 0:
+                    doc = self._join_span(text, (current_doc[0][0], current_doc[-1][1]))
+                    if doc is not None:
+                        docs.append(doc)
+                    # Keep on popping if:
+                    # - we have a larger chunk than in the chunk overlap
+                    # - or if we still have any chunks and the length is long
+                    while total > self._chunk_overlap or (
+                        total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size
+                        and total > 0
+                    ):
+                        total -= current_doc[0][2] + (separator_len if len(current_doc) > 1 else 0)
+                        current_doc.popleft()
+            current_doc.append(split)
+            total += _len + (separator_len if len(current_doc) > 1 else 0)
+        if current_doc:
+            doc = self._join_span(text, (current_doc[0][0], current_doc[-1][1]))
+            if doc is not None:
+                docs.append(doc)
+        return docs
+
+    @staticmethod
+    def _join_span(text: str, span: Span) -> Optional[str]:
+        doc = text[span[0]:span[1]].strip()
+        return doc if doc else None
+
+
+class FixedTokenOffsetTextSplitter(TokenOffsetTextSplitter):
+    """
+    Token offset counterpart of FixedRecursiveCharacterTextSplitter, the text is split at the fixed separator first,
+    the pieces longer than the chunk size are split recursively at the plain string separators.
+    """
+
+    def __init__(self, fixed_separator: str = "\n\n", separators: Optional[List[str]] = None, **kwargs: Any):
+        """Create a new TextSplitter."""
+        super().__init__(**kwargs)
+        self._fixed_separator = fixed_separator
+        self._separators = separators or ["\n\n", "\n", " ", ""]
+
+    def _split_spans(self, text: str, offsets: TokenOffsets) -> List[str]:
+        if self._fixed_separator:
+            chunks = self._split_span_with_string(text, (0, len(text)), self._fixed_separator)
+        else:
+            chunks = [(i, i + 1) for i in range(len(text))]
+
+        final_chunks = []
+        for chunk in self._measure(offsets, chunks):
+            if chunk[2] > self._chunk_size:
+                final_chunks.extend(self._recursive_split_span(text, offsets, chunk[:2]))
+            else:
+                final_chunks.append(text[chunk[0]:chunk[1]])
+
+        return final_chunks
+
+    def _recursive_split_span(self, text: str, offsets: TokenOffsets, span: Span) -> List[str]:
+        """Split the span of the text, see FixedRecursiveCharacterTextSplitter.recursive_split_text."""
+        start, end = span
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = self._separators[-1]
+        for _s in self._separators:
+            if _s == "":
+                separator = _s
+                break
+            if text.find(_s, start, end) != -1:
+                separator = _s
+                break
+        # Now that we have the separator, split the text
+        if separator:
+            splits = self._split_span_with_string(text, span, separator)
+        else:
+            splits = [(i, i + 1) for i in range(start, end)]
+        separator_len = self._length_function(separator)
+        # Now go merging things, recursively splitting longer texts.
+        _good_splits = []
+        for split in self._measure(offsets, splits):
+            if split[2] < self._chunk_size:
+                _good_splits.append(split)
+            else:
+                if _good_splits:
+                    final_chunks.extend(self._merge_splits_of_spans(text, _good_splits, separator_len))
+                    _good_splits = []
+                final_chunks.extend(self._recursive_split_span(text, offsets, split[:2]))
+        if _good_splits:
+            final_chunks.extend(self._merge_splits_of_spans(text, _good_splits, separator_len))
+        return final_chunks
+
+    @staticmethod
+    def _split_span_with_string(text: str, span: Span, separator: str) -> List[Span]:
+        """Split the span at the separator like str.split, the separators are dropped and empty splits kept."""
+        start, end = span
+        splits = []
+        split_start = start
+        while True:
+            index = text.find(separator, split_start, end)
+            if index == -1:
+                break
+            splits.append((split_start, index))
+            split_start = index + len(separator)
+        splits.append((split_start, end))
+        return splits
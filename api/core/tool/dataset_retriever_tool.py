@@ -8,12 +8,13 @@ from pydantic import Field, BaseModel
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
 from core.conversation_message_task import ConversationMessageTask
 from core.embedding.cached_embedding import CacheEmbedding
+from core.helper.segment_hydrator import SegmentHydrator
 from core.index.keyword_table_index.keyword_table_index import KeywordTableIndex, KeywordTableConfig
 from core.index.vector_index.vector_index import VectorIndex
 from core.model_providers.error import LLMBadRequestError, ProviderTokenNotInitError
 from core.model_providers.model_factory import ModelFactory
 from extensions.ext_database import db
-from models.dataset import Dataset, DocumentSegment, Document
+from models.dataset import Dataset
 
 
 class DatasetRetrieverToolInput(BaseModel):
@@ -110,19 +111,11 @@ class DatasetRetrieverTool(BaseTool):
                     document_score_list[item.metadata['doc_id']] = item.metadata['score']
             document_context_list = []
             index_node_ids = [document.metadata['doc_id'] for document in documents]
-            segments = DocumentSegment.query.filter(DocumentSegment.dataset_id == self.dataset_id,
-                                                    DocumentSegment.completed_at.isnot(None),
-                                                    DocumentSegment.status == 'completed',
-                                                    DocumentSegment.enabled == True,
-                                                    DocumentSegment.index_node_id.in_(index_node_ids)
-                                                    ).all()
-
-            if segments:
-                index_node_id_to_position = {id: position for position, id in enumerate(index_node_ids)}
-                sorted_segments = sorted(segments,
-                                         key=lambda segment: index_node_id_to_position.get(segment.index_node_id,
-                                                                                           float('inf')))
-                for segment in sorted_segments:
+            hydrated_segments = SegmentHydrator.hydrate(self.dataset_id, index_node_ids)
+
+            if hydrated_segments:
+                for hydrated_segment in hydrated_segments:
+                    segment = hydrated_segment.segment
                     if segment.answer:
                         document_context_list.append(f'question:{segment.content} answer:{segment.answer}')
                     else:
@@ -130,13 +123,10 @@ class DatasetRetrieverTool(BaseTool):
                 if self.return_resource:
                     context_list = []
                     resource_number = 1
-                    for segment in sorted_segments:
-                        context = {}
-                        document = Document.query.filter(Document.id == segment.document_id,
-                                                         Document.enabled == True,
-                                                         Document.archived == False,
-                                                         ).first()
-                        if dataset and document:
+                    for hydrated_segment in hydrated_segments:
+                        segment = hydrated_segment.segment
+                        document = hydrated_segment.document
+                        if dataset and hydrated_segment.document_available:
                             source = {
                                 'position': resource_number,
                                 'dataset_id': dataset.id,
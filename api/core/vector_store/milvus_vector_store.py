@@ -12,6 +12,10 @@ class MilvusVectorStore(Milvus):
             output='minimal'
         )
 
+    def del_texts_by_ids(self, uuids: list[str]) -> None:
+        for uuid in uuids:
+            self.del_text(uuid)
+
     def del_text(self, uuid: str) -> None:
         self._client.data_object.delete(
             uuid,
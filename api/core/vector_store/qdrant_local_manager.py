@@ -0,0 +1,134 @@
+import fcntl
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Generator
+
+import qdrant_client
+from qdrant_client.local.qdrant_local import QdrantLocal
+
+LOCK_FILENAME = '.dify.lock'
+GENERATION_FILENAME = '.dify.generation'
+
+
+class QdrantLocalManager:
+    """
+    Keeps the collections of a local (`path:`) Qdrant storage resident in the process.
+
+    Writers of all processes are serialized by an exclusive file lock on the storage folder and bump a
+    generation counter after each write. Readers take a shared file lock, and the collections are only
+    reloaded from disk when the generation has been changed by another process.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock_file_path = os.path.join(path, LOCK_FILENAME)
+        self._generation_file_path = os.path.join(path, GENERATION_FILENAME)
+        self._thread_lock = threading.RLock()
+        self._lock_file = None
+        self._lock_operation = None
+
+        os.makedirs(path, exist_ok=True)
+        with self._thread_lock, self._file_lock(fcntl.LOCK_SH):
+            self._client = qdrant_client.QdrantClient(path=path)
+            self._release_storage_lock()
+            self._generation = self._read_generation()
+
+    @property
+    def client(self) -> qdrant_client.QdrantClient:
+        return self._client
+
+    @contextmanager
+    def read(self) -> Generator[qdrant_client.QdrantClient, None, None]:
+        with self._thread_lock, self._file_lock(fcntl.LOCK_SH):
+            self._reload_if_changed()
+            yield self._client
+
+    @contextmanager
+    def write(self) -> Generator[qdrant_client.QdrantClient, None, None]:
+        with self._thread_lock, self._file_lock(fcntl.LOCK_EX):
+            self._reload_if_changed()
+            try:
+                yield self._client
+            finally:
+                # bump the generation even if the write failed halfway, other processes must reload
+                self._generation = self._read_generation() + 1
+                self._write_generation(self._generation)
+
+    def _reload_if_changed(self):
+        generation = self._read_generation()
+        if generation == self._generation:
+            return
+
+        local_client = self._client._client
+        if isinstance(local_client, QdrantLocal):
+            for collection in local_client.collections.values():
+                if collection.storage is not None:
+                    collection.storage.storage.close()
+
+            local_client.collections = {}
+            local_client.aliases = {}
+            local_client._load()
+            self._release_storage_lock()
+
+        self._generation = generation
+
+    def _release_storage_lock(self):
+        """
+        qdrant-client 1.1.7 keeps an exclusive lock on the storage folder for the lifetime of the client,
+        which fails the clients of other processes. The processes are coordinated by the file lock of the manager.
+        """
+        local_client = self._client._client
+        flock_file = getattr(local_client, '_flock_file', None)
+        if isinstance(local_client, QdrantLocal) and flock_file is not None:
+            # closing the file releases the lock
+            flock_file.close()
+            local_client._flock_file = None
+
+    @contextmanager
+    def _file_lock(self, operation: int):
+        """
+        Flock the storage folder, must be called with the thread lock held.
+        Nested calls of the same thread reuse the file lock, a shared lock is upgraded if a write is nested.
+        """
+        if self._lock_file is not None:
+            upgraded = operation == fcntl.LOCK_EX and self._lock_operation != fcntl.LOCK_EX
+            if upgraded:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                self._lock_operation = fcntl.LOCK_EX
+            try:
+                yield
+            finally:
+                if upgraded:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_SH)
+                    self._lock_operation = fcntl.LOCK_SH
+            return
+
+        with open(self._lock_file_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), operation)
+            self._lock_file = lock_file
+            self._lock_operation = operation
+            try:
+                yield
+            finally:
+                self._lock_file = None
+                self._lock_operation = None
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self._generation_file_path, 'r') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            logging.warning(f"Invalid qdrant local generation file: {self._generation_file_path}")
+            return 0
+
+    def _write_generation(self, generation: int):
+        tmp_file_path = self._generation_file_path + '.tmp'
+        with open(tmp_file_path, 'w') as f:
+            f.write(str(generation))
+
+        os.replace(tmp_file_path, self._generation_file_path)
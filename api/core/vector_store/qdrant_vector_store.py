@@ -1,55 +1,107 @@
-from typing import cast, Any
+from contextlib import nullcontext
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
 
+from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
-from qdrant_client.http.models import Filter, PointIdsList, FilterSelector
-from qdrant_client.local.qdrant_local import QdrantLocal
+from qdrant_client.http.models import Filter, PointIdsList, FilterSelector, FieldCondition, MatchAny
 
 from core.index.vector_index.qdrant import Qdrant
+from core.vector_store.qdrant_local_manager import QdrantLocalManager
 
 
 class QdrantVectorStore(Qdrant):
+    # set for local (`path:`) storages, coordinates reads and writes with other processes
+    local_manager: Optional[QdrantLocalManager] = None
+
+    def add_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            ids: Optional[Sequence[str]] = None,
+            batch_size: int = 64,
+            **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        # embedded before the write lock is taken, only the upserts are serialized
+        embeddings = self._embed_texts(texts)
+        with self._write():
+            return super().add_texts(texts, metadatas, ids, batch_size, embeddings=embeddings, **kwargs)
+
+    @classmethod
+    def _construct_instance(cls, texts: List[str], embedding: Embeddings, *args: Any, **kwargs: Any) -> Qdrant:
+        """Create the collection under the write lock of the local manager passed as `local_manager`."""
+        local_manager = kwargs.pop('local_manager', None)
+        # the vector size is probed with the first text, embed it before the lock is taken,
+        # the cached embedding is reused under the lock
+        embedding.embed_documents(texts[:1])
+        with local_manager.write() if local_manager else nullcontext():
+            qdrant = super()._construct_instance(texts, embedding, *args, **kwargs)
+
+        qdrant.local_manager = local_manager
+
+        return qdrant
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        with self._read():
+            return super().similarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    def max_marginal_relevance_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                                           **kwargs: Any) -> List[Tuple[Document, float]]:
+        with self._read():
+            return super().max_marginal_relevance_search_with_score_by_vector(embedding, k, **kwargs)
+
     def del_texts(self, filter: Filter):
         if not filter:
             raise ValueError('filter must not be empty')
 
-        self._reload_if_needed()
+        with self._write():
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(
+                    filter=filter
+                ),
+            )
 
-        self.client.delete(
-            collection_name=self.collection_name,
-            points_selector=FilterSelector(
-                filter=filter
-            ),
-        )
+    def del_texts_by_ids(self, uuids: list[str]) -> None:
+        """Delete texts by doc ids with one request, the caller chunks ids to the server limits."""
+        if not uuids:
+            return
 
-    def del_text(self, uuid: str) -> None:
-        self._reload_if_needed()
+        self.del_texts(Filter(
+            must=[
+                FieldCondition(
+                    key="metadata.doc_id",
+                    match=MatchAny(any=uuids),
+                ),
+            ],
+        ))
 
-        self.client.delete(
-            collection_name=self.collection_name,
-            points_selector=PointIdsList(
-                points=[uuid],
-            ),
-        )
+    def del_text(self, uuid: str) -> None:
+        with self._write():
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(
+                    points=[uuid],
+                ),
+            )
 
     def text_exists(self, uuid: str) -> bool:
-        self._reload_if_needed()
-
-        response = self.client.retrieve(
-            collection_name=self.collection_name,
-            ids=[uuid]
-        )
+        with self._read():
+            response = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=[uuid]
+            )
 
         return len(response) > 0
 
     def delete(self):
-        self._reload_if_needed()
-
-        self.client.delete_collection(collection_name=self.collection_name)
+        with self._write():
+            self.client.delete_collection(collection_name=self.collection_name)
 
     def delete_group(self):
-        self._reload_if_needed()
-
-        self.client.delete_collection(collection_name=self.collection_name)
+        with self._write():
+            self.client.delete_collection(collection_name=self.collection_name)
 
     @classmethod
     def _document_from_scored_point(
@@ -69,7 +121,8 @@ class QdrantVectorStore(Qdrant):
             metadata=scored_point.payload.get(metadata_payload_key) or {},
         )
 
-    def _reload_if_needed(self):
-        if isinstance(self.client, QdrantLocal):
-            self.client = cast(QdrantLocal, self.client)
-            self.client._load()
+    def _read(self):
+        return self.local_manager.read() if self.local_manager else nullcontext()
+
+    def _write(self):
+        return self.local_manager.write() if self.local_manager else nullcontext()
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Optional
+
+
+class _PooledClient:
+    def __init__(self, client: Any):
+        self.client = client
+        self.checked_at = time.monotonic()
+
+
+class VectorClientRegistry:
+    """
+    Process-wide registry of long-lived vector database clients.
+
+    Clients are keyed by vector store type, endpoint and a hash of the credentials, so every index
+    of the same vector store reuses one client and its HTTP connection pool. Pooled clients are
+    health checked at most once per `health_check_interval` seconds and rebuilt when the check fails.
+    The registry is reset after a fork, connection pools must not be shared with the parent process.
+    """
+
+    def __init__(self, health_check_interval: float = 30):
+        self._health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, _PooledClient] = {}
+        self._key_locks: dict[tuple, threading.Lock] = {}
+        self._client_locks = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+
+    def get_client(self, key: tuple, factory: Callable[[], Any],
+                   health_check: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Get the pooled client of the key, or create it with the factory.
+
+        :param key: client key, see `make_key`
+        :param factory: creates a new client
+        :param health_check: returns whether a pooled client is still usable
+        :return: client
+        """
+        # the health check and the factory run under the lock of the key only,
+        # a slow or unreachable vector database does not block the clients of other keys
+        with self._get_key_lock(key):
+            with self._lock:
+                pooled_client = self._clients.get(key)
+
+            if pooled_client and health_check \
+                    and time.monotonic() - pooled_client.checked_at > self._health_check_interval:
+                try:
+                    healthy = health_check(pooled_client.client)
+                except Exception:
+                    logging.exception('Vector database client health check failed.')
+                    healthy = False
+
+                if healthy:
+                    pooled_client.checked_at = time.monotonic()
+                else:
+                    with self._lock:
+                        if self._clients.get(key) is pooled_client:
+                            del self._clients[key]
+
+                    self._close(pooled_client.client)
+                    pooled_client = None
+
+            if not pooled_client:
+                pooled_client = _PooledClient(factory())
+                with self._lock:
+                    self._clients[key] = pooled_client
+
+            return pooled_client.client
+
+    def get_client_lock(self, client: Any) -> threading.RLock:
+        """
+        Lock for operations that keep state on a shared client, e.g. weaviate batch imports.
+
+        :param client: pooled client
+        :return: lock of the client
+        """
+        with self._lock:
+            client_lock = self._client_locks.get(client)
+            if client_lock is None:
+                client_lock = threading.RLock()
+                self._client_locks[client] = client_lock
+
+            return client_lock
+
+    def invalidate(self, key: tuple):
+        with self._lock:
+            pooled_client = self._clients.pop(key, None)
+
+        if pooled_client:
+            self._close(pooled_client.client)
+
+    @staticmethod
+    def make_key(vector_type: str, endpoint: str, credentials: Optional[str] = None) -> tuple:
+        credentials_hash = hashlib.sha256(credentials.encode()).hexdigest() if credentials else None
+        return vector_type, endpoint, credentials_hash
+
+    def _get_key_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            self._reset_if_forked()
+
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = threading.Lock()
+                self._key_locks[key] = key_lock
+
+            return key_lock
+
+    def _reset_if_forked(self):
+        if self._pid != os.getpid():
+            # drop without closing, the connections belong to the parent process
+            self._clients = {}
+            self._key_locks = {}
+            self._client_locks = weakref.WeakKeyDictionary()
+            self._pid = os.getpid()
+
+    @staticmethod
+    def _close(client: Any):
+        close = getattr(client, 'close', None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                logging.exception('Failed to close vector database client.')
+
+
+vector_client_registry = VectorClientRegistry()
@@ -1,7 +1,87 @@
+from typing import Any, Iterable, List, Optional, Type
+from uuid import uuid4
+
+from langchain.embeddings.base import Embeddings
 from langchain.vectorstores import Weaviate
+from langchain.vectorstores.weaviate import _default_schema, _json_serializable
+
+from core.vector_store.vector_client_registry import vector_client_registry
+
+# max number of `Equal` operands in one batch delete filter
+DELETE_OPERANDS_LIMIT = 100
 
 
 class WeaviateVectorStore(Weaviate):
+    def add_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            **kwargs: Any,
+    ) -> List[str]:
+        from weaviate.util import get_valid_uuid
+
+        texts = list(texts)
+        # embedded before the lock is taken, only the batch import is serialized
+        embeddings = self._embedding.embed_documents(texts) if self._embedding else None
+
+        ids = []
+        # the batch of the pooled client is shared with other threads
+        with vector_client_registry.get_client_lock(self._client):
+            with self._client.batch as batch:
+                for i, text in enumerate(texts):
+                    data_properties = {self._text_key: text}
+                    if metadatas is not None:
+                        for key, val in metadatas[i].items():
+                            data_properties[key] = _json_serializable(val)
+
+                    # an existing object with the same uuid is replaced
+                    _id = get_valid_uuid(uuid4())
+                    if "uuids" in kwargs:
+                        _id = kwargs["uuids"][i]
+                    elif "ids" in kwargs:
+                        _id = kwargs["ids"][i]
+
+                    batch.add_data_object(
+                        data_object=data_properties,
+                        class_name=self._index_name,
+                        uuid=_id,
+                        vector=embeddings[i] if embeddings else None,
+                    )
+                    ids.append(_id)
+
+        return ids
+
+    @classmethod
+    def from_texts(
+            cls: Type[Weaviate],
+            texts: List[str],
+            embedding: Embeddings,
+            metadatas: Optional[List[dict]] = None,
+            **kwargs: Any,
+    ) -> Weaviate:
+        """Same as `Weaviate.from_texts` with the pooled client, the texts are imported with `add_texts`."""
+        client = kwargs["client"]
+        index_name = kwargs.get("index_name", f"LangChain_{uuid4().hex}")
+
+        schema = _default_schema(index_name)
+        if not client.schema.contains(schema):
+            client.schema.create_class(schema)
+
+        vector_store = cls(
+            client,
+            index_name,
+            "text",
+            embedding=embedding,
+            attributes=list(metadatas[0].keys()) if metadatas else None,
+            relevance_score_fn=kwargs.get("relevance_score_fn"),
+            by_text=kwargs.get("by_text", False),
+        )
+
+        uuids = kwargs.get("uuids")
+        vector_store.add_texts(texts, metadatas, **({"uuids": uuids} if uuids else {}))
+
+        return vector_store
+
     def del_texts(self, where_filter: dict):
         if not where_filter:
             raise ValueError('where_filter must not be empty')
@@ -12,6 +92,26 @@ class WeaviateVectorStore(Weaviate):
             output='minimal'
         )
 
+    def del_texts_by_ids(self, uuids: list[str]) -> None:
+        """Delete texts by doc ids with batch deletes of up to `DELETE_OPERANDS_LIMIT` ids each."""
+        # `Or` of `Equal` operands, `ContainsAny` needs weaviate 1.21+
+        for i in range(0, len(uuids), DELETE_OPERANDS_LIMIT):
+            self._client.batch.delete_objects(
+                class_name=self._index_name,
+                where={
+                    "operator": "Or",
+                    "operands": [
+                        {
+                            "path": ["doc_id"],
+                            "operator": "Equal",
+                            "valueText": uuid
+                        }
+                        for uuid in uuids[i:i + DELETE_OPERANDS_LIMIT]
+                    ]
+                },
+                output='minimal'
+            )
+
     def del_text(self, uuid: str) -> None:
         self._client.data_object.delete(
             uuid,
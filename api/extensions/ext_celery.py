@@ -26,6 +26,15 @@ def init_app(app: Flask) -> Celery:
 
     celery_app.conf.update(
         result_backend=app.config["CELERY_RESULT_BACKEND"],
+        imports=[
+            "tasks.flush_segment_hit_counts_task",
+        ],
+        beat_schedule={
+            "flush_segment_hit_counts": {
+                "task": "tasks.flush_segment_hit_counts_task.flush_segment_hit_counts_task",
+                "schedule": app.config["SEGMENT_HIT_COUNT_FLUSH_INTERVAL"],
+            },
+        },
     )
 
     if app.config["BROKER_USE_SSL"]:
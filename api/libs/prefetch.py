@@ -0,0 +1,37 @@
+from typing import Any
+
+
+class prefetched_property:
+    """
+    Read-only model property whose value can be prefetched for a page of rows.
+
+    Without a prefetched value the getter runs its own query like a plain property.
+    The descriptor defines no setter, so a value attached with `attach_prefetched` is stored in the instance dict
+    and shadows the getter, marshalling a prefetched page then runs no query per row.
+    """
+
+    def __init__(self, fget):
+        self.fget = fget
+        self.__doc__ = fget.__doc__
+        self.name = fget.__name__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        return self.fget(instance)
+
+
+def attach_prefetched(instance: Any, name: str, value: Any) -> None:
+    """
+    Attach the prefetched value of a `prefetched_property` to a model instance.
+
+    :param instance: model instance
+    :param name: property name
+    :param value: prefetched value
+    """
+    descriptor = getattr(type(instance), name, None)
+    if not isinstance(descriptor, prefetched_property):
+        raise ValueError(f"{type(instance).__name__}.{name} is not a prefetched property")
+
+    instance.__dict__[name] = value
@@ -1,6 +1,8 @@
 # -*- coding:utf-8 -*-
 import hashlib
+import threading
 
+from cachetools import TTLCache
 from Crypto.Cipher import PKCS1_OAEP, AES
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
@@ -20,6 +22,8 @@ def generate_key_pair(tenant_id):
 
     storage.save(filepath, pem_private)
 
+    invalidate_private_key(tenant_id)
+
     return pem_public.decode()
 
 
@@ -45,10 +49,25 @@ def encrypt(text, public_key):
     return prefix_hybrid + encrypted_data
 
 
-def decrypt(encrypted_text, tenant_id):
+# imported private keys of the tenants, kept in process as long as the private keys are cached in redis
+PRIVATE_KEY_CACHE_TTL = 120
+_private_key_cache = TTLCache(maxsize=1000, ttl=PRIVATE_KEY_CACHE_TTL)
+_private_key_cache_lock = threading.Lock()
+
+
+def _private_key_cache_key(tenant_id):
     filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
+    return filepath, 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+
+
+def get_private_key(tenant_id) -> RSA.RsaKey:
+    with _private_key_cache_lock:
+        rsa_key = _private_key_cache.get(tenant_id)
+
+    if rsa_key is not None:
+        return rsa_key
 
-    cache_key = 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+    filepath, cache_key = _private_key_cache_key(tenant_id)
     private_key = redis_client.get(cache_key)
     if not private_key:
         try:
@@ -56,9 +75,24 @@ def decrypt(encrypted_text, tenant_id):
         except FileNotFoundError:
             raise PrivkeyNotFoundError("Private key not found, tenant_id: {tenant_id}".format(tenant_id=tenant_id))
 
-        redis_client.setex(cache_key, 120, private_key)
+        redis_client.setex(cache_key, PRIVATE_KEY_CACHE_TTL, private_key)
 
     rsa_key = RSA.import_key(private_key)
+    with _private_key_cache_lock:
+        _private_key_cache[tenant_id] = rsa_key
+
+    return rsa_key
+
+
+def invalidate_private_key(tenant_id):
+    _, cache_key = _private_key_cache_key(tenant_id)
+    redis_client.delete(cache_key)
+    with _private_key_cache_lock:
+        _private_key_cache.pop(tenant_id, None)
+
+
+def decrypt(encrypted_text, tenant_id):
+    rsa_key = get_private_key(tenant_id)
     cipher_rsa = PKCS1_OAEP.new(rsa_key)
 
     if encrypted_text.startswith(prefix_hybrid):
@@ -2,6 +2,7 @@ import json
 import pickle
 from json import JSONDecodeError
 
+import numpy as np
 from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -324,6 +325,8 @@ class DocumentSegment(db.Model):
     keywords = db.Column(db.JSON, nullable=True)
     index_node_id = db.Column(db.String(255), nullable=True)
     index_node_hash = db.Column(db.String(255), nullable=True)
+    # hash of the source chunk a QA segment was generated from
+    source_hash = db.Column(db.String(255), nullable=True)
 
     # basic fields
     hit_count = db.Column(db.Integer, nullable=False, default=0)
@@ -428,6 +431,37 @@ class DatasetKeywordTable(db.Model):
         return json.loads(self.keyword_table, cls=SetDecoder) if self.keyword_table else None
 
 
+class DatasetKeyword(db.Model):
+    __tablename__ = 'dataset_keywords'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_pkey'),
+        db.UniqueConstraint('dataset_id', 'keyword', 'index_node_id', name='dataset_keyword_node_idx'),
+        db.Index('dataset_keyword_dataset_node_idx', 'dataset_id', 'index_node_id'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    keyword = db.Column(db.Text, nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    term_frequency = db.Column(db.Integer, nullable=False, server_default=db.text('1'))
+    segment_length = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
+class DatasetKeywordStatistic(db.Model):
+    __tablename__ = 'dataset_keyword_statistics'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_statistic_pkey'),
+        db.UniqueConstraint('dataset_id', name='dataset_keyword_statistic_dataset_idx'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    segment_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    total_segment_length = db.Column(db.BigInteger, nullable=False, server_default=db.text('0'))
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+
+
 class Embedding(db.Model):
     __tablename__ = 'embeddings'
     __table_args__ = (
@@ -442,11 +476,50 @@ class Embedding(db.Model):
     embedding = db.Column(db.LargeBinary, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
 
-    def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+    # binary format: magic(4) + version(1) + dtype code(1) + reserved(2) + little-endian vector data,
+    # the 8 bytes header keeps the vector data aligned for zero-copy decoding.
+    # rows without the magic prefix are legacy pickled lists.
+    BINARY_MAGIC = b'DEMB'
+    BINARY_VERSION = 1
+    BINARY_HEADER_SIZE = 8
+    BINARY_DTYPES = {
+        'float32': (b'f', '<f4'),
+        'float16': (b'e', '<f2'),
+    }
+
+    def set_embedding(self, embedding_data: list[float], dtype: str = 'float32'):
+        if dtype not in self.BINARY_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+        dtype_code, numpy_dtype = self.BINARY_DTYPES[dtype]
+        header = self.BINARY_MAGIC + bytes([self.BINARY_VERSION]) + dtype_code + b'\x00\x00'
+        self.embedding = header + np.asarray(embedding_data, dtype=numpy_dtype).tobytes()
 
     def get_embedding(self) -> list[float]:
-        return pickle.loads(self.embedding)
+        return self.get_embedding_array().tolist()
+
+    def get_embedding_array(self) -> np.ndarray:
+        """
+        Decode embedding as a numpy array, binary rows are decoded without copying.
+
+        :return: np.ndarray
+        """
+        if not self.is_binary_encoded():
+            return np.asarray(pickle.loads(self.embedding), dtype=np.float32)
+
+        version = self.embedding[len(self.BINARY_MAGIC)]
+        if version != self.BINARY_VERSION:
+            raise ValueError(f"Unsupported embedding binary version: {version}")
+
+        dtype_code = self.embedding[len(self.BINARY_MAGIC) + 1:len(self.BINARY_MAGIC) + 2]
+        for code, numpy_dtype in self.BINARY_DTYPES.values():
+            if code == dtype_code:
+                return np.frombuffer(self.embedding, dtype=numpy_dtype, offset=self.BINARY_HEADER_SIZE)
+
+        raise ValueError(f"Unsupported embedding dtype code: {dtype_code}")
+
+    def is_binary_encoded(self) -> bool:
+        return bytes(self.embedding[:len(self.BINARY_MAGIC)]) == self.BINARY_MAGIC
 
 
 class DatasetCollectionBinding(db.Model):
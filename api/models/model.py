@@ -6,6 +6,7 @@ from flask_login import UserMixin
 from sqlalchemy.dialects.postgresql import UUID
 
 from libs.helper import generate_string
+from libs.prefetch import prefetched_property
 from extensions.ext_database import db
 from .account import Account, Tenant
 
@@ -289,6 +290,13 @@ class Conversation(db.Model):
 
     is_deleted = db.Column(db.Boolean, nullable=False, server_default=db.text('false'))
 
+    # counters maintained with the messages and feedbacks of the conversation, see `count_message` and `count_feedback`
+    message_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    user_like_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    user_dislike_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    admin_like_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    admin_dislike_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+
     @property
     def model_config(self):
         model_config = {}
@@ -316,8 +324,7 @@ class Conversation(db.Model):
             else:
                 model_config['configs'] = override_model_configs
         else:
-            app_model_config = db.session.query(AppModelConfig).filter(
-                AppModelConfig.id == self.app_model_config_id).first()
+            app_model_config = self.app_model_config
 
             model_config['configs'] = app_model_config.configs
             model_config['model'] = app_model_config.model_dict
@@ -337,6 +344,10 @@ class Conversation(db.Model):
 
         return model_config
 
+    @prefetched_property
+    def app_model_config(self):
+        return db.session.query(AppModelConfig).filter(AppModelConfig.id == self.app_model_config_id).first()
+
     @property
     def summary_or_query(self):
         if self.summary:
@@ -348,55 +359,45 @@ class Conversation(db.Model):
             else:
                 return ''
 
-    @property
+    @prefetched_property
     def annotated(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).count() > 0
 
-    @property
+    @prefetched_property
     def annotation(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).first()
 
-    @property
-    def message_count(self):
-        return db.session.query(Message).filter(Message.conversation_id == self.id).count()
-
     @property
     def user_feedback_stats(self):
-        like = db.session.query(MessageFeedback) \
-            .filter(MessageFeedback.conversation_id == self.id,
-                    MessageFeedback.from_source == 'user',
-                    MessageFeedback.rating == 'like').count()
-
-        dislike = db.session.query(MessageFeedback) \
-            .filter(MessageFeedback.conversation_id == self.id,
-                    MessageFeedback.from_source == 'user',
-                    MessageFeedback.rating == 'dislike').count()
-
-        return {'like': like, 'dislike': dislike}
+        return {'like': self.user_like_count, 'dislike': self.user_dislike_count}
 
     @property
     def admin_feedback_stats(self):
-        like = db.session.query(MessageFeedback) \
-            .filter(MessageFeedback.conversation_id == self.id,
-                    MessageFeedback.from_source == 'admin',
-                    MessageFeedback.rating == 'like').count()
-
-        dislike = db.session.query(MessageFeedback) \
-            .filter(MessageFeedback.conversation_id == self.id,
-                    MessageFeedback.from_source == 'admin',
-                    MessageFeedback.rating == 'dislike').count()
-
-        return {'like': like, 'dislike': dislike}
-
-    @property
+        return {'like': self.admin_like_count, 'dislike': self.admin_dislike_count}
+
+    def count_message(self, delta: int = 1):
+        """
+        Update the message counter in the current transaction.
+        The increment is evaluated by the database when the session is flushed, so concurrent messages are all counted.
+        """
+        self.message_count = Conversation.message_count + delta
+
+    def count_feedback(self, from_source: str, rating: str, delta: int = 1):
+        """
+        Update the like or dislike counter of the feedback source ('user' or 'admin') in the current transaction.
+        """
+        counter = f'{from_source}_{rating}_count'
+        setattr(self, counter, getattr(Conversation, counter) + delta)
+
+    @prefetched_property
     def first_message(self):
         return db.session.query(Message).filter(Message.conversation_id == self.id).first()
 
-    @property
+    @prefetched_property
     def app(self):
         return db.session.query(App).filter(App.id == self.app_id).first()
 
-    @property
+    @prefetched_property
     def from_end_user_session_id(self):
         if self.from_end_user_id:
             end_user = db.session.query(EndUser).filter(EndUser.id == self.from_end_user_id).first()
@@ -446,24 +447,24 @@ class Message(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
     agent_based = db.Column(db.Boolean, nullable=False, server_default=db.text('false'))
 
-    @property
+    @prefetched_property
     def user_feedback(self):
         feedback = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id,
                                                             MessageFeedback.from_source == 'user').first()
         return feedback
 
-    @property
+    @prefetched_property
     def admin_feedback(self):
         feedback = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id,
                                                             MessageFeedback.from_source == 'admin').first()
         return feedback
 
-    @property
+    @prefetched_property
     def feedbacks(self):
         feedbacks = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id).all()
         return feedbacks
 
-    @property
+    @prefetched_property
     def annotation(self):
         annotation = db.session.query(MessageAnnotation).filter(MessageAnnotation.message_id == self.id).first()
         return annotation
@@ -481,12 +482,12 @@ class Message(db.Model):
     def in_debug_mode(self):
         return self.override_model_configs is not None
 
-    @property
+    @prefetched_property
     def agent_thoughts(self):
         return db.session.query(MessageAgentThought).filter(MessageAgentThought.message_id == self.id) \
             .order_by(MessageAgentThought.position.asc()).all()
 
-    @property
+    @prefetched_property
     def retriever_resources(self):
         return db.session.query(DatasetRetrieverResource).filter(DatasetRetrieverResource.message_id == self.id) \
             .order_by(DatasetRetrieverResource.position.asc()).all()
@@ -513,7 +514,7 @@ class MessageFeedback(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
     updated_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
 
-    @property
+    @prefetched_property
     def from_account(self):
         account = db.session.query(Account).filter(Account.id == self.from_account_id).first()
         return account
@@ -537,7 +538,7 @@ class MessageAnnotation(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
     updated_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
 
-    @property
+    @prefetched_property
     def account(self):
         account = db.session.query(Account).filter(Account.id == self.account_id).first()
         return account
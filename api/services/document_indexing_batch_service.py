@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from flask import current_app
+
+from extensions.ext_redis import redis_client
+
+
+class DocumentIndexingBatchService:
+    """
+    Bookkeeping of document indexing batches that are fanned out to one celery task per document.
+
+    The progress of a batch is aggregated in a redis hash, the task finishing the last document finishes the batch.
+    The indexing tasks of a tenant are capped by a redis sorted set of running task slots, a held slot is renewed
+    while its document is indexed, slots not renewed within the slot timeout are considered leaked.
+    """
+
+    progress_key_prefix = 'document_indexing_batch_progress'
+    tenant_slots_key_prefix = 'document_indexing_tenant_slots'
+    progress_ttl = 86400
+    slot_timeout = 300
+    slot_renew_interval = 60
+
+    @classmethod
+    def init_progress(cls, dataset_id: str, batch: str, total: int) -> None:
+        progress_key = cls._progress_key(dataset_id, batch)
+        pipeline = redis_client.pipeline()
+        pipeline.delete(progress_key)
+        pipeline.hset(progress_key, mapping={
+            'total': total,
+            'completed': 0,
+            'error': 0,
+            'paused': 0,
+            'started_at': time.time()
+        })
+        pipeline.expire(progress_key, cls.progress_ttl)
+        pipeline.execute()
+
+    @classmethod
+    def update_progress(cls, dataset_id: str, batch: str, indexing_status: str) -> bool:
+        """
+        Count a finished document of the batch.
+
+        :param dataset_id: dataset id
+        :param batch: batch of the document
+        :param indexing_status: completed, error or paused
+        :return: whether it was the last document of the batch, the batch is marked as finished then
+        """
+        progress_key = cls._progress_key(dataset_id, batch)
+        if not redis_client.exists(progress_key):
+            return False
+
+        pipeline = redis_client.pipeline()
+        pipeline.hincrby(progress_key, indexing_status, 1)
+        pipeline.hincrby(progress_key, 'finished', 1)
+        pipeline.hget(progress_key, 'total')
+        _, finished, total = pipeline.execute()
+
+        if total is None or finished != int(total):
+            return False
+
+        redis_client.hset(progress_key, 'finished_at', time.time())
+        return True
+
+    @classmethod
+    def get_progress(cls, dataset_id: str, batch: str) -> Optional[dict]:
+        progress = redis_client.hgetall(cls._progress_key(dataset_id, batch))
+        if not progress:
+            return None
+
+        progress = {key.decode(): value.decode() for key, value in progress.items()}
+        return {
+            'total': int(progress.get('total', 0)),
+            'completed': int(progress.get('completed', 0)),
+            'error': int(progress.get('error', 0)),
+            'paused': int(progress.get('paused', 0)),
+            'started_at': int(float(progress['started_at'])) if 'started_at' in progress else None,
+            'finished_at': int(float(progress['finished_at'])) if 'finished_at' in progress else None
+        }
+
+    @classmethod
+    def acquire_tenant_slot(cls, tenant_id: str) -> Optional[str]:
+        """
+        Acquire an indexing slot of the tenant.
+
+        :param tenant_id: tenant id
+        :return: slot id, None if the tenant already runs the max concurrent indexing tasks
+        """
+        max_concurrency = int(current_app.config.get('DOCUMENT_INDEXING_TENANT_MAX_CONCURRENCY', 4))
+        slots_key = cls._tenant_slots_key(tenant_id)
+        slot_id = str(uuid.uuid4())
+        now = time.time()
+
+        pipeline = redis_client.pipeline()
+        pipeline.zremrangebyscore(slots_key, '-inf', now - cls.slot_timeout)
+        pipeline.zadd(slots_key, {slot_id: now})
+        pipeline.zrank(slots_key, slot_id)
+        pipeline.expire(slots_key, cls.slot_timeout)
+        rank = pipeline.execute()[2]
+
+        if max_concurrency > 0 and rank is not None and rank >= max_concurrency:
+            redis_client.zrem(slots_key, slot_id)
+            return None
+
+        return slot_id
+
+    @classmethod
+    def renew_tenant_slot(cls, tenant_id: str, slot_id: str) -> None:
+        slots_key = cls._tenant_slots_key(tenant_id)
+        pipeline = redis_client.pipeline()
+        pipeline.zadd(slots_key, {slot_id: time.time()}, xx=True)
+        pipeline.expire(slots_key, cls.slot_timeout)
+        pipeline.execute()
+
+    @classmethod
+    def release_tenant_slot(cls, tenant_id: str, slot_id: str) -> None:
+        redis_client.zrem(cls._tenant_slots_key(tenant_id), slot_id)
+
+    @classmethod
+    @contextmanager
+    def hold_tenant_slot(cls, tenant_id: str, slot_id: str):
+        """
+        Hold an acquired slot while a document is indexed, the slot is renewed in the background
+        so an indexing run longer than the slot timeout keeps it, and released on exit.
+        """
+        stopped = threading.Event()
+
+        def renew():
+            while not stopped.wait(cls.slot_renew_interval):
+                try:
+                    cls.renew_tenant_slot(tenant_id, slot_id)
+                except Exception:
+                    logging.exception('Failed to renew the document indexing slot of tenant {}.'.format(tenant_id))
+
+        renew_thread = threading.Thread(target=renew, daemon=True)
+        renew_thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            cls.release_tenant_slot(tenant_id, slot_id)
+
+    @classmethod
+    def _progress_key(cls, dataset_id: str, batch: str) -> str:
+        return f'{cls.progress_key_prefix}:{dataset_id}:{batch}'
+
+    @classmethod
+    def _tenant_slots_key(cls, tenant_id: str) -> str:
+        return f'{cls.tenant_slots_key_prefix}:{tenant_id}'
@@ -9,11 +9,12 @@ from langchain.schema import Document
 from sklearn.manifold import TSNE
 
 from core.embedding.cached_embedding import CacheEmbedding
+from core.helper.segment_hydrator import SegmentHydrator
 from core.index.vector_index.vector_index import VectorIndex
 from core.model_providers.model_factory import ModelFactory
 from extensions.ext_database import db
 from models.account import Account
-from models.dataset import Dataset, DocumentSegment, DatasetQuery
+from models.dataset import Dataset, DatasetQuery
 
 
 class HitTestingService:
@@ -81,32 +82,28 @@ class HitTestingService:
 
         query_position = tsne_position_data.pop(0)
 
-        i = 0
+        hydrated_segments = {
+            hydrated_segment.segment.index_node_id: hydrated_segment
+            for hydrated_segment in SegmentHydrator.hydrate(
+                dataset.id, [document.metadata['doc_id'] for document in documents]
+            )
+        }
+
         records = []
-        for document in documents:
-            index_node_id = document.metadata['doc_id']
-
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == dataset.id,
-                DocumentSegment.enabled == True,
-                DocumentSegment.status == 'completed',
-                DocumentSegment.index_node_id == index_node_id
-            ).first()
-
-            if not segment:
-                i += 1
+        for i, document in enumerate(documents):
+            hydrated_segment = hydrated_segments.get(document.metadata['doc_id'])
+            if not hydrated_segment:
                 continue
 
             record = {
-                "segment": segment,
+                "segment": hydrated_segment.segment,
+                "document": hydrated_segment.document,
                 "score": document.metadata['score'],
                 "tsne_position": tsne_position_data[i]
             }
 
             records.append(record)
 
-            i += 1
-
         return {
             "query": {
                 "content": query,
@@ -8,6 +8,7 @@ from extensions.ext_database import db
 from models.account import Account
 from models.model import App, EndUser, Message, MessageFeedback, AppModelConfig
 from services.conversation_service import ConversationService
+from services.prefetch_service import PrefetchService
 from services.errors.app_model_config import AppModelConfigBrokenError
 from services.errors.conversation import ConversationNotExistsError, ConversationCompletedError
 from services.errors.message import FirstMessageNotExistsError, MessageNotExistsError, LastMessageNotExistsError, \
@@ -60,6 +61,10 @@ class MessageService:
                 has_more = True
 
         history_messages = list(reversed(history_messages))
+        PrefetchService.prefetch_messages(
+            history_messages,
+            relations=('feedbacks', 'agent_thoughts', 'retriever_resources')
+        )
 
         return InfiniteScrollPagination(
             data=history_messages,
@@ -133,8 +138,12 @@ class MessageService:
         feedback = message.user_feedback if isinstance(user, EndUser) else message.admin_feedback
 
         if not rating and feedback:
+            message.conversation.count_feedback(feedback.from_source, feedback.rating, -1)
             db.session.delete(feedback)
         elif rating and feedback:
+            if feedback.rating != rating:
+                message.conversation.count_feedback(feedback.from_source, feedback.rating, -1)
+                message.conversation.count_feedback(feedback.from_source, rating)
             feedback.rating = rating
         elif not rating and not feedback:
             raise ValueError('rating cannot be None when feedback not exists')
@@ -149,6 +158,7 @@ class MessageService:
                 from_account_id=(user.id if isinstance(user, Account) else None),
             )
             db.session.add(feedback)
+            message.conversation.count_feedback(feedback.from_source, feedback.rating)
 
         db.session.commit()
 
@@ -0,0 +1,182 @@
+from collections import defaultdict
+from typing import List, Iterable, Dict
+
+from extensions.ext_database import db
+from libs.prefetch import attach_prefetched
+from models.account import Account
+from models.model import Conversation, Message, MessageFeedback, MessageAnnotation, MessageAgentThought, \
+    DatasetRetrieverResource, EndUser, AppModelConfig, App
+
+CONVERSATION_RELATIONS = ('annotation', 'first_message', 'from_end_user_session_id', 'app_model_config', 'app')
+MESSAGE_RELATIONS = ('feedbacks', 'annotation', 'agent_thoughts', 'retriever_resources')
+
+
+class PrefetchService:
+    """
+    Prefetch the related rows of a page of conversations or messages before they are marshalled.
+
+    Each relation is loaded with one IN query for the whole page and attached to the `prefetched_property`
+    of every row, instead of one query per row and property.
+    """
+
+    @classmethod
+    def prefetch_conversations(cls, conversations: List[Conversation],
+                               relations: Iterable[str] = CONVERSATION_RELATIONS) -> List[Conversation]:
+        """
+        Prefetch the relations of the conversations.
+
+        :param conversations: conversations of a page
+        :param relations: names of CONVERSATION_RELATIONS, 'annotation' also prefetches `annotated`
+        :return: conversations
+        """
+        relations = cls._validate_relations(relations, CONVERSATION_RELATIONS)
+        if not conversations:
+            return conversations
+
+        conversation_ids = [conversation.id for conversation in conversations]
+
+        if 'annotation' in relations:
+            annotations = {}
+            for annotation in db.session.query(MessageAnnotation) \
+                    .filter(MessageAnnotation.conversation_id.in_(conversation_ids)) \
+                    .order_by(MessageAnnotation.created_at.asc()).all():
+                annotations.setdefault(annotation.conversation_id, annotation)
+
+            cls._prefetch_annotation_accounts(list(annotations.values()))
+
+            for conversation in conversations:
+                annotation = annotations.get(conversation.id)
+                attach_prefetched(conversation, 'annotation', annotation)
+                attach_prefetched(conversation, 'annotated', annotation is not None)
+
+        if 'first_message' in relations:
+            first_messages = {
+                message.conversation_id: message
+                for message in db.session.query(Message)
+                .filter(Message.conversation_id.in_(conversation_ids))
+                .distinct(Message.conversation_id)
+                .order_by(Message.conversation_id, Message.created_at.asc()).all()
+            }
+
+            for conversation in conversations:
+                attach_prefetched(conversation, 'first_message', first_messages.get(conversation.id))
+
+        if 'from_end_user_session_id' in relations:
+            end_user_ids = {conversation.from_end_user_id for conversation in conversations
+                            if conversation.from_end_user_id}
+            end_users = cls._get_by_ids(EndUser, end_user_ids)
+
+            for conversation in conversations:
+                end_user = end_users.get(conversation.from_end_user_id)
+                attach_prefetched(conversation, 'from_end_user_session_id', end_user.session_id if end_user else None)
+
+        if 'app_model_config' in relations:
+            app_model_configs = cls._get_by_ids(
+                AppModelConfig,
+                {conversation.app_model_config_id for conversation in conversations}
+            )
+
+            for conversation in conversations:
+                attach_prefetched(conversation, 'app_model_config',
+                                  app_model_configs.get(conversation.app_model_config_id))
+
+        if 'app' in relations:
+            apps = cls._get_by_ids(App, {conversation.app_id for conversation in conversations})
+
+            for conversation in conversations:
+                attach_prefetched(conversation, 'app', apps.get(conversation.app_id))
+
+        return conversations
+
+    @classmethod
+    def prefetch_messages(cls, messages: List[Message],
+                          relations: Iterable[str] = MESSAGE_RELATIONS) -> List[Message]:
+        """
+        Prefetch the relations of the messages.
+
+        :param messages: messages of a page
+        :param relations: names of MESSAGE_RELATIONS, 'feedbacks' also prefetches `user_feedback` and `admin_feedback`
+        :return: messages
+        """
+        relations = cls._validate_relations(relations, MESSAGE_RELATIONS)
+        if not messages:
+            return messages
+
+        message_ids = [message.id for message in messages]
+
+        if 'feedbacks' in relations:
+            feedbacks = defaultdict(list)
+            for feedback in db.session.query(MessageFeedback) \
+                    .filter(MessageFeedback.message_id.in_(message_ids)).all():
+                feedbacks[feedback.message_id].append(feedback)
+
+            accounts = cls._get_by_ids(Account, {feedback.from_account_id
+                                                 for message_feedbacks in feedbacks.values()
+                                                 for feedback in message_feedbacks if feedback.from_account_id})
+
+            for message in messages:
+                message_feedbacks = feedbacks.get(message.id, [])
+                for feedback in message_feedbacks:
+                    attach_prefetched(feedback, 'from_account', accounts.get(feedback.from_account_id))
+
+                attach_prefetched(message, 'feedbacks', message_feedbacks)
+                attach_prefetched(message, 'user_feedback', next(
+                    (feedback for feedback in message_feedbacks if feedback.from_source == 'user'), None))
+                attach_prefetched(message, 'admin_feedback', next(
+                    (feedback for feedback in message_feedbacks if feedback.from_source == 'admin'), None))
+
+        if 'annotation' in relations:
+            annotations = {}
+            for annotation in db.session.query(MessageAnnotation) \
+                    .filter(MessageAnnotation.message_id.in_(message_ids)) \
+                    .order_by(MessageAnnotation.created_at.asc()).all():
+                annotations.setdefault(annotation.message_id, annotation)
+
+            cls._prefetch_annotation_accounts(list(annotations.values()))
+
+            for message in messages:
+                attach_prefetched(message, 'annotation', annotations.get(message.id))
+
+        if 'agent_thoughts' in relations:
+            agent_thoughts = defaultdict(list)
+            for agent_thought in db.session.query(MessageAgentThought) \
+                    .filter(MessageAgentThought.message_id.in_(message_ids)) \
+                    .order_by(MessageAgentThought.position.asc()).all():
+                agent_thoughts[agent_thought.message_id].append(agent_thought)
+
+            for message in messages:
+                attach_prefetched(message, 'agent_thoughts', agent_thoughts.get(message.id, []))
+
+        if 'retriever_resources' in relations:
+            retriever_resources = defaultdict(list)
+            for retriever_resource in db.session.query(DatasetRetrieverResource) \
+                    .filter(DatasetRetrieverResource.message_id.in_(message_ids)) \
+                    .order_by(DatasetRetrieverResource.position.asc()).all():
+                retriever_resources[retriever_resource.message_id].append(retriever_resource)
+
+            for message in messages:
+                attach_prefetched(message, 'retriever_resources', retriever_resources.get(message.id, []))
+
+        return messages
+
+    @classmethod
+    def _prefetch_annotation_accounts(cls, annotations: List[MessageAnnotation]):
+        accounts = cls._get_by_ids(Account, {annotation.account_id for annotation in annotations})
+        for annotation in annotations:
+            attach_prefetched(annotation, 'account', accounts.get(annotation.account_id))
+
+    @staticmethod
+    def _get_by_ids(model, ids: set) -> Dict:
+        if not ids:
+            return {}
+
+        return {row.id: row for row in db.session.query(model).filter(model.id.in_(list(ids))).all()}
+
+    @staticmethod
+    def _validate_relations(relations: Iterable[str], supported_relations: tuple) -> set:
+        relations = set(relations)
+        unsupported_relations = relations - set(supported_relations)
+        if unsupported_relations:
+            raise ValueError(f"Unsupported relations: {', '.join(sorted(unsupported_relations))}")
+
+        return relations
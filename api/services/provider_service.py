@@ -7,7 +7,9 @@ from typing import Optional
 
 import requests
 
+from core.helper import encrypter
 from core.model_providers.model_factory import ModelFactory
+from core.model_providers.model_resolution_context import ModelResolutionContext
 from extensions.ext_database import db
 from core.model_providers.model_provider_factory import ModelProviderFactory
 from core.model_providers.models.entity.model_params import ModelType, ModelKwargsRules
@@ -212,6 +214,10 @@ class ProviderService:
         model_provider_class = ModelProviderFactory.get_model_provider_class(provider_name)
         encrypted_config = model_provider_class.encrypt_provider_credentials(tenant_id, config)
 
+        # the previous credentials of the provider must not be served from the decrypted token cache
+        encrypter.invalidate_decrypted_tokens(tenant_id)
+        ModelResolutionContext.invalidate_current()
+
         # save provider
         if provider:
             provider.encrypted_config = json.dumps(encrypted_config)
@@ -254,6 +260,9 @@ class ProviderService:
             db.session.delete(provider)
             db.session.commit()
 
+            encrypter.invalidate_decrypted_tokens(tenant_id)
+            ModelResolutionContext.invalidate_current()
+
     def custom_provider_model_config_validate(self,
                                               provider_name: str,
                                               model_name: str,
@@ -333,6 +342,10 @@ class ProviderService:
             config
         )
 
+        # the previous credentials of the model must not be served from the decrypted token cache
+        encrypter.invalidate_decrypted_tokens(tenant_id)
+        ModelResolutionContext.invalidate_current()
+
         # get provider model
         provider_model = db.session.query(ProviderModel) \
             .filter(
@@ -385,6 +398,9 @@ class ProviderService:
             db.session.delete(provider_model)
             db.session.commit()
 
+            encrypter.invalidate_decrypted_tokens(tenant_id)
+            ModelResolutionContext.invalidate_current()
+
     def switch_preferred_provider(self, tenant_id: str, provider_name: str, preferred_provider_type: str) -> None:
         """
         switch preferred provider.
@@ -425,6 +441,8 @@ class ProviderService:
 
         db.session.commit()
 
+        ModelResolutionContext.invalidate_current()
+
     def get_default_model_of_model_type(self, tenant_id: str, model_type: str) -> Optional[TenantDefaultModel]:
         """
         get default model of model type.
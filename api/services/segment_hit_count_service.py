@@ -0,0 +1,141 @@
+import logging
+from typing import Dict, List
+
+from redis.exceptions import ResponseError
+from sqlalchemy import case
+
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import DocumentSegment
+
+
+class SegmentHitCountService:
+    """
+    Write-behind hit counts of the dataset segments.
+
+    Retrievals only increment a redis hash of the dataset, the hashes are flushed to the database
+    by a periodic task with one batched UPDATE per dataset.
+    A hash is renamed to a flushing key before it is applied and only deleted after the commit,
+    flushing keys left behind by a killed worker are applied again by the next flush,
+    so no hit count is lost (at worst the counts of a flush interrupted right after its commit are applied twice).
+    """
+
+    pending_key_prefix = 'segment_hit_counts'
+    flushing_key_prefix = 'segment_hit_counts_flushing'
+    pending_datasets_key = 'segment_hit_counts_datasets'
+    flushing_datasets_key = 'segment_hit_counts_flushing_datasets'
+    flush_lock_key = 'segment_hit_counts_flush_lock'
+    flush_lock_timeout = 600
+    update_batch_size = 500
+
+    @classmethod
+    def record_hits(cls, dataset_id: str, index_node_ids: List[str]) -> None:
+        """
+        Record a hit of each retrieved segment.
+
+        :param dataset_id: dataset id
+        :param index_node_ids: index node ids of the retrieved segments
+        """
+        if not index_node_ids:
+            return
+
+        pipeline = redis_client.pipeline()
+        for index_node_id in index_node_ids:
+            pipeline.hincrby(cls._pending_key(dataset_id), index_node_id, 1)
+        pipeline.sadd(cls.pending_datasets_key, dataset_id)
+        pipeline.execute()
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Apply the recorded hit counts to the document segments.
+
+        :return: number of flushed hits
+        """
+        lock = redis_client.lock(cls.flush_lock_key, timeout=cls.flush_lock_timeout)
+        if not lock.acquire(blocking=False):
+            logging.info('Segment hit counts are being flushed by another worker, skipped.')
+            return 0
+
+        try:
+            flushed = 0
+
+            # retry the flushes interrupted before their commit first
+            for dataset_id in redis_client.smembers(cls.flushing_datasets_key):
+                flushed += cls._flush_dataset(dataset_id.decode())
+
+            for dataset_id in redis_client.smembers(cls.pending_datasets_key):
+                dataset_id = dataset_id.decode()
+                if cls._move_to_flushing(dataset_id):
+                    flushed += cls._flush_dataset(dataset_id)
+
+            return flushed
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                logging.exception('Failed to release the segment hit counts flush lock.')
+
+    @classmethod
+    def _move_to_flushing(cls, dataset_id: str) -> bool:
+        flushing_key = cls._flushing_key(dataset_id)
+        if redis_client.exists(flushing_key):
+            # apply the leftover flush first, its hits would be overwritten by the rename
+            return True
+
+        pipeline = redis_client.pipeline()
+        pipeline.srem(cls.pending_datasets_key, dataset_id)
+        pipeline.rename(cls._pending_key(dataset_id), flushing_key)
+        pipeline.sadd(cls.flushing_datasets_key, dataset_id)
+        results = pipeline.execute(raise_on_error=False)
+
+        if isinstance(results[1], ResponseError):
+            # no hits were recorded since the last flush
+            redis_client.srem(cls.flushing_datasets_key, dataset_id)
+            return False
+
+        return True
+
+    @classmethod
+    def _flush_dataset(cls, dataset_id: str) -> int:
+        flushing_key = cls._flushing_key(dataset_id)
+        hit_counts = {
+            index_node_id.decode(): int(count)
+            for index_node_id, count in redis_client.hgetall(flushing_key).items()
+        }
+
+        if hit_counts:
+            index_node_ids = list(hit_counts.keys())
+            for i in range(0, len(index_node_ids), cls.update_batch_size):
+                batch_hit_counts = {
+                    index_node_id: hit_counts[index_node_id]
+                    for index_node_id in index_node_ids[i:i + cls.update_batch_size]
+                }
+                cls._update_hit_counts(dataset_id, batch_hit_counts)
+
+            db.session.commit()
+
+        pipeline = redis_client.pipeline()
+        pipeline.delete(flushing_key)
+        pipeline.srem(cls.flushing_datasets_key, dataset_id)
+        pipeline.execute()
+
+        return sum(hit_counts.values())
+
+    @staticmethod
+    def _update_hit_counts(dataset_id: str, hit_counts: Dict[str, int]) -> None:
+        db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == dataset_id,
+            DocumentSegment.index_node_id.in_(list(hit_counts.keys()))
+        ).update(
+            {DocumentSegment.hit_count: DocumentSegment.hit_count + case(hit_counts, value=DocumentSegment.index_node_id)},
+            synchronize_session=False
+        )
+
+    @classmethod
+    def _pending_key(cls, dataset_id: str) -> str:
+        return f'{cls.pending_key_prefix}:{dataset_id}'
+
+    @classmethod
+    def _flushing_key(cls, dataset_id: str) -> str:
+        return f'{cls.flushing_key_prefix}:{dataset_id}'
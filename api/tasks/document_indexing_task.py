@@ -4,11 +4,13 @@ import time
 
 import click
 from celery import shared_task
+from flask import current_app
 from werkzeug.exceptions import NotFound
 
 from core.indexing_runner import IndexingRunner, DocumentIsPausedException
 from extensions.ext_database import db
 from models.dataset import Document
+from services.document_indexing_batch_service import DocumentIndexingBatchService
 
 
 @shared_task(queue='dataset')
@@ -39,6 +41,16 @@ def document_indexing_task(dataset_id: str, document_ids: list):
         db.session.add(document)
     db.session.commit()
 
+    # fan out the documents to one task each, so a large batch is spread over all dataset workers
+    if len(documents) > 1 and current_app.config.get('DOCUMENT_INDEXING_FAN_OUT_ENABLED', True):
+        batch = documents[0].batch
+        DocumentIndexingBatchService.init_progress(dataset_id, batch, len(documents))
+        for document in documents:
+            single_document_indexing_task.delay(dataset_id, document.id)
+
+        logging.info(click.style('Fan out dataset: {} documents: {}'.format(dataset_id, len(documents)), fg='green'))
+        return
+
     try:
         indexing_runner = IndexingRunner()
         indexing_runner.run(documents)
@@ -48,3 +60,68 @@ def document_indexing_task(dataset_id: str, document_ids: list):
         logging.info(click.style(str(ex), fg='yellow'))
     except Exception:
         pass
+
+
+@shared_task(queue='dataset', bind=True, max_retries=None)
+def single_document_indexing_task(self, dataset_id: str, document_id: str):
+    """
+    Async process one document of a fanned out batch, waits while the tenant runs too many indexing tasks.
+    The task indexing the last document of the batch finishes the batch progress.
+    :param dataset_id:
+    :param document_id:
+
+    Usage: single_document_indexing_task.delay(dataset_id, document_id)
+    """
+    document = db.session.query(Document).filter(
+        Document.id == document_id,
+        Document.dataset_id == dataset_id
+    ).first()
+
+    if not document:
+        logging.info(click.style('Document not found: {}'.format(document_id), fg='red'))
+        return
+
+    slot_id = DocumentIndexingBatchService.acquire_tenant_slot(document.tenant_id)
+    if not slot_id:
+        max_retries = int(current_app.config.get('DOCUMENT_INDEXING_TENANT_MAX_RETRIES', 360))
+        if self.request.retries < max_retries:
+            raise self.retry(countdown=int(current_app.config.get('DOCUMENT_INDEXING_TENANT_RETRY_INTERVAL', 5)))
+
+        # do not drop the document, index it beyond the tenant cap after waiting long enough
+        logging.warning(click.style('Tenant {} is still over its indexing slots after {} retries, '
+                                    'index document {} without a slot'.format(document.tenant_id, max_retries,
+                                                                               document_id), fg='yellow'))
+
+    start_at = time.perf_counter()
+    indexing_status = 'error'
+    try:
+        if slot_id:
+            with DocumentIndexingBatchService.hold_tenant_slot(document.tenant_id, slot_id):
+                indexing_status = _index_single_document(document)
+        else:
+            indexing_status = _index_single_document(document)
+
+        end_at = time.perf_counter()
+        logging.info(click.style('Processed document: {} latency: {}'.format(document_id, end_at - start_at),
+                                 fg='green'))
+    finally:
+        if DocumentIndexingBatchService.update_progress(dataset_id, document.batch, indexing_status):
+            progress = DocumentIndexingBatchService.get_progress(dataset_id, document.batch)
+            logging.info(click.style('Processed dataset: {} batch: {} documents: {} errors: {} latency: {}'.format(
+                dataset_id, document.batch, progress['total'], progress['error'],
+                progress['finished_at'] - progress['started_at']), fg='green'))
+
+
+def _index_single_document(document: Document) -> str:
+    try:
+        indexing_runner = IndexingRunner()
+        indexing_runner.run([document])
+
+        db.session.refresh(document)
+        return 'completed' if document.indexing_status == 'completed' else 'error'
+    except DocumentIsPausedException as ex:
+        logging.info(click.style(str(ex), fg='yellow'))
+        return 'paused'
+    except Exception:
+        logging.exception("process document failed")
+        return 'error'
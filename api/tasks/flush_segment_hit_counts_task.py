@@ -0,0 +1,27 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+
+from services.segment_hit_count_service import SegmentHitCountService
+
+
+@shared_task(queue='dataset')
+def flush_segment_hit_counts_task():
+    """
+    Flush the segment hit counts recorded in redis to the database.
+
+    Usage: scheduled by celery beat every SEGMENT_HIT_COUNT_FLUSH_INTERVAL seconds
+    """
+    start_at = time.perf_counter()
+
+    try:
+        flushed = SegmentHitCountService.flush()
+    except Exception:
+        logging.exception('Flush segment hit counts failed')
+        return
+
+    if flushed:
+        end_at = time.perf_counter()
+        logging.info(click.style('Flushed {} segment hits, latency: {}'.format(flushed, end_at - start_at), fg='green'))
@@ -0,0 +1,5 @@
+"""
+Benchmark scripts, they are not collected by pytest.
+
+Run a benchmark from the api directory, e.g. `python -m tests.benchmarks.bench_prompt_assembly`.
+"""
@@ -0,0 +1,112 @@
+"""
+Round trips and latency of CacheEmbedding.embed_documents against the per text lookup and insert it replaced.
+
+Needs the database of the api configured in the environment (.env), the embeddings are computed by a fake
+client, so only the embedding cache is measured. The rows are written under benchmark model names and removed
+at the end.
+"""
+import argparse
+import time
+import uuid
+from typing import List
+
+import numpy as np
+from sqlalchemy import event
+
+from app import app
+from core.embedding.cached_embedding import CacheEmbedding
+from extensions.ext_database import db
+from libs import helper
+from models.dataset import Embedding
+
+DIMENSIONS = 1536
+
+
+class FakeEmbeddingClient:
+    chunk_size = 1000
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [np.random.default_rng(len(text)).random(DIMENSIONS).tolist() for text in texts]
+
+
+class FakeEmbeddings:
+    def __init__(self, name: str):
+        self.name = name
+        self.client = FakeEmbeddingClient()
+
+    def handle_exceptions(self, ex: Exception) -> Exception:
+        return ex
+
+
+def embed_documents_one_by_one(embeddings: FakeEmbeddings, texts: List[str]) -> List[List[float]]:
+    """The lookup and insert of every text in its own round trip, as before the batching."""
+    text_embeddings = []
+    embedding_queue_texts = []
+    for text in texts:
+        hash = helper.generate_text_hash(text)
+        embedding = db.session.query(Embedding).filter_by(model_name=embeddings.name, hash=hash).first()
+        if embedding:
+            text_embeddings.append(embedding.get_embedding())
+        else:
+            embedding_queue_texts.append(text)
+
+    if embedding_queue_texts:
+        for text, vector in zip(embedding_queue_texts, embeddings.client.embed_documents(embedding_queue_texts)):
+            normalized_embedding = (vector / np.linalg.norm(vector)).tolist()
+            embedding = Embedding(model_name=embeddings.name, hash=helper.generate_text_hash(text))
+            embedding.set_embedding(normalized_embedding)
+            db.session.add(embedding)
+            db.session.commit()
+            text_embeddings.append(normalized_embedding)
+
+    return text_embeddings
+
+
+def measure(embed_documents, texts: List[str]) -> tuple:
+    statements = []
+
+    def count_statement(*args):
+        statements.append(1)
+
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+    try:
+        start_at = time.perf_counter()
+        embed_documents(texts)
+        latency = time.perf_counter() - start_at
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+    return latency, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare batched and per text embedding cache round trips.')
+    parser.add_argument('--texts', type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = [f'{i}. Dify is an LLM application development platform.' for i in range(args.texts)]
+    with app.app_context():
+        model_names = []
+        try:
+            for mode in ['one by one', 'batched']:
+                embeddings = FakeEmbeddings(f'benchmark-{uuid.uuid4()}')
+                model_names.append(embeddings.name)
+                if mode == 'batched':
+                    embed_documents = CacheEmbedding(embeddings).embed_documents
+                else:
+                    embed_documents = lambda batch_texts: embed_documents_one_by_one(embeddings, batch_texts)
+
+                cold_latency, cold_statements = measure(embed_documents, texts)
+                warm_latency, warm_statements = measure(embed_documents, texts)
+                print(f'{mode} x{len(texts)} texts: '
+                      f'cold {cold_latency:.4f}s ({cold_statements} statements), '
+                      f'warm {warm_latency:.4f}s ({warm_statements} statements)')
+        finally:
+            db.session.rollback()
+            db.session.query(Embedding).filter(Embedding.model_name.in_(model_names)) \
+                .delete(synchronize_session=False)
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
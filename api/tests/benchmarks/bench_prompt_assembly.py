@@ -0,0 +1,47 @@
+import argparse
+import time
+
+from core.model_providers.models.llm.base import get_prompt_rules
+from core.prompt.prompt_template import JinjaPromptTemplate
+
+PRE_PROMPT = 'You are a helpful assistant for {{company}}.\nAnswer in {{language}}.'
+
+
+def assemble(from_template, templates: list, inputs: dict) -> str:
+    prompt = ''
+    for template in templates:
+        prompt_template = from_template(template)
+        prompt += prompt_template.format(**{k: inputs[k] for k in prompt_template.input_variables})
+
+    return prompt
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare cached and uncached prompt assembly.')
+    parser.add_argument('--rounds', type=int, default=1000)
+    args = parser.parse_args()
+
+    prompt_rules = get_prompt_rules('common_chat')
+    templates = [prompt_rules['context_prompt'], PRE_PROMPT, prompt_rules['histories_prompt'],
+                 prompt_rules['query_prompt']]
+    inputs = {'context': 'context', 'company': 'Dify', 'language': 'English', 'histories': 'histories',
+              'query': 'query'}
+
+    start_at = time.perf_counter()
+    for _ in range(args.rounds):
+        uncached_prompt = assemble(lambda template: JinjaPromptTemplate.from_template(template=template),
+                                   templates, inputs)
+    uncached_latency = time.perf_counter() - start_at
+
+    start_at = time.perf_counter()
+    for _ in range(args.rounds):
+        cached_prompt = assemble(lambda template: JinjaPromptTemplate.from_cached_template(template=template),
+                                 templates, inputs)
+    cached_latency = time.perf_counter() - start_at
+
+    assert cached_prompt == uncached_prompt
+    print(f'prompt assembly x{args.rounds}: uncached {uncached_latency:.4f}s, cached {cached_latency:.4f}s')
+
+
+if __name__ == '__main__':
+    main()
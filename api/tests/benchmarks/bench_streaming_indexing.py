@@ -0,0 +1,90 @@
+"""
+Peak memory of loading, cleaning and splitting an uploaded csv file the way IndexingRunner does,
+eagerly or in streaming batches.
+
+Eagerly all the split documents are kept until they are indexed, in batches the split documents of a batch
+are indexed and released before the next batch is loaded. Embedding and the vector and keyword indexes are
+left out, they hold the same batch of 100 documents in both modes.
+Each mode runs in its own process, so the reported peak RSS is not shared between them.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from core.data_loader.loader.csv_loader import CSVLoader
+from core.data_loader.loader.helpers import batch_documents
+
+ROW = 'Dify is an LLM application development platform, it combines Backend as a Service and LLMOps.'
+BATCH_SIZE = 1024 * 1024
+
+
+def write_csv(path: str, rows: int):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('id,question,answer\n')
+        for i in range(rows):
+            f.write(f'{i},"{ROW}","{ROW}"\n')
+
+
+def split(indexing_runner, splitter, processing_rule, text_docs: list) -> list:
+    for text_doc in text_docs:
+        text_doc.page_content = indexing_runner.filter_string(text_doc.page_content)
+
+    return indexing_runner._split_to_source_documents(text_docs, splitter, processing_rule)
+
+
+def run_pipeline(csv_path: str, mode: str):
+    from core.indexing_runner import IndexingRunner
+    from models.dataset import DatasetProcessRule
+
+    indexing_runner = IndexingRunner()
+    processing_rule = DatasetProcessRule(mode='automatic')
+    splitter = indexing_runner._get_splitter(processing_rule)
+    loader = CSVLoader(csv_path, autodetect_encoding=True)
+
+    chunks = 0
+    if mode == 'eager':
+        documents = split(indexing_runner, splitter, processing_rule, loader.load())
+        chunks = len(documents)
+    else:
+        for text_docs in batch_documents(loader.lazy_load(), BATCH_SIZE):
+            documents = split(indexing_runner, splitter, processing_rule, text_docs)
+            chunks += len(documents)
+
+    print(chunks, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def peak_rss(csv_path: str, mode: str):
+    output = subprocess.check_output([sys.executable, '-m', 'tests.benchmarks.bench_streaming_indexing',
+                                      '--run', mode, csv_path])
+    chunks, max_rss = output.split()[-2:]
+    return int(chunks), int(max_rss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the peak memory of eager and streaming indexing.')
+    parser.add_argument('--rows', type=int, default=500000, help='csv rows, 500000 rows are about 100MB')
+    parser.add_argument('--run', choices=['eager', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('csv_path', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_pipeline(args.csv_path, args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'rows.csv')
+        write_csv(csv_path, args.rows)
+
+        eager_chunks, eager_rss = peak_rss(csv_path, 'eager')
+        streaming_chunks, streaming_rss = peak_rss(csv_path, 'streaming')
+
+        print(f'peak rss indexing {os.path.getsize(csv_path) // (1024 * 1024)}MB csv: '
+              f'eager {eager_rss // 1024}MB ({eager_chunks} chunks), '
+              f'streaming {streaming_rss // 1024}MB ({streaming_chunks} chunks)')
+
+
+if __name__ == '__main__':
+    main()
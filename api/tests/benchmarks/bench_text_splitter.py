@@ -0,0 +1,50 @@
+import argparse
+import time
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from core.spiltter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from core.spiltter.token_offset_text_splitter import TokenOffsetTextSplitter, FixedTokenOffsetTextSplitter
+
+SEPARATORS = ["\n\n", "。", ".", " ", ""]
+SENTENCES = 'Dify is an LLM application development platform. It combines Backend as a Service and LLMOps, ' \
+            'so developers can quickly build production-grade generative AI applications. '
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the tiktoken splitters with the token offset splitters.')
+    parser.add_argument('--pages', type=int, default=50)
+    args = parser.parse_args()
+
+    # long pages without paragraph breaks, e.g. extracted from a pdf
+    pages = '\n'.join(SENTENCES * 20 for _ in range(args.pages))
+    splitters = {
+        'automatic': (
+            RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=500, chunk_overlap=0,
+                                                                 separators=SEPARATORS),
+            TokenOffsetTextSplitter(chunk_size=500, chunk_overlap=0, separators=SEPARATORS)
+        ),
+        'custom': (
+            FixedRecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=100, chunk_overlap=0,
+                                                                      fixed_separator='\n',
+                                                                      separators=SEPARATORS),
+            FixedTokenOffsetTextSplitter(chunk_size=100, chunk_overlap=0, fixed_separator='\n',
+                                         separators=SEPARATORS)
+        )
+    }
+
+    for mode, (current_splitter, token_offset_splitter) in splitters.items():
+        start_at = time.perf_counter()
+        current_chunks = current_splitter.split_text(pages)
+        current_latency = time.perf_counter() - start_at
+
+        start_at = time.perf_counter()
+        token_offset_chunks = token_offset_splitter.split_text_with_token_counts(pages)
+        token_offset_latency = time.perf_counter() - start_at
+
+        print(f'{mode} split of {len(pages)} chars: current {current_latency:.4f}s ({len(current_chunks)} chunks), '
+              f'token offset {token_offset_latency:.4f}s ({len(token_offset_chunks)} chunks)')
+
+
+if __name__ == '__main__':
+    main()
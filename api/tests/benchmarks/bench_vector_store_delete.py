@@ -0,0 +1,134 @@
+"""
+Latency and requests of deleting the vectors of many segments with the batched `del_texts_by_ids`
+against one delete request per node id, as before the batching.
+
+Qdrant runs in memory unless `--qdrant-url` is given, Weaviate is only measured with `--weaviate-endpoint`.
+The benchmark collections are removed at the end.
+"""
+import argparse
+import math
+import time
+import uuid
+from typing import Callable, List
+
+from langchain.embeddings.base import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from core.index.vector_index.base import DELETE_BATCH_SIZE
+from core.vector_store.qdrant_vector_store import QdrantVectorStore
+from core.vector_store.weaviate_vector_store import WeaviateVectorStore, DELETE_OPERANDS_LIMIT
+
+DIMENSIONS = 8
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [float(len(text) % (i + 2) + 1) for i in range(DIMENSIONS)]
+
+
+def measure(prepare: Callable[[List[str]], None], delete: Callable[[List[str]], None], ids: List[str]) -> float:
+    prepare(ids)
+    start_at = time.perf_counter()
+    delete(ids)
+    return time.perf_counter() - start_at
+
+
+def report(vector_store_name: str, ids: List[str], one_by_one_latency: float, batched_latency: float,
+           batched_requests: int):
+    print(f'{vector_store_name} delete of {len(ids)} ids: '
+          f'one by one {one_by_one_latency:.4f}s ({len(ids)} requests), '
+          f'batched {batched_latency:.4f}s ({batched_requests} requests)')
+
+
+def bench_qdrant(ids: List[str], url: str = None):
+    client = QdrantClient(url=url) if url else QdrantClient(location=':memory:')
+    collection_name = f'benchmark_{uuid.uuid4().hex}'
+    client.recreate_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(size=DIMENSIONS, distance=models.Distance.COSINE)
+    )
+    vector_store = QdrantVectorStore(client=client, collection_name=collection_name,
+                                     embeddings=FakeEmbeddings(), group_id='benchmark')
+
+    def prepare(doc_ids: List[str]):
+        vector_store.add_texts([f'text of {doc_id}' for doc_id in doc_ids],
+                               metadatas=[{'doc_id': doc_id} for doc_id in doc_ids])
+
+    def delete_one_by_one(doc_ids: List[str]):
+        for doc_id in doc_ids:
+            vector_store.del_texts(models.Filter(must=[
+                models.FieldCondition(key='metadata.doc_id', match=models.MatchValue(value=doc_id))
+            ]))
+
+    def delete_batched(doc_ids: List[str]):
+        for i in range(0, len(doc_ids), DELETE_BATCH_SIZE):
+            vector_store.del_texts_by_ids(doc_ids[i:i + DELETE_BATCH_SIZE])
+
+    try:
+        one_by_one_latency = measure(prepare, delete_one_by_one, ids)
+        batched_latency = measure(prepare, delete_batched, ids)
+        assert client.count(collection_name=collection_name).count == 0
+    finally:
+        client.delete_collection(collection_name=collection_name)
+
+    report('qdrant', ids, one_by_one_latency, batched_latency, math.ceil(len(ids) / DELETE_BATCH_SIZE))
+
+
+def bench_weaviate(ids: List[str], endpoint: str, api_key: str = None):
+    import weaviate
+
+    client = weaviate.Client(
+        url=endpoint,
+        auth_client_secret=weaviate.AuthApiKey(api_key=api_key) if api_key else None
+    )
+    class_name = f'Benchmark_{uuid.uuid4().hex}'
+    client.schema.create_class({
+        'class': class_name,
+        'properties': [
+            {'name': 'text', 'dataType': ['text']},
+            {'name': 'doc_id', 'dataType': ['text']},
+        ]
+    })
+    vector_store = WeaviateVectorStore(client=client, index_name=class_name, text_key='text',
+                                       embedding=FakeEmbeddings(), by_text=False)
+
+    def prepare(doc_ids: List[str]):
+        vectors = FakeEmbeddings().embed_documents(doc_ids)
+        with client.batch as batch:
+            for doc_id, vector in zip(doc_ids, vectors):
+                batch.add_data_object({'text': f'text of {doc_id}', 'doc_id': doc_id}, class_name,
+                                      uuid=doc_id, vector=vector)
+
+    def delete_one_by_one(doc_ids: List[str]):
+        for doc_id in doc_ids:
+            vector_store.del_text(doc_id)
+
+    try:
+        one_by_one_latency = measure(prepare, delete_one_by_one, ids)
+        batched_latency = measure(prepare, lambda doc_ids: vector_store.del_texts_by_ids(doc_ids), ids)
+    finally:
+        client.schema.delete_class(class_name)
+
+    report('weaviate', ids, one_by_one_latency, batched_latency, math.ceil(len(ids) / DELETE_OPERANDS_LIMIT))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare batched and per id vector deletes.')
+    parser.add_argument('--ids', type=int, default=2000)
+    parser.add_argument('--qdrant-url')
+    parser.add_argument('--weaviate-endpoint')
+    parser.add_argument('--weaviate-api-key')
+    args = parser.parse_args()
+
+    ids = [str(uuid.uuid4()) for _ in range(args.ids)]
+    bench_qdrant(ids, args.qdrant_url)
+    if args.weaviate_endpoint:
+        bench_weaviate(ids, args.weaviate_endpoint, args.weaviate_api_key)
+
+
+if __name__ == '__main__':
+    main()
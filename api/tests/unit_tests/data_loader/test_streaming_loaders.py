@@ -0,0 +1,48 @@
+from core.data_loader.loader.csv_loader import CSVLoader
+from core.data_loader.loader.helpers import batch_documents
+from core.data_loader.loader.text import TextLoader
+
+ROW = 'Dify is an LLM application development platform, it combines Backend as a Service and LLMOps.'
+
+
+def _write_csv(path, rows: int):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('id,question,answer\n')
+        for i in range(rows):
+            f.write(f'{i},"{ROW}","{ROW}"\n')
+
+
+def test_csv_lazy_load_matches_load(tmp_path):
+    csv_path = tmp_path / 'rows.csv'
+    _write_csv(csv_path, 100)
+    loader = CSVLoader(str(csv_path), autodetect_encoding=True)
+
+    documents = list(loader.lazy_load())
+
+    assert len(documents) == 100
+    assert [document.page_content for document in documents] == [document.page_content for document in loader.load()]
+
+
+def test_text_lazy_load_cuts_blocks_at_paragraphs(tmp_path):
+    text_path = tmp_path / 'text.txt'
+    text = '\n\n'.join(f'{i}. {ROW}\n{ROW}' for i in range(1000))
+    text_path.write_text(text, encoding='utf-8')
+
+    blocks = list(TextLoader(str(text_path), block_size=10000).lazy_load())
+
+    assert len(blocks) > 1
+    assert ''.join(block.page_content for block in blocks) == text
+    for block in blocks[:-1]:
+        assert block.page_content.endswith('\n\n')
+
+
+def test_batch_documents_bounds_batch_size(tmp_path):
+    csv_path = tmp_path / 'rows.csv'
+    _write_csv(csv_path, 1000)
+
+    batches = list(batch_documents(CSVLoader(str(csv_path)).lazy_load(), 10000))
+
+    assert sum(len(batch) for batch in batches) == 1000
+    for batch in batches:
+        assert sum(len(document.page_content) for document in batch) <= 10000
+
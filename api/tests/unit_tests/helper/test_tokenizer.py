@@ -0,0 +1,89 @@
+import pytest
+import tiktoken
+
+from core.helper import tokenizer
+from core.helper.tokenizer import TokenizerService
+
+MODEL_NAME = 'gpt-3.5-turbo'
+
+TEXTS = [
+    'Dify is an LLM application development platform.',
+    'Dify 是一个 LLM 应用开发平台。',
+    '',
+    'Dify is an LLM application development platform.',
+    "It combines Backend as a Service and LLMOps, it's open source.",
+]
+
+
+class CountingEncoding(tiktoken.Encoding):
+    """Byte level encoding with a few merges, built offline instead of downloading the BPE ranks of the model."""
+
+    def __init__(self):
+        mergeable_ranks = {bytes([i]): i for i in range(256)}
+        for token in [b'Di', b'fy', b' a', b'is', b' L', b'LM', b'on']:
+            mergeable_ranks[token] = len(mergeable_ranks)
+
+        super().__init__(
+            name='counting',
+            pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+            mergeable_ranks=mergeable_ranks,
+            special_tokens={}
+        )
+        self.encoded_texts = []
+
+    def encode_ordinary(self, text: str) -> list[int]:
+        self.encoded_texts.append(text)
+        return super().encode_ordinary(text)
+
+    def encode_ordinary_batch(self, text: list[str], *, num_threads: int = 8) -> list[list[int]]:
+        self.encoded_texts.extend(text)
+        return super().encode_ordinary_batch(text, num_threads=num_threads)
+
+
+@pytest.fixture
+def encoding(monkeypatch) -> CountingEncoding:
+    encoding = CountingEncoding()
+    monkeypatch.setattr(tokenizer.tiktoken, 'encoding_for_model', lambda model_name: encoding)
+    return encoding
+
+
+def test_counts_are_memoized_in_lru(encoding):
+    tokenizer_service = TokenizerService(maxsize=2)
+
+    first_count = tokenizer_service.count_token(TEXTS[0], MODEL_NAME)
+    tokenizer_service.count_token(TEXTS[1], MODEL_NAME)
+    assert tokenizer_service.count_token(TEXTS[0], MODEL_NAME) == first_count
+    assert encoding.encoded_texts == [TEXTS[0], TEXTS[1]]
+
+    # TEXTS[1] is the least recently used count and is evicted
+    tokenizer_service.count_token(TEXTS[4], MODEL_NAME)
+    tokenizer_service.count_token(TEXTS[0], MODEL_NAME)
+    tokenizer_service.count_token(TEXTS[1], MODEL_NAME)
+    assert encoding.encoded_texts == [TEXTS[0], TEXTS[1], TEXTS[4], TEXTS[1]]
+
+
+def test_memoize_and_count_tokens_namespaces_are_separate(encoding):
+    tokenizer_service = TokenizerService()
+
+    # a provider count memoized in a namespace named after the model
+    assert tokenizer_service.memoize(MODEL_NAME, TEXTS[0], lambda: 1000) == 1000
+
+    count = tokenizer_service.count_token(TEXTS[0], MODEL_NAME)
+    assert count == len(encoding.encode_ordinary(TEXTS[0]))
+    assert count != 1000
+    assert tokenizer_service.memoize(MODEL_NAME, TEXTS[0], lambda: 0) == 1000
+
+    # the default GPT-2 namespace is not shared with a memoize namespace of the same name either
+    tokenizer_service.prime([(TEXTS[1], 7)])
+    assert tokenizer_service.memoize('gpt2', TEXTS[1], lambda: 8) == 8
+
+
+def test_batch_counts_equal_single_counts(encoding):
+    batch_counts = TokenizerService().count_tokens(TEXTS, MODEL_NAME)
+
+    single_tokenizer_service = TokenizerService()
+    single_counts = [single_tokenizer_service.count_token(text, MODEL_NAME) for text in TEXTS]
+
+    assert batch_counts == single_counts
+    assert batch_counts[2] == 0
+    assert batch_counts[0] == batch_counts[3]
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.index.keyword_table_index import jieba_keyword_table_handler
+from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler, \
+    MIN_PARALLEL_BATCH_SIZE
+
+TEXTS = [
+    f'{i}. Dify is an LLM application development platform, it combines Backend as a Service and LLMOps. '
+    f'Dify 是一个 LLM 应用开发平台，第 {i} 段融合了后端即服务和 LLMOps 的理念，支持知识库检索与关键词索引。'
+    for i in range(MIN_PARALLEL_BATCH_SIZE * 4)
+]
+
+
+@pytest.mark.parametrize('daemon', [False, True], ids=['spawned pool', 'billiard pool of a daemonic process'])
+def test_pool_extraction_matches_serial_extraction(monkeypatch, daemon):
+    monkeypatch.setattr(jieba_keyword_table_handler.multiprocessing, 'current_process',
+                        lambda: SimpleNamespace(daemon=daemon))
+    keyword_table_handler = JiebaKeywordTableHandler()
+    try:
+        pool_results = keyword_table_handler.batch_extract_keywords_with_frequencies(TEXTS, 10, max_workers=2)
+        # extracted in the pool, not by the serial fallback
+        assert jieba_keyword_table_handler._process_pool is not None
+    finally:
+        jieba_keyword_table_handler._reset_process_pool()
+
+    serial_results = [keyword_table_handler.extract_keywords_with_frequencies(text, 10) for text in TEXTS]
+
+    assert len(pool_results) == len(TEXTS)
+    for (pool_keywords, pool_length), (serial_keywords, serial_length) in zip(pool_results, serial_results):
+        # the same keywords, frequencies and keyword order
+        assert list(pool_keywords.items()) == list(serial_keywords.items())
+        assert pool_length == serial_length
+
+
+def test_small_batch_is_extracted_in_current_process():
+    keyword_table_handler = JiebaKeywordTableHandler()
+
+    results = keyword_table_handler.batch_extract_keywords_with_frequencies(TEXTS[:2], 10, max_workers=2)
+
+    assert jieba_keyword_table_handler._process_pool is None
+    assert results == [keyword_table_handler.extract_keywords_with_frequencies(text, 10) for text in TEXTS[:2]]
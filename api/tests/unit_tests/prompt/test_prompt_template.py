@@ -0,0 +1,52 @@
+from jinja2 import Template
+
+from core.model_providers.models.llm.base import get_prompt_rules
+from core.prompt.prompt_template import JinjaPromptTemplate, get_compiled_template, _prompt_template_cache, \
+    _compiled_template_cache
+
+PRE_PROMPT = 'You are a helpful assistant for {{company}}.\nAnswer in {{language}}.'
+
+
+def test_from_cached_template_is_cached():
+    prompt_template = JinjaPromptTemplate.from_cached_template(template=PRE_PROMPT)
+
+    assert JinjaPromptTemplate.from_cached_template(template=PRE_PROMPT) is prompt_template
+    assert prompt_template.input_variables == ['company', 'language']
+    assert get_compiled_template(PRE_PROMPT) is get_compiled_template(PRE_PROMPT)
+
+
+def test_from_template_is_not_cached():
+    context_prompt = 'Use the following context:\n<context>some retrieved text</context>\n' + PRE_PROMPT
+    prompt_template = JinjaPromptTemplate.from_template(template=context_prompt)
+
+    assert prompt_template is not JinjaPromptTemplate.from_template(template=context_prompt)
+    # per-request text never enters the caches
+    assert context_prompt not in _prompt_template_cache
+    assert context_prompt not in _compiled_template_cache
+    assert prompt_template.format(company='Dify', language='English').endswith(
+        'You are a helpful assistant for Dify.\nAnswer in English.')
+
+
+def test_from_template_with_kwargs():
+    prompt_template = JinjaPromptTemplate.from_template(template=PRE_PROMPT,
+                                                        partial_variables={'language': 'English'})
+
+    assert prompt_template is not JinjaPromptTemplate.from_cached_template(template=PRE_PROMPT)
+    assert prompt_template.input_variables == ['company']
+    assert prompt_template.format(company='Dify') == 'You are a helpful assistant for Dify.\nAnswer in English.'
+
+
+def test_format_matches_jinja():
+    inputs = {'company': 'Dify', 'language': 'English'}
+
+    assert JinjaPromptTemplate.from_cached_template(template=PRE_PROMPT).format(**inputs) \
+           == Template(PRE_PROMPT).render(**inputs)
+    assert JinjaPromptTemplate.from_template(template=PRE_PROMPT).format(**inputs) \
+           == Template(PRE_PROMPT).render(**inputs)
+
+
+def test_prompt_rules_are_loaded_once():
+    prompt_rules = get_prompt_rules('common_chat')
+
+    assert get_prompt_rules('common_chat') is prompt_rules
+    assert 'query_prompt' in prompt_rules
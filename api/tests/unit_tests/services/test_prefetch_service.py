@@ -0,0 +1,132 @@
+import pytest
+
+from extensions.ext_database import db
+from models.account import Account
+from models.model import Conversation, Message, MessageFeedback, MessageAnnotation, MessageAgentThought, \
+    DatasetRetrieverResource, EndUser, AppModelConfig, App
+from services.prefetch_service import PrefetchService
+
+PAGE_SIZE = 50
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def filter(self, *args):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def distinct(self, *args):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def count(self):
+        return len(self._rows)
+
+
+class FakeSession:
+    """Session returning all the rows of the queried model, the executed queries are counted."""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.query_count = 0
+
+    def query(self, model):
+        self.query_count += 1
+        return FakeQuery(self._rows.get(model, []))
+
+
+@pytest.fixture
+def messages():
+    return [Message(id=f'message-{i}', conversation_id='conversation-0') for i in range(PAGE_SIZE)]
+
+
+@pytest.fixture
+def message_session(mocker, messages):
+    session = FakeSession({
+        MessageFeedback: [MessageFeedback(id=f'feedback-{i}', message_id=message.id, rating='like',
+                                          from_source='admin', from_account_id='account-0')
+                          for i, message in enumerate(messages)],
+        MessageAnnotation: [MessageAnnotation(id=f'annotation-{i}', message_id=message.id, account_id='account-0')
+                            for i, message in enumerate(messages[:10])],
+        MessageAgentThought: [MessageAgentThought(id=f'thought-{i}', message_id=message.id, position=1)
+                              for i, message in enumerate(messages)],
+        DatasetRetrieverResource: [DatasetRetrieverResource(id=f'resource-{i}', message_id=message.id, position=1)
+                                   for i, message in enumerate(messages)],
+        Account: [Account(id='account-0', name='admin')],
+    })
+    mocker.patch.object(db, 'session', session)
+    return session
+
+
+def _read_message_relations(messages):
+    for message in messages:
+        for feedback in message.feedbacks:
+            assert feedback.from_account.id == 'account-0'
+        assert message.admin_feedback.message_id == message.id
+        assert message.user_feedback is None
+        if message.annotation:
+            assert message.annotation.account.id == 'account-0'
+        assert [agent_thought.message_id for agent_thought in message.agent_thoughts] == [message.id]
+        assert [resource.message_id for resource in message.retriever_resources] == [message.id]
+
+
+def test_prefetch_messages_runs_one_query_per_relation(messages, message_session):
+    PrefetchService.prefetch_messages(messages)
+    # feedbacks, feedback accounts, annotations, annotation accounts, agent thoughts, retriever resources
+    assert message_session.query_count == 6
+
+    _read_message_relations(messages)
+    assert message_session.query_count == 6
+
+    assert sum(1 for message in messages if message.annotation) == 10
+
+
+def test_prefetch_messages_relations_only(messages, message_session):
+    PrefetchService.prefetch_messages(messages, relations=('feedbacks',))
+    assert message_session.query_count == 2
+
+    for message in messages:
+        assert message.admin_feedback.message_id == message.id
+    assert message_session.query_count == 2
+
+    with pytest.raises(ValueError):
+        PrefetchService.prefetch_messages(messages, relations=('conversation',))
+
+
+def test_prefetch_conversations_runs_one_query_per_relation(mocker):
+    conversations = [Conversation(id=f'conversation-{i}', app_id='app-0', app_model_config_id='config-0',
+                                  from_end_user_id=f'end-user-{i % 5}', summary=None)
+                     for i in range(PAGE_SIZE)]
+    session = FakeSession({
+        MessageAnnotation: [MessageAnnotation(id='annotation-0', conversation_id='conversation-0',
+                                              account_id='account-0')],
+        Message: [Message(id=f'message-{i}', conversation_id=conversation.id, query=f'query {i}')
+                  for i, conversation in enumerate(conversations)],
+        EndUser: [EndUser(id=f'end-user-{i}', session_id=f'session-{i}') for i in range(5)],
+        AppModelConfig: [AppModelConfig(id='config-0')],
+        App: [App(id='app-0')],
+        Account: [Account(id='account-0', name='admin')],
+    })
+    mocker.patch.object(db, 'session', session)
+
+    PrefetchService.prefetch_conversations(conversations)
+    # annotations, annotation accounts, first messages, end users, app model configs, apps
+    assert session.query_count == 6
+
+    for i, conversation in enumerate(conversations):
+        assert conversation.annotated == (i == 0)
+        assert conversation.summary_or_query == f'query {i}'
+        assert conversation.from_end_user_session_id == f'session-{i % 5}'
+        assert conversation.app_model_config.id == 'config-0'
+        assert conversation.app.id == 'app-0'
+    assert conversations[0].annotation.account.id == 'account-0'
+    assert session.query_count == 6
@@ -0,0 +1,121 @@
+import pytest
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from core.helper.tokenizer import tokenizer_service
+from core.spiltter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from core.spiltter.token_offset_text_splitter import TokenOffsetTextSplitter, FixedTokenOffsetTextSplitter, \
+    TokenOffsets
+
+SEPARATORS = ["\n\n", "。", ".", " ", ""]
+SENTENCES = 'Dify is an LLM application development platform. It combines Backend as a Service and LLMOps, ' \
+            'so developers can quickly build production-grade generative AI applications. '
+PARAGRAPH = SENTENCES + 'Dify 是一个 LLM 应用开发平台。它融合了后端即服务和 LLMOps 的理念。'
+TEXT = '\n\n'.join(f'{i}. {PARAGRAPH * (i % 5 + 1)}' for i in range(200))
+# paragraphs without sentence separators are split by spaces, and runs of Chinese without spaces by chars
+UNBROKEN_TEXT = '\n\n'.join([
+    ' '.join(f'word{i}' for i in range(600)),
+    '检索增强生成' * 200,
+    'https://docs.dify.ai/getting-started/intro-to-dify?lang=en&page=' + '0123456789' * 50,
+])
+
+# Chunks split at separators between the pre-tokens of the encoding (paragraphs, sentences, words) are identical
+# to the chunks of the reference splitter, the tokens of such a piece are exactly the document tokens inside it.
+# A piece split inside a run of merged tokens (the chars of a CJK run, a long word or number) is measured by its share
+# of the document tokens instead of its own encoding, which is usually smaller than the sum of the separately encoded
+# chars, so those chunks are allowed to differ: they keep the same text in the same order and fill up to the chunk
+# size, encoded alone a chunk may count one more token for the partial token at each of its edges.
+ALLOWED_EDGE_TOKENS = 2
+
+
+def test_token_offsets_count_spans():
+    encoding = tiktoken.get_encoding('gpt2')
+    offsets = TokenOffsets(PARAGRAPH, encoding)
+
+    assert offsets.count(0, len(PARAGRAPH)) == len(encoding.encode_ordinary(PARAGRAPH))
+    assert offsets.count(0, 0) == 0
+    assert offsets.count(0, len('Dify')) == len(encoding.encode_ordinary('Dify'))
+
+
+def test_chunks_have_exact_token_counts():
+    encoding = tiktoken.get_encoding('gpt2')
+    splitter = TokenOffsetTextSplitter(chunk_size=200, chunk_overlap=0, separators=SEPARATORS)
+
+    chunks = splitter.split_text_with_token_counts(TEXT)
+
+    assert len(chunks) > 1
+    for chunk, tokens in chunks:
+        assert tokens == len(encoding.encode_ordinary(chunk))
+    # separators are kept, only the whitespace around the chunks is stripped
+    assert ''.join(''.join(chunk for chunk, _ in chunks).split()) == ''.join(TEXT.split())
+
+
+def test_fixed_separator_chunks():
+    splitter = FixedTokenOffsetTextSplitter(chunk_size=500, chunk_overlap=0, fixed_separator='\n\n',
+                                            separators=SEPARATORS)
+
+    chunks = splitter.split_text(TEXT)
+
+    assert chunks[0] == f'0. {PARAGRAPH}'
+    assert all('\n\n' not in chunk for chunk in chunks)
+
+
+def test_split_documents_matches_split_text():
+    splitter = TokenOffsetTextSplitter(chunk_size=200, chunk_overlap=0, separators=SEPARATORS)
+
+    documents = splitter.create_documents([TEXT], metadatas=[{'source': 'test'}])
+
+    assert [document.page_content for document in documents] == splitter.split_text(TEXT)
+    assert all(document.metadata == {'source': 'test'} for document in documents)
+
+
+def test_create_documents_primes_tokenizer_model_counts():
+    encoding = tiktoken.encoding_for_model('text-embedding-ada-002')
+    splitter = TokenOffsetTextSplitter(chunk_size=200, chunk_overlap=0, separators=SEPARATORS,
+                                       tokenizer_model_name='text-embedding-ada-002')
+
+    documents = splitter.create_documents([TEXT])
+
+    for document in documents:
+        count = tokenizer_service.memoize('text-embedding-ada-002', document.page_content,
+                                          lambda: pytest.fail('token count is not primed'))
+        assert count == len(encoding.encode_ordinary(document.page_content))
+
+
+
+def _split(fixed: bool, chunk_size: int, text: str) -> tuple[list[str], list[str]]:
+    if fixed:
+        chunks = FixedTokenOffsetTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=0, fixed_separator='\n\n', separators=SEPARATORS
+        ).split_text(text)
+        reference_chunks = FixedRecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=chunk_size, chunk_overlap=0, fixed_separator='\n\n', separators=SEPARATORS
+        ).split_text(text)
+    else:
+        chunks = TokenOffsetTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=0, separators=SEPARATORS
+        ).split_text(text)
+        reference_chunks = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=chunk_size, chunk_overlap=0, separators=SEPARATORS
+        ).split_text(text)
+
+    return chunks, reference_chunks
+
+
+@pytest.mark.parametrize('fixed', [False, True], ids=['recursive', 'fixed'])
+@pytest.mark.parametrize('chunk_size', [200, 500])
+def test_chunks_split_between_pre_tokens_match_reference_splitter(fixed, chunk_size):
+    chunks, reference_chunks = _split(fixed, chunk_size, TEXT)
+
+    assert chunks == reference_chunks
+
+
+@pytest.mark.parametrize('fixed', [False, True], ids=['recursive', 'fixed'])
+@pytest.mark.parametrize('chunk_size', [50, 200, 500])
+@pytest.mark.parametrize('text', [TEXT, UNBROKEN_TEXT], ids=['paragraphs', 'unbroken'])
+def test_chunks_split_inside_tokens_keep_reference_text(fixed, chunk_size, text):
+    encoding = tiktoken.get_encoding('gpt2')
+    chunks, reference_chunks = _split(fixed, chunk_size, text)
+
+    assert ''.join(''.join(chunks).split()) == ''.join(''.join(reference_chunks).split())
+    assert all(len(encoding.encode_ordinary(chunk)) <= chunk_size + ALLOWED_EDGE_TOKENS for chunk in chunks)
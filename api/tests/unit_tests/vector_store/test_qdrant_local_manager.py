@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+from importlib.metadata import version
+
+from qdrant_client.http import models as rest
+from qdrant_client.local.qdrant_local import QdrantLocal
+
+from core.vector_store.qdrant_local_manager import QdrantLocalManager
+
+# QdrantLocalManager reloads and unlocks the storage through private QdrantLocal internals,
+# a new qdrant-client version must be checked against them before it is added here
+SUPPORTED_QDRANT_CLIENT_VERSIONS = ['1.1.6', '1.1.7']
+
+API_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+WRITE_POINT_SCRIPT = '''
+import sys
+from qdrant_client.http import models as rest
+from core.vector_store.qdrant_local_manager import QdrantLocalManager
+
+with QdrantLocalManager(sys.argv[1]).write() as client:
+    client.upsert('dataset', points=[rest.PointStruct(id=2, vector=[0.0, 1.0], payload={})])
+'''
+
+
+def _create_collection(local_manager: QdrantLocalManager):
+    with local_manager.write() as client:
+        client.recreate_collection('dataset', vectors_config=rest.VectorParams(size=2, distance=rest.Distance.COSINE))
+        client.upsert('dataset', points=[rest.PointStruct(id=1, vector=[1.0, 0.0], payload={})])
+
+
+def test_qdrant_client_version_is_supported():
+    assert version('qdrant-client') in SUPPORTED_QDRANT_CLIENT_VERSIONS
+
+
+def test_qdrant_local_internals(tmp_path):
+    local_manager = QdrantLocalManager(str(tmp_path))
+    _create_collection(local_manager)
+
+    local_client = local_manager.client._client
+    assert isinstance(local_client, QdrantLocal)
+    assert isinstance(local_client.aliases, dict)
+    assert callable(local_client._load)
+    assert all(callable(collection.storage.storage.close) for collection in local_client.collections.values())
+
+
+def test_write_of_another_process_is_reloaded(tmp_path):
+    local_manager = QdrantLocalManager(str(tmp_path))
+    _create_collection(local_manager)
+
+    # the storage of a living manager can be opened and written by another process
+    subprocess.run([sys.executable, '-c', WRITE_POINT_SCRIPT, str(tmp_path)], cwd=API_ROOT, check=True)
+
+    with local_manager.read() as client:
+        assert client.count('dataset').count == 2
+
+
+def test_write_of_the_same_process_is_not_reloaded(tmp_path):
+    local_manager = QdrantLocalManager(str(tmp_path))
+    _create_collection(local_manager)
+
+    collections = local_manager.client._client.collections
+    with local_manager.read() as client:
+        assert client.count('dataset').count == 1
+
+    assert local_manager.client._client.collections is collections
@@ -14,6 +14,7 @@ import s from './style.module.css'
 import Init from './init'
 import { ToastContext } from '@/app/components/base/toast'
 import Sidebar from '@/app/components/share/chat/sidebar'
+import { pollConversationName } from '@/app/components/share/utils'
 import {
   delConversation,
   fetchAppParams,
@@ -566,6 +567,11 @@ const Main: FC<IMainProps> = () => {
           const { data: allConversations }: any = await fetchAllConversations()
           setAllConversationList(allConversations)
           noticeUpdateList()
+          // the name of a new conversation is generated in the background after the answer
+          pollConversationName(tempNewConversationId, allConversations, fetchAllConversations, (namedConversations) => {
+            setAllConversationList(namedConversations)
+            noticeUpdateList()
+          })
         }
         setConversationIdChangeBecauseOfNew(false)
         resetNewConversationInputs()
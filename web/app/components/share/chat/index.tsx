@@ -8,7 +8,7 @@ import { useContext } from 'use-context-selector'
 import produce from 'immer'
 import { useBoolean, useGetState } from 'ahooks'
 import AppUnavailable from '../../base/app-unavailable'
-import { checkOrSetAccessToken } from '../utils'
+import { checkOrSetAccessToken, pollConversationName } from '../utils'
 import useConversation from './hooks/use-conversation'
 import s from './style.module.css'
 import { ToastContext } from '@/app/components/base/toast'
@@ -525,6 +525,11 @@ const Main: FC<IMainProps> = ({
           const { data: allConversations }: any = await fetchAllConversations()
           setAllConversationList(allConversations)
           noticeUpdateList()
+          // the name of a new conversation is generated in the background after the answer
+          pollConversationName(tempNewConversationId, allConversations, fetchAllConversations, (namedConversations) => {
+            setAllConversationList(namedConversations)
+            noticeUpdateList()
+          })
         }
         setConversationIdChangeBecauseOfNew(false)
         resetNewConversationInputs()
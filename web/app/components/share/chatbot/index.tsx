@@ -7,7 +7,7 @@ import { useTranslation } from 'react-i18next'
 import { useContext } from 'use-context-selector'
 import produce from 'immer'
 import { useBoolean, useGetState } from 'ahooks'
-import { checkOrSetAccessToken } from '../utils'
+import { checkOrSetAccessToken, pollConversationName } from '../utils'
 import AppUnavailable from '../../base/app-unavailable'
 import useConversation from './hooks/use-conversation'
 import s from './style.module.css'
@@ -442,6 +442,11 @@ const Main: FC<IMainProps> = ({
           const { data: allConversations }: any = await fetchAllConversations()
           setAllConversationList(allConversations)
           noticeUpdateList()
+          // the name of a new conversation is generated in the background after the answer
+          pollConversationName(tempNewConversationId, allConversations, fetchAllConversations, (namedConversations) => {
+            setAllConversationList(namedConversations)
+            noticeUpdateList()
+          })
         }
         setConversationIdChangeBecauseOfNew(false)
         resetNewConversationInputs()
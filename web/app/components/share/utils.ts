@@ -1,4 +1,9 @@
 import { fetchAccessToken } from '@/service/share'
+import type { ConversationItem } from '@/models/share'
+import { sleep } from '@/utils'
+
+// delays between the fetches of a new conversation, whose name is generated in the background after the answer
+const CONVERSATION_NAME_POLLING_DELAYS = [1000, 2000, 4000, 8000]
 
 export const checkOrSetAccessToken = async () => {
   const sharedToken = globalThis.location.pathname.split('/').slice(-1)[0]
@@ -16,3 +21,35 @@ export const checkOrSetAccessToken = async () => {
     localStorage.setItem('token', JSON.stringify(accessTokenJson))
   }
 }
+
+/**
+ * Fetch the conversations again with a bounded backoff until the new conversation is named.
+ * `onNamed` receives the conversations once the name is set, polling gives up silently after the last delay.
+ */
+export const pollConversationName = async (
+  conversationId: string,
+  conversations: ConversationItem[],
+  fetchConversations: () => Promise<any>,
+  onNamed: (conversations: ConversationItem[]) => void,
+) => {
+  const isUnnamed = (items: ConversationItem[]) => items.some(item => item.id === conversationId && !item.name)
+  if (!isUnnamed(conversations))
+    return
+
+  for (const delay of CONVERSATION_NAME_POLLING_DELAYS) {
+    await sleep(delay)
+    try {
+      const { data }: { data: ConversationItem[] } = await fetchConversations()
+      if (!data.some(item => item.id === conversationId))
+        return
+
+      if (!isUnnamed(data)) {
+        onNamed(data)
+        return
+      }
+    }
+    catch (e) {
+      return
+    }
+  }
+}